@@ -0,0 +1,92 @@
+"""
+Measure how fast idle carts are deleted, and add-to-cart and checkout
+latency with and without the cleanup running alongside.
+
+    python -m benchmarks.abandoned_carts --carts 100000 --items 3
+"""
+import argparse
+import statistics
+import threading
+import time
+from datetime import timedelta
+from uuid import uuid4
+from benchmarks.utils import report, setup
+
+def seed_idle_carts(count, items, products, batch_size=10_000):
+    from django.utils import timezone
+    from store.models import Cart, CartItem
+
+    idle = timezone.now() - timedelta(days=365)
+    for start in range(0, count, batch_size):
+        # Cart ids are UUIDs made in Python, so these have theirs on MySQL too.
+        carts = Cart.objects.bulk_create([
+            Cart(last_activity=idle) for _ in range(min(batch_size, count - start))
+        ])
+        CartItem.objects.bulk_create([
+            CartItem(cart=cart, product=product, quantity=1)
+            for cart in carts for product in products[:items]
+        ])
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--carts', type=int, default=100_000)
+    parser.add_argument('--items', type=int, default=3)
+    parser.add_argument('--batch-size', type=int, default=1000)
+    parser.add_argument('--repeat', type=int, default=100)
+    args = parser.parse_args()
+
+    setup()
+    from django.db import connection
+    from rest_framework.test import APIClient
+    from core.models import User
+    from store.carts import delete_abandoned_carts
+    from store.models import Cart, CartItem, Collection, Product
+
+    name = uuid4().hex
+    user = User.objects.create_user(username=name, email=f'{name}@example.com')
+    client = APIClient()
+    client.force_authenticate(user=user)
+    collection = Collection.objects.create(title='Cart cleanup benchmark')
+    Product.objects.bulk_create([
+        Product(title=f'Cart product {i}', slug=f'cart-product-{i}', unit_price=10,
+                inventory=1_000_000, collection=collection)
+        for i in range(max(args.items, 5))
+    ])
+    # Read back for their ids, which bulk_create() doesn't set on MySQL.
+    products = list(Product.objects.filter(collection=collection).order_by('id'))
+
+    def requests():
+        add, checkout = [], []
+        for _ in range(args.repeat):
+            cart = Cart.objects.create()
+            start = time.perf_counter()
+            client.post(f'/store/carts/{cart.id}/items/', {'product_id': products[0].id, 'quantity': 1})
+            add.append((time.perf_counter() - start) * 1000)
+            start = time.perf_counter()
+            client.post('/store/orders/', {'cart_id': cart.id})
+            checkout.append((time.perf_counter() - start) * 1000)
+        return add, checkout
+
+    def show(label, timings):
+        add, checkout = timings
+        report(f'add to cart, {label}', (statistics.median(add), max(add)))
+        report(f'checkout, {label}', (statistics.median(checkout), max(checkout)))
+
+    show('idle', requests())
+
+    seed_idle_carts(args.carts, args.items, products)
+    result = {}
+
+    def cleanup():
+        result['report'] = delete_abandoned_carts(timedelta(days=30), args.batch_size)
+        connection.close()
+
+    worker = threading.Thread(target=cleanup)
+    worker.start()
+    during = requests()
+    worker.join()
+    show('during cleanup', during)
+    print(result['report'])
+
+if __name__ == '__main__':
+    main()
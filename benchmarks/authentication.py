@@ -0,0 +1,52 @@
+"""
+Compare latency and queries per JWT-authenticated request with the stock
+JWTAuthentication against CachedJWTAuthentication.
+
+    python -m benchmarks.authentication --orders 20
+"""
+import argparse
+import statistics
+import time
+from uuid import uuid4
+from benchmarks.utils import report, setup
+
+PATHS = ['/store/orders/', '/store/customers/me/']
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--orders', type=int, default=20)
+    parser.add_argument('--repeat', type=int, default=200)
+    args = parser.parse_args()
+
+    setup()
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+    from rest_framework.test import APIClient
+    from rest_framework_simplejwt.authentication import JWTAuthentication
+    from rest_framework_simplejwt.tokens import AccessToken
+    from core.authentication import CachedJWTAuthentication
+    from core.models import User
+    from store.models import Order
+    from store.views import CustomerViewSet, OrderViewSet
+
+    name = uuid4().hex
+    user = User.objects.create_user(username=name, email=f'{name}@example.com')
+    Order.objects.bulk_create([Order(customer=user.customer) for _ in range(args.orders)])
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION=f'JWT {AccessToken.for_user(user)}')
+
+    for authentication in (JWTAuthentication, CachedJWTAuthentication):
+        OrderViewSet.authentication_classes = CustomerViewSet.authentication_classes = [authentication]
+        for path in PATHS:
+            client.get(path)
+            timings = []
+            for _ in range(args.repeat):
+                with CaptureQueriesContext(connection) as context:
+                    start = time.perf_counter()
+                    client.get(path)
+                    timings.append((time.perf_counter() - start) * 1000)
+            report(f'{authentication.__name__} {path}, {len(context)} queries',
+                   (statistics.median(timings), max(timings)))
+
+if __name__ == '__main__':
+    main()
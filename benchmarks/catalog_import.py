@@ -0,0 +1,52 @@
+"""
+Generate a catalog file and time importing it.
+
+    python -m benchmarks.catalog_import --rows 1000000 --format csv
+"""
+import argparse
+import csv
+import json
+import tempfile
+from pathlib import Path
+from random import randint, sample
+from benchmarks.utils import WORDS, setup
+
+def write_catalog(path, rows, format):
+    with path.open('w', newline='') as file:
+        writer = csv.writer(file) if format == 'csv' else None
+        if writer:
+            writer.writerow(['title', 'slug', 'description', 'unit_price', 'inventory', 'collection', 'tags'])
+        for i in range(rows):
+            row = {
+                'title': f'Imported product {i}',
+                'slug': f'imported-product-{i}',
+                'description': ' '.join(sample(WORDS, 6)),
+                'unit_price': f'{randint(100, 99_999) / 100:.2f}',
+                'inventory': randint(1, 100),
+                'collection': f'Imported {i % 20}',
+                'tags': sample(WORDS, 2),
+            }
+            if writer:
+                row['tags'] = '|'.join(row['tags'])
+                writer.writerow(row.values())
+            else:
+                file.write(json.dumps(row) + '\n')
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=100_000)
+    parser.add_argument('--format', choices=['csv', 'jsonl'], default='csv')
+    parser.add_argument('--chunk-size', type=int, default=1000)
+    args = parser.parse_args()
+
+    setup()
+    from django.core.management import call_command
+
+    with tempfile.TemporaryDirectory() as folder:
+        path = Path(folder) / f'catalog.{args.format}'
+        write_catalog(path, args.rows, args.format)
+        print(f'{args.rows} rows, {path.stat().st_size / 2**20:.1f} MB')
+        call_command('import_catalog', str(path), chunk_size=args.chunk_size)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+"""
+Measure checkout throughput with many buyers contending for the same
+few products, and check that inventory never oversells. Run it against
+MySQL or PostgreSQL; SQLite rejects concurrent writers outright.
+
+    python -m benchmarks.checkout --buyers 50 --products 3 --stock 100
+"""
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+from threading import Barrier
+from benchmarks.utils import setup
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--buyers', type=int, default=50)
+    parser.add_argument('--products', type=int, default=3)
+    parser.add_argument('--stock', type=int, default=100)
+    parser.add_argument('--quantity', type=int, default=2)
+    args = parser.parse_args()
+
+    setup()
+    from uuid import uuid4
+    from django.db import connection
+    from rest_framework.test import APIClient
+    from core.models import User
+    from store.models import Cart, CartItem, Collection, Product
+
+    collection = Collection.objects.create(title='Hot products')
+    products = [
+        Product.objects.create(
+            title=f'Hot product {i}', slug=f'hot-product-{i}', unit_price=10,
+            inventory=args.stock, collection=collection)
+        for i in range(args.products)
+    ]
+
+    buyers = []
+    for _ in range(args.buyers):
+        name = uuid4().hex
+        user = User.objects.create_user(username=name, email=f'{name}@example.com')
+        cart = Cart.objects.create()
+        # Every buyer wants every hot product, listed in a different order.
+        for product in sorted(products, key=lambda _: uuid4()):
+            CartItem.objects.create(cart=cart, product=product, quantity=args.quantity)
+        buyers.append((user, cart))
+
+    barrier = Barrier(args.buyers)
+
+    def checkout(buyer):
+        user, cart = buyer
+        client = APIClient()
+        client.force_authenticate(user=user)
+        barrier.wait()
+        try:
+            return client.post('/store/orders/', {'cart_id': cart.id}).status_code
+        finally:
+            connection.close()
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(args.buyers) as executor:
+        codes = list(executor.map(checkout, buyers))
+    elapsed = time.perf_counter() - start
+
+    placed = codes.count(200)
+    print(f'{args.buyers} buyers, {placed} orders placed, {codes.count(400)} rejected as short')
+    print(f'{elapsed:.2f} s total, {len(codes) / elapsed:.1f} checkouts/s')
+
+    for product in products:
+        product.refresh_from_db()
+        sold = args.stock - product.inventory
+        assert product.inventory >= 0, f'{product} oversold'
+        assert sold == placed * args.quantity, f'{product}: sold {sold}, expected {placed * args.quantity}'
+    print('Inventory consistent with orders placed.')
+
+if __name__ == '__main__':
+    main()
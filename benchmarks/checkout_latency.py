@@ -0,0 +1,54 @@
+"""
+Measure single-buyer checkout latency and query count by cart size.
+
+    python -m benchmarks.checkout_latency --lines 1 20 100
+"""
+import argparse
+import time
+from benchmarks.utils import report, setup
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--lines', type=int, nargs='+', default=[1, 20, 100])
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    setup()
+    import statistics
+    from uuid import uuid4
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+    from rest_framework.test import APIClient
+    from core.models import User
+    from store.models import Cart, CartItem, Collection, Product
+
+    name = uuid4().hex
+    user = User.objects.create_user(username=name, email=f'{name}@example.com')
+    client = APIClient()
+    client.force_authenticate(user=user)
+
+    collection = Collection.objects.create(title='Checkout benchmark')
+    Product.objects.bulk_create([
+        Product(title=f'Checkout product {i}', slug=f'checkout-product-{i}', unit_price=10,
+                inventory=1_000_000, collection=collection)
+        for i in range(max(args.lines))
+    ])
+    # Read back for their ids, which bulk_create() doesn't set on MySQL.
+    products = list(Product.objects.filter(collection=collection).order_by('id'))
+
+    for lines in args.lines:
+        timings, queries = [], 0
+        for _ in range(args.repeat):
+            cart = Cart.objects.create()
+            CartItem.objects.bulk_create([
+                CartItem(cart=cart, product=product, quantity=1) for product in products[:lines]
+            ])
+            with CaptureQueriesContext(connection) as context:
+                start = time.perf_counter()
+                client.post('/store/orders/', {'cart_id': cart.id})
+                timings.append((time.perf_counter() - start) * 1000)
+            queries = len(context)
+        report(f'checkout, {lines} lines, {queries} queries', (statistics.median(timings), max(timings)))
+
+if __name__ == '__main__':
+    main()
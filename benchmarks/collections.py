@@ -0,0 +1,40 @@
+"""
+Compare the collection list query with a live COUNT aggregate against the
+stored products_count.
+
+    python -m benchmarks.collections --products 1000000
+"""
+import argparse
+from benchmarks.utils import measure, report, seed_products, setup
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--products', type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    setup()
+    from django.core.cache import cache
+    from django.core.management import call_command
+    from django.db.models import Count
+    from django.test import Client
+    from store.models import Collection
+
+    seed_products(args.products)
+    # seed_products bulk inserts, which doesn't maintain the counts.
+    call_command('reconcile_collection_counts')
+    client = Client()
+
+    def uncached_list():
+        cache.clear()
+        client.get('/store/collections/')
+
+    report('COUNT(products) per request', measure(
+        lambda: list(Collection.objects.annotate(live_count=Count('products')).values('id', 'title', 'live_count'))
+    ))
+    report('stored products_count', measure(
+        lambda: list(Collection.objects.values('id', 'title', 'products_count'))
+    ))
+    report('GET /store/collections/ (uncached)', measure(uncached_list))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,39 @@
+"""
+Render derivatives for every image in a folder and compare their size
+with the originals.
+
+    python -m benchmarks.image_derivatives path/to/sample/images
+"""
+import argparse
+import time
+from collections import defaultdict
+from pathlib import Path
+from store.images import render_derivatives
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('folder', type=Path)
+    args = parser.parse_args()
+
+    paths = sorted(p for p in args.folder.iterdir() if p.suffix.lower() in ('.jpg', '.jpeg', '.png', '.webp'))
+    original_bytes = 0
+    derivative_bytes = defaultdict(int)
+    timings = []
+    for path in paths:
+        original_bytes += path.stat().st_size
+        start = time.perf_counter()
+        with path.open('rb') as file:
+            derivatives = render_derivatives(file)
+        timings.append((time.perf_counter() - start) * 1000)
+        for size, formats in derivatives.items():
+            for extension, content in formats.items():
+                derivative_bytes[size, extension] += len(content)
+
+    print(f'{len(paths)} images, {sum(timings) / len(timings):.1f} ms each on average')
+    print(f'{"original":<20} {original_bytes / 1024:10.1f} KB')
+    for (size, extension), total in derivative_bytes.items():
+        share = total / original_bytes * 100
+        print(f'{size + " " + extension:<20} {total / 1024:10.1f} KB  ({share:.1f}% of original)')
+
+if __name__ == '__main__':
+    main()
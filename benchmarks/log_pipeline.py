@@ -0,0 +1,97 @@
+"""
+Compare request latency with synchronous file/console handlers against the
+queue-based pipeline in core.log, with every request logging at INFO from
+several threads at once.
+
+    python -m benchmarks.log_pipeline --threads 8 --records 20
+"""
+import argparse
+import logging.config
+import os
+import statistics
+import tempfile
+import threading
+import time
+from benchmarks.utils import report, setup
+
+def handlers(directory):
+    return {
+        'console': {
+            'class': 'logging.StreamHandler',
+            'stream': open(os.devnull, 'w'),
+            'formatter': 'verbose'
+        },
+        'file': {
+            'class': 'core.log.SharedRotatingFileHandler',
+            'filename': os.path.join(directory, 'general.log'),
+            'maxBytes': 10 * 1024 * 1024,
+            'backupCount': 5,
+            'formatter': 'json'
+        },
+    }
+
+def configure(mode, directory, maxsize):
+    """Configure LOGGING with the handlers called directly or behind the queue."""
+    from django.conf import settings
+
+    config = {**settings.LOGGING, 'handlers': handlers(directory)}
+    if mode == 'sync':
+        for handler in config['handlers'].values():
+            handler['filters'] = ['request_context']
+        root = ['console', 'file']
+    else:
+        config['handlers']['queue'] = {
+            **settings.LOGGING['handlers']['queue'],
+            'maxsize': maxsize,
+        }
+        root = ['queue']
+    config['loggers'] = {'': {'handlers': root, 'level': 'INFO'}}
+    logging.config.dictConfig(config)
+
+def run(threads, requests, records):
+    from django.test import Client
+
+    logger = logging.getLogger('benchmarks.log_pipeline')
+    timings = []
+
+    def worker():
+        client = Client()
+        for i in range(requests):
+            start = time.perf_counter()
+            client.get('/store/collections/')
+            for n in range(records):
+                logger.info('Handled step %d of request %d', n, i, extra={'step': n})
+            timings.append((time.perf_counter() - start) * 1000)
+
+    pool = [threading.Thread(target=worker) for _ in range(threads)]
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    return statistics.median(timings), max(timings)
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--records', type=int, default=20, help='INFO records logged per request')
+    parser.add_argument('--maxsize', type=int, default=10_000)
+    args = parser.parse_args()
+
+    setup()
+    from django.conf import settings
+    from django.test import override_settings
+
+    with override_settings(QUERY_PROFILING_SAMPLE_RATE=1.0), tempfile.TemporaryDirectory() as directory:
+        for mode in ('sync', 'queue'):
+            configure(mode, directory, args.maxsize)
+            timings = run(args.threads, args.requests, args.records)
+            report(f'{mode}, {args.threads} threads, {args.records} records', timings)
+            if mode == 'queue':
+                handler = logging.getLogger().handlers[0]
+                handler.stop()
+                print(f'dropped {handler.dropped} records')
+        logging.config.dictConfig(settings.LOGGING)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+"""
+Compare the dev and prod settings: process startup (interpreter, django.setup(),
+URL conf and middleware chain) and per-request overhead through the test
+client.
+
+    python -m benchmarks.middleware --settings storefront.settings.dev storefront.settings.prod
+
+Each settings module is benchmarked in its own process, so prod.py needs
+SECRET_KEY in the environment.
+"""
+import argparse
+import os
+import subprocess
+import sys
+from benchmarks.utils import measure, report, setup
+
+PATHS = ['/store/collections/', '/store/products/1/']
+
+def load():
+    """Build everything a worker builds before serving its first request."""
+    setup()
+    from django.core.wsgi import get_wsgi_application
+    from django.urls import get_resolver
+
+    get_wsgi_application()
+    get_resolver().url_patterns
+
+def serve(repeat):
+    load()
+    from django.conf import settings
+    from django.test import Client
+
+    print(f'{settings.SETTINGS_MODULE}: {len(settings.MIDDLEWARE)} middleware')
+    client = Client()
+    for path in PATHS:
+        # The first request fills the response cache, so this is middleware
+        # and view dispatch more than database time.
+        client.get(path)
+        report(f'GET {path}', measure(lambda: client.get(path), repeat))
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--settings', nargs='+', default=['storefront.settings.dev', 'storefront.settings.prod'])
+    parser.add_argument('--repeat', type=int, default=200)
+    parser.add_argument('--startups', type=int, default=5)
+    parser.add_argument('--child', choices=['load', 'serve'])
+    args = parser.parse_args()
+
+    if args.child == 'load':
+        return load()
+    if args.child == 'serve':
+        return serve(args.repeat)
+
+    for module in args.settings:
+        env = {**os.environ, 'DJANGO_SETTINGS_MODULE': module}
+        child = [sys.executable, '-m', 'benchmarks.middleware', '--repeat', str(args.repeat), '--child']
+        report(f'{module} startup', measure(
+            lambda: subprocess.run(child + ['load'], env=env, check=True), args.startups
+        ))
+        subprocess.run(child + ['serve'], env=env, check=True)
+
+if __name__ == '__main__':
+    main()
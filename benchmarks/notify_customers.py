@@ -0,0 +1,55 @@
+"""
+Measure notify_customers throughput for several chunk sizes, running the
+chunk tasks inline. Uses Django's locmem email backend unless --smtp is
+given, in which case EMAIL_HOST/EMAIL_PORT should point at a local SMTP
+stand-in (e.g. `python -m aiosmtpd -n -l localhost:2525`).
+
+    python -m benchmarks.notify_customers --customers 10000 --chunk-sizes 100 500 2000
+"""
+import argparse
+import time
+from benchmarks.utils import setup
+
+def seed_customers(count, batch_size=5_000):
+    from uuid import uuid4
+    from core.models import User
+    from store.models import Customer
+
+    for start in range(Customer.objects.count(), count, batch_size):
+        users = User.objects.bulk_create([
+            User(username=name, email=f'{name}@example.com')
+            for name in (uuid4().hex for _ in range(min(batch_size, count - start)))
+        ])
+        Customer.objects.bulk_create([Customer(user=user) for user in users])
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--customers', type=int, default=10_000)
+    parser.add_argument('--chunk-sizes', type=int, nargs='+', default=[100, 500, 2000])
+    parser.add_argument('--smtp', action='store_true')
+    args = parser.parse_args()
+
+    setup()
+    from django.core import mail
+    from django.test.utils import override_settings
+    from playground import tasks
+    from store.models import Customer
+
+    seed_customers(args.customers)
+    recipients = Customer.objects.exclude(user__email='').count()
+    tasks.send_customer_emails.delay = tasks.send_customer_emails
+    backend = 'django.core.mail.backends.smtp.EmailBackend' if args.smtp \
+        else 'django.core.mail.backends.locmem.EmailBackend'
+
+    for chunk_size in args.chunk_sizes:
+        with override_settings(EMAIL_BACKEND=backend,
+                               NOTIFY_CUSTOMERS_CHUNK_SIZE=chunk_size,
+                               NOTIFY_CUSTOMERS_RATE_LIMIT=None):
+            mail.outbox = []
+            start = time.perf_counter()
+            tasks.notify_customers('Hello World')
+            elapsed = time.perf_counter() - start
+        print(f'chunk size {chunk_size:>6}: {recipients / elapsed:10.1f} emails/s ({elapsed:.2f} s)')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,52 @@
+"""
+Seed orders and time streaming them out, with peak memory.
+
+    python -m benchmarks.order_export --orders 100000 --format csv
+"""
+import argparse
+import time
+from benchmarks.utils import seed_products, setup
+
+def seed_orders(count, items_per_order, batch_size=5_000):
+    from uuid import uuid4
+    from core.models import User
+    from store.models import Order, OrderItem, Product
+
+    name = uuid4().hex
+    customer = User.objects.create_user(username=name, email=f'{name}@example.com').customer
+    product_ids = list(Product.objects.values_list('pk', flat=True)[:items_per_order])
+    for start in range(0, count, batch_size):
+        orders = Order.objects.bulk_create([Order(customer=customer) for _ in range(min(batch_size, count - start))])
+        if orders[0].pk is None:
+            orders = Order.objects.filter(customer=customer).order_by('-pk')[:len(orders)]
+        OrderItem.objects.bulk_create([
+            OrderItem(order=order, product_id=product_id, quantity=2, unit_price=10)
+            for order in orders for product_id in product_ids
+        ])
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--orders', type=int, default=100_000)
+    parser.add_argument('--items', type=int, default=3)
+    parser.add_argument('--format', choices=['csv', 'jsonl'], default='csv')
+    args = parser.parse_args()
+
+    setup()
+    from store.catalog import peak_rss_kb
+    from store.exports import export_orders
+    from store.models import Order
+
+    seed_products(args.items)
+    seed_orders(args.orders, args.items)
+
+    start = time.perf_counter()
+    size = 0
+    for chunk in export_orders(Order.objects.all(), args.format):
+        size += len(chunk)
+    seconds = time.perf_counter() - start
+    count = Order.objects.count()
+    print(f'{count} orders, {size / 2**20:.1f} MB in {seconds:.2f}s ({count / seconds:.0f} orders/s)')
+    print(f'Peak RSS: {peak_rss_kb() / 1024:.1f} MB')
+
+if __name__ == '__main__':
+    main()
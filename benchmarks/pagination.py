@@ -0,0 +1,33 @@
+"""
+Compare page-number and keyset pagination latency on a deep page.
+
+    python -m benchmarks.pagination --products 1000000 --page 500
+"""
+import argparse
+from benchmarks.utils import measure, report, seed_products, setup
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--products', type=int, default=1_000_000)
+    parser.add_argument('--page', type=int, default=500)
+    parser.add_argument('--ordering', default='unit_price')
+    args = parser.parse_args()
+
+    setup()
+    from django.test import Client
+
+    seed_products(args.products)
+    client = Client()
+
+    page_url = f'/store/products/?ordering={args.ordering}&page={args.page}'
+
+    # Walk the cursor chain to reach the same depth as ?page=N.
+    cursor_url = f'/store/products/?ordering={args.ordering}&cursor='
+    for _ in range(args.page - 1):
+        cursor_url = client.get(cursor_url).json()['next']
+
+    report(f'page-number, page {args.page}', measure(lambda: client.get(page_url)))
+    report(f'keyset, page {args.page}', measure(lambda: client.get(cursor_url)))
+
+if __name__ == '__main__':
+    main()
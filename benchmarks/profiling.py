@@ -0,0 +1,33 @@
+"""
+Measure the overhead of QueryProfilingMiddleware on the product list by
+timing it with profiling off and with every request profiled.
+
+    python -m benchmarks.profiling --products 10000
+"""
+import argparse
+from benchmarks.utils import measure, report, seed_products, setup
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--products', type=int, default=10_000)
+    parser.add_argument('--repeat', type=int, default=50)
+    args = parser.parse_args()
+
+    setup()
+    from django.core.cache import cache
+    from django.test import Client, override_settings
+
+    seed_products(args.products)
+    client = Client()
+
+    def uncached_list():
+        cache.clear()
+        client.get('/store/products/')
+
+    uncached_list()
+    for rate in (0.0, 1.0):
+        with override_settings(QUERY_PROFILING_SAMPLE_RATE=rate):
+            report(f'GET /store/products/ (sample rate {rate})', measure(uncached_list, args.repeat))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,58 @@
+"""
+Compare product listings ordered by rating with live review aggregates
+against the stored review summaries.
+
+    python -m benchmarks.reviews --products 10000 --reviews 1000000
+"""
+import argparse
+from benchmarks.utils import measure, report, seed_products, setup
+
+def seed_reviews(count, batch_size=10_000):
+    from random import choice, randint
+    from store.models import Product, Review
+
+    product_ids = list(Product.objects.values_list('pk', flat=True))
+    for start in range(Review.objects.count(), count, batch_size):
+        Review.objects.bulk_create([
+            Review(product_id=choice(product_ids), name='Benchmark', description='', rating=randint(1, 5))
+            for _ in range(min(batch_size, count - start))
+        ])
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--products', type=int, default=10_000)
+    parser.add_argument('--reviews', type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    setup()
+    from django.core.cache import cache
+    from django.core.management import call_command
+    from django.db.models import Avg, Count
+    from django.test import Client
+    from store.models import Product
+
+    seed_products(args.products)
+    seed_reviews(args.reviews)
+    # bulk_create skips the incremental maintenance.
+    call_command('rebuild_review_summaries')
+    client = Client()
+
+    def uncached_list():
+        cache.clear()
+        client.get('/store/products/?ordering=-average_rating')
+
+    report('aggregate per request, top 10', measure(lambda: list(
+        Product.objects
+            .annotate(reviews_count=Count('review'), average_rating=Avg('review__rating'))
+            .order_by('-average_rating', 'pk')
+            .values('id', 'reviews_count', 'average_rating')[:10]
+    ), repeat=5))
+    report('stored summary, top 10', measure(lambda: list(
+        Product.objects
+            .order_by('-review_summary__average_rating', 'pk')
+            .values('id', 'review_summary__count', 'review_summary__average_rating')[:10]
+    ), repeat=5))
+    report('GET /store/products/ by rating (uncached)', measure(uncached_list, repeat=5))
+
+if __name__ == '__main__':
+    main()
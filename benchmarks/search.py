@@ -0,0 +1,36 @@
+"""
+Compare full-text and icontains product search latency.
+
+    python -m benchmarks.search --sizes 100000 1000000 --term espresso
+"""
+import argparse
+from benchmarks.utils import measure, report, seed_products, setup
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100_000, 1_000_000])
+    parser.add_argument('--term', default='espresso')
+    args = parser.parse_args()
+
+    setup()
+    from django.test import Client
+    from store import search
+
+    client = Client()
+    url = f'/store/products/?search={args.term}'
+    backend = search.get_search_backend()
+    if backend is None:
+        print('No full-text index for this database; only icontains will be measured.')
+
+    for size in sorted(args.sizes):
+        seed_products(size)
+        if backend is not None:
+            backend.rebuild()
+            report(f'full-text, {size} products', measure(lambda: client.get(url)))
+
+        search.get_search_backend = lambda: None
+        report(f'icontains, {size} products', measure(lambda: client.get(url)))
+        search.get_search_backend = lambda: backend
+
+if __name__ == '__main__':
+    main()
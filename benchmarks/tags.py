@@ -0,0 +1,52 @@
+"""
+Compare fetching tags for a page of products one product at a time with
+the batch lookup and with the prefetch ProductViewSet uses.
+
+    python -m benchmarks.tags --products 100 --tagged-items 1000000
+"""
+import argparse
+from benchmarks.utils import WORDS, measure, report, seed_products, setup
+
+def seed_tags(count, batch_size=10_000):
+    from random import choice
+    from django.contrib.contenttypes.models import ContentType
+    from store.models import Product
+    from tags.models import Tag, TaggedItem
+
+    tag_ids = [Tag.objects.get_or_create(label=word)[0].pk for word in WORDS]
+    product_ids = list(Product.objects.values_list('pk', flat=True))
+    content_type = ContentType.objects.get_for_model(Product)
+    for start in range(TaggedItem.objects.count(), count, batch_size):
+        TaggedItem.objects.bulk_create([
+            TaggedItem(tag_id=choice(tag_ids), content_type=content_type, object_id=choice(product_ids))
+            for _ in range(min(batch_size, count - start))
+        ])
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--products', type=int, default=100)
+    parser.add_argument('--tagged-items', type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    setup()
+    from django.db.models import Prefetch, prefetch_related_objects
+    from store.models import Product
+    from tags.models import TaggedItem
+
+    seed_products(10_000)
+    seed_tags(args.tagged_items)
+    ids = list(Product.objects.values_list('pk', flat=True)[:args.products])
+    tagged_items = Prefetch('tagged_items', queryset=TaggedItem.objects.select_related('tag'))
+
+    report(f'get_tags_for x {args.products}', measure(
+        lambda: [list(TaggedItem.objects.get_tags_for(Product, pk)) for pk in ids]
+    ))
+    report(f'get_tags_for_many({args.products})', measure(
+        lambda: TaggedItem.objects.get_tags_for_many(Product, ids)
+    ))
+    report(f'prefetch tagged_items of {args.products}', measure(
+        lambda: prefetch_related_objects(list(Product.objects.filter(pk__in=ids)), tagged_items)
+    ))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,49 @@
+import os
+import statistics
+import time
+import django
+
+def setup():
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'storefront.settings.dev')
+    django.setup()
+
+    from django.test.utils import setup_test_environment
+    setup_test_environment()
+
+def measure(fn, repeat=20):
+    """Return (median, max) wall time of fn() in milliseconds."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings), max(timings)
+
+def report(label, timings):
+    median, worst = timings
+    print(f'{label:<40} median {median:8.2f} ms   max {worst:8.2f} ms')
+
+WORDS = (
+    'espresso grinder kettle mug filter roast bean blend dark light organic '
+    'single origin decaf ceramic steel glass travel cold brew pour over'
+).split()
+
+def seed_products(count, batch_size=10_000):
+    """Top the product table up to `count` rows."""
+    from decimal import Decimal
+    from random import randint, sample
+    from store.models import Collection, Product
+
+    collection = Collection.objects.first() or Collection.objects.create(title='Benchmark')
+    existing = Product.objects.count()
+    for start in range(existing, count, batch_size):
+        Product.objects.bulk_create([
+            Product(
+                title=f'Product {i}',
+                slug=f'product-{i}',
+                description=' '.join(sample(WORDS, 6)),
+                unit_price=Decimal(randint(100, 99_999)) / 100,
+                inventory=randint(1, 100),
+                collection=collection,
+            ) for i in range(start, min(start + batch_size, count))
+        ])
@@ -1,6 +1,8 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
+from django.contrib.admin.widgets import AutocompleteSelect
 from django.contrib.contenttypes.admin import GenericTabularInline
+from django.contrib.contenttypes.forms import BaseGenericInlineFormSet
 from store.admin import ProductAdmin, ProductImageInline
 from store.models import Product
 from tags.models import TaggedItem
@@ -18,9 +20,44 @@ class UserAdmin(BaseUserAdmin):
         ),
     )
 
+class PreloadedAutocompleteSelect(AutocompleteSelect):
+    """
+    AutocompleteSelect that labels its selected option from `preloaded`
+    instead of querying for it, which it would otherwise do once per row.
+    """
+    preloaded = None
+
+    def optgroups(self, name, value, attr=None):
+        obj = self.preloaded
+        if obj is None or [str(v) for v in value] != [str(obj.pk)]:
+            return super().optgroups(name, value, attr)
+        options = []
+        if not self.is_required:
+            options.append(self.create_option(name, '', '', False, 0))
+        options.append(self.create_option(
+            name, obj.pk, self.choices.field.label_from_instance(obj), True, len(options)
+        ))
+        return [(None, options, 0)]
+
+class TaggedItemFormSet(BaseGenericInlineFormSet):
+    def _construct_form(self, i, **kwargs):
+        form = super()._construct_form(i, **kwargs)
+        if form.instance.tag_id is not None:
+            form.fields['tag'].widget.widget.preloaded = form.instance.tag
+        return form
+
 class TagInline(GenericTabularInline):
     autocomplete_fields = ['tag']
     model = TaggedItem
+    formset = TaggedItemFormSet
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('tag')
+
+    def formfield_for_foreignkey(self, db_field, request, **kwargs):
+        if db_field.name == 'tag':
+            kwargs['widget'] = PreloadedAutocompleteSelect(db_field, self.admin_site, using=kwargs.get('using'))
+        return super().formfield_for_foreignkey(db_field, request, **kwargs)
 
 class CustomProductAdmin(ProductAdmin):
     inlines = [TagInline, ProductImageInline]
@@ -0,0 +1,169 @@
+"""
+JWT authentication that caches who a token belongs to.
+
+The stock JWTAuthentication loads the user on every request. Here the
+user's fields and customer id are cached by token id (the jti claim) in
+two layers: a small in-process LRU (JWT_USER_LOCAL_CACHE_TIMEOUT) in
+front of the shared cache (JWT_USER_CACHE_TIMEOUT, never past the token's
+expiry). Entries carry the user's version, which `forget_user()` bumps
+when the user or their customer changes; `forget_token()` drops a single
+token. Other processes see a change once their local entry expires.
+
+The customer id is set as `request.customer_id`.
+"""
+import threading
+import time
+from collections import OrderedDict
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, router, transaction
+from django.db.models import F
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from store.cache import bump
+
+DEFAULT_TIMEOUT = 5 * 60
+DEFAULT_LOCAL_TIMEOUT = 30
+LOCAL_CACHE_SIZE = 1024
+
+
+def token_key(jti):
+    return f'core:auth:token:{jti}'
+
+
+def user_version(user_id):
+    return f'core:auth:version:user:{int(user_id)}'
+
+
+class LocalCache:
+    """Thread-safe LRU of at most `maxsize` entries, each with its own expiry."""
+    def __init__(self, maxsize=LOCAL_CACHE_SIZE):
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            item = self.entries.get(key)
+            if item is None:
+                return None
+            expires, value = item
+            if expires <= time.monotonic():
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, timeout):
+        with self.lock:
+            self.entries[key] = (time.monotonic() + timeout, value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+
+    def discard(self, key):
+        with self.lock:
+            self.entries.pop(key, None)
+
+    def discard_where(self, predicate):
+        with self.lock:
+            for key in [key for key, (_, value) in self.entries.items() if predicate(value)]:
+                del self.entries[key]
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+local_cache = LocalCache()
+
+
+def forget_user(user_id):
+    """Make every cached token of `user_id` load the user again."""
+    local_cache.discard_where(lambda entry: entry['user_id'] == user_id)
+    keys = [user_version(user_id)]
+    bump(keys)
+    # Again after commit, in case a concurrent request cached the old row.
+    if connection.in_atomic_block:
+        transaction.on_commit(lambda: bump(keys))
+
+
+def forget_token(jti):
+    local_cache.discard(token_key(jti))
+    cache.delete(token_key(jti))
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    def authenticate(self, request):
+        result = super().authenticate(request)
+        if result is not None:
+            user, token = result
+            request.customer_id = getattr(user, '_customer_id', None)
+        return result
+
+    def get_user(self, validated_token):
+        jti = validated_token.get(api_settings.JTI_CLAIM)
+        if jti is None or api_settings.CHECK_REVOKE_TOKEN:
+            # Revocation compares against the password hash, which isn't cached.
+            return super().get_user(validated_token)
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError as e:
+            raise InvalidToken(_('Token contained no recognizable user identification')) from e
+
+        key = token_key(jti)
+        entry = local_cache.get(key)
+        if entry is None:
+            entry = self.get_entry(key, user_id, validated_token)
+            local_cache.set(key, entry, getattr(settings, 'JWT_USER_LOCAL_CACHE_TIMEOUT', DEFAULT_LOCAL_TIMEOUT))
+
+        user = self.user_model.from_db(
+            router.db_for_read(self.user_model),
+            list(entry['fields']),
+            list(entry['fields'].values())
+        )
+        user._customer_id = entry['customer_id']
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed(_('User is inactive'), code='user_inactive')
+        return user
+
+    def get_entry(self, key, user_id, validated_token):
+        version_key = user_version(user_id)
+        values = cache.get_many([key, version_key])
+        version = values.get(version_key)
+        entry = values.get(key)
+        if entry is not None and version is not None and entry['version'] == version:
+            return entry
+
+        if version is None:
+            version = time.time_ns()
+            cache.set(version_key, version, None)
+        entry = self.load(user_id)
+        entry['version'] = version
+        timeout = min(
+            getattr(settings, 'JWT_USER_CACHE_TIMEOUT', DEFAULT_TIMEOUT),
+            validated_token['exp'] - int(time.time())
+        )
+        if timeout > 0:
+            cache.set(key, entry, timeout)
+        return entry
+
+    def load(self, user_id):
+        """Return the fields (less the password) and customer id of a user."""
+        # The password is left deferred, so saving a cached user can't
+        # overwrite it.
+        fields = [
+            field.attname for field in self.user_model._meta.concrete_fields
+            if field.attname != 'password'
+        ]
+        try:
+            row = self.user_model.objects\
+                .annotate(customer_pk=F('customer__id'))\
+                .values(*fields, 'customer_pk')\
+                .get(**{api_settings.USER_ID_FIELD: user_id})
+        except self.user_model.DoesNotExist as e:
+            raise AuthenticationFailed(_('User not found'), code='user_not_found') from e
+        customer_id = row.pop('customer_pk')
+        return {'user_id': row['id'], 'fields': row, 'customer_id': customer_id}
@@ -0,0 +1,291 @@
+"""
+Non-blocking, structured logging.
+
+Request threads only put records on a bounded queue (BoundedQueueHandler);
+a QueueListener thread formats them and does the I/O. When the queue is
+full, records are dropped and counted rather than making the request wait,
+and a warning with the count goes out once there is room again.
+
+RequestContextMiddleware gives each request an id (X-Request-ID, taken from
+the request if the client sent one) and tracks the resolved view and the
+queries run so far; RequestContextFilter copies them onto every record
+logged while the request is handled, and JsonFormatter writes them out:
+
+    {"time": "...", "level": "INFO", "logger": "playground.views",
+     "message": "Calling httpbin", "request_id": "...",
+     "view": "HelloView.get", "db_queries": 2, "db_ms": 1.4}
+
+SharedRotatingFileHandler rotates a log file that every worker process
+appends to, by size, with one process at a time doing the rollover.
+"""
+import copy
+import json
+import logging
+import os
+import queue
+import threading
+import time
+import uuid
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from django.db import connections
+from .profiling import endpoint_name
+
+try:
+    import fcntl
+except ImportError: # Windows
+    fcntl = None
+
+try:
+    from logging import getHandlerByName
+except ImportError: # Python < 3.12
+    def getHandlerByName(name):
+        return logging._handlers.get(name)
+
+DEFAULT_MAXSIZE = 10_000
+REQUEST_ID_HEADER = 'X-Request-ID'
+REQUEST_ID_MAX_LENGTH = 64
+
+request_context = ContextVar('request_context', default=None)
+
+
+class RequestContext:
+    def __init__(self, request_id):
+        self.request_id = request_id
+        self.view = None
+        self.db_queries = 0
+        self.db_time = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - start
+            self.db_queries += 1
+
+
+class RequestContextMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request_id = request.headers.get(REQUEST_ID_HEADER, '')[:REQUEST_ID_MAX_LENGTH] or uuid.uuid4().hex
+        context = RequestContext(request_id)
+        request.id = request_id
+        token = request_context.set(context)
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(context))
+                response = self.get_response(request)
+        finally:
+            request_context.reset(token)
+        response[REQUEST_ID_HEADER] = request_id
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        context = request_context.get()
+        if context is not None:
+            context.view = endpoint_name(request)
+
+
+class RequestContextFilter(logging.Filter):
+    """Add request_id, view, db_queries and db_ms to records (None outside requests)."""
+    def filter(self, record):
+        context = request_context.get()
+        if context is None:
+            record.request_id = record.view = record.db_queries = record.db_ms = None
+        else:
+            record.request_id = context.request_id
+            record.view = context.view
+            record.db_queries = context.db_queries
+            record.db_ms = round(context.db_time * 1000, 3)
+        return True
+
+
+# LogRecord attributes that aren't `extra` fields.
+RECORD_ATTRS = set(vars(logging.LogRecord('', 0, '', 0, '', None, None))) | {'message', 'asctime'}
+CONTEXT_ATTRS = ('request_id', 'view', 'db_queries', 'db_ms')
+
+
+class JsonFormatter(logging.Formatter):
+    """Format records as one JSON object per line, with any `extra` fields."""
+    def format(self, record):
+        entry = {
+            'time': datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        for key in CONTEXT_ATTRS:
+            entry[key] = getattr(record, key, None)
+        for key, value in vars(record).items():
+            if key not in RECORD_ATTRS and key not in entry:
+                entry[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry['exc_info'] = record.exc_text
+        if record.stack_info:
+            entry['stack_info'] = record.stack_info
+        return json.dumps(entry, default=str)
+
+
+class BlockingStopQueueListener(QueueListener):
+    def enqueue_sentinel(self):
+        # The stock listener uses put_nowait(), which fails on a full
+        # bounded queue; at shutdown waiting for the writer is fine.
+        self.queue.put(self._sentinel)
+
+
+class BoundedQueueHandler(QueueHandler):
+    """
+    Hand records to `handlers` (names from LOGGING) through a queue of at
+    most `maxsize` records, written out by a background thread.
+
+    The thread starts with the first record in each process, so it also
+    runs in workers forked after logging was configured.
+    """
+    def __init__(self, handlers, maxsize=DEFAULT_MAXSIZE):
+        super().__init__(queue.Queue(maxsize))
+        self.handler_names = handlers
+        self.maxsize = maxsize
+        self.listener = None
+        self.pid = None
+        self.dropped = 0
+        self.reported = 0
+        self.start_lock = threading.Lock()
+        self.exception_formatter = logging.Formatter()
+
+    def start(self):
+        with self.start_lock:
+            if self.pid == os.getpid():
+                return
+            handlers = []
+            for name in self.handler_names:
+                handler = getHandlerByName(name)
+                if handler is None:
+                    raise ValueError(f'No logging handler named {name!r}')
+                handlers.append(handler)
+            # Whatever was queued before a fork belongs to the parent.
+            self.queue = queue.Queue(self.maxsize)
+            self.listener = BlockingStopQueueListener(self.queue, *handlers, respect_handler_level=True)
+            self.listener.start()
+            self.pid = os.getpid()
+
+    def stop(self):
+        """Write out what is queued and stop the background thread."""
+        with self.start_lock:
+            if self.listener is not None and self.pid == os.getpid():
+                self.listener.stop()
+            self.listener = self.pid = None
+
+    def close(self):
+        self.stop()
+        super().close()
+
+    def prepare(self, record):
+        # Like QueueHandler.prepare(), but without folding the traceback
+        # into the message, so formatters downstream can lay it out.
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        record.msg, record.args = record.message, None
+        if record.exc_info:
+            record.exc_text = self.exception_formatter.formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        if self.pid != os.getpid():
+            self.start()
+        try:
+            if self.dropped > self.reported:
+                self.report_dropped()
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def report_dropped(self):
+        dropped = self.dropped - self.reported
+        record = logging.LogRecord(
+            __name__, logging.WARNING, __file__, 0,
+            'Log queue full, dropped %d records', (dropped,), None
+        )
+        record.dropped = dropped
+        self.filter(record)
+        self.queue.put_nowait(self.prepare(record))
+        self.reported += dropped
+
+
+class SharedRotatingFileHandler(RotatingFileHandler):
+    """
+    RotatingFileHandler for a file several processes append to.
+
+    Each record is written under an exclusive lock on `<filename>.lock`,
+    after reopening the file if another process has rotated it, so the
+    file is rotated once when it reaches `maxBytes`, not once per process.
+    """
+    def __init__(self, filename, *args, **kwargs):
+        super().__init__(filename, *args, **kwargs)
+        self.lock_path = self.baseFilename + '.lock'
+        self.lock_file = None
+        self.lock_pid = None
+
+    @contextmanager
+    def interprocess_lock(self):
+        if fcntl is None:
+            yield
+            return
+        # flock() locks are shared with forked children through the open
+        # file, so each process opens its own.
+        if self.lock_pid != os.getpid():
+            self.lock_file = open(self.lock_path, 'a')
+            self.lock_pid = os.getpid()
+        fcntl.flock(self.lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(self.lock_file, fcntl.LOCK_UN)
+
+    def reopen_if_rotated(self):
+        if self.stream is None:
+            return
+        try:
+            current = os.stat(self.baseFilename)
+        except FileNotFoundError:
+            current = None
+        opened = os.fstat(self.stream.fileno())
+        if current is None or (current.st_dev, current.st_ino) != (opened.st_dev, opened.st_ino):
+            self.stream.close()
+            self.stream = None # reopened by the next write
+
+    def shouldRollover(self, record):
+        if self.maxBytes <= 0:
+            return False
+        if self.stream is None:
+            self.stream = self._open()
+        # tell() misses what other processes wrote since our last write.
+        size = os.fstat(self.stream.fileno()).st_size
+        return size + len(self.format(record)) + len(self.terminator) >= self.maxBytes
+
+    def emit(self, record):
+        # Writes take the lock too, so none lands in a file being rotated;
+        # they happen on the queue's listener thread, not in requests.
+        try:
+            with self.interprocess_lock():
+                self.reopen_if_rotated()
+                if self.shouldRollover(record):
+                    self.doRollover()
+                logging.FileHandler.emit(self, record)
+        except Exception:
+            self.handleError(record)
+
+    def close(self):
+        with self.lock:
+            if self.lock_file is not None and self.lock_pid == os.getpid():
+                self.lock_file.close()
+            self.lock_file = self.lock_pid = None
+        super().close()
@@ -0,0 +1,209 @@
+"""
+Per-request query profiling.
+
+QueryProfilingMiddleware profiles a sample of requests
+(QUERY_PROFILING_SAMPLE_RATE, 0 to turn it off) by wrapping the database
+connections with an execute_wrapper. Each profile records, for the
+resolved view and action:
+
+    queries         number of statements run
+    db_ms           time spent in them
+    serializer_ms   time building serializer data, less its queries
+    render_ms       time rendering the response, less its queries
+    app_ms          the rest: views, permissions, pagination and the
+                    middleware below this one
+    bytes           size of the response body
+
+Serializers are timed where DRF builds their data (BaseSerializer.data,
+hooked by CoreConfig.ready()), responses by rendering them in
+process_template_response.
+
+Statements are grouped by shape, with parameters and IN lists collapsed;
+a shape repeated QUERY_PROFILING_DUPLICATE_THRESHOLD times or more in one
+request is reported as a likely N+1. Profiles are logged, returned in a
+Server-Timing header and sent as `request_profiled`.
+"""
+import logging
+import random
+import re
+import time
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+from functools import lru_cache, wraps
+from django.conf import settings
+from django.db import connections
+from django.dispatch import Signal
+
+logger = logging.getLogger(__name__)
+
+request_profiled = Signal()
+
+active_profile = ContextVar('active_profile', default=None)
+
+DEFAULT_SAMPLE_RATE = 0.0
+DEFAULT_DUPLICATE_THRESHOLD = 5
+
+IN_LIST = re.compile(r'\((?:\s*%s\s*,)+\s*%s\s*\)')
+LITERAL = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+
+
+@lru_cache(maxsize=1024)
+def sql_shape(sql):
+    """Return `sql` with literals and IN lists collapsed, for grouping."""
+    return IN_LIST.sub('(%s, ...)', LITERAL.sub('%s', sql))
+
+
+def endpoint_name(request):
+    match = request.resolver_match
+    if match is None:
+        return None
+    view = match.func
+    cls = getattr(view, 'cls', None)
+    if cls is None:
+        return match.view_name
+    actions = getattr(view, 'actions', None) or {}
+    action = actions.get(request.method.lower(), request.method.lower())
+    return f'{cls.__name__}.{action}'
+
+
+class QueryProfile:
+    def __init__(self, method, path):
+        self.method = method
+        self.path = path
+        self.endpoint = None
+        self.queries = 0
+        self.db_time = 0.0
+        self.serializer_time = 0.0
+        self.render_time = 0.0
+        self.total_time = 0.0
+        self.bytes = 0
+        self.shapes = Counter()
+        self.serializing = False
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - start
+            self.queries += 1
+            self.shapes[sql_shape(sql)] += 1
+
+    @contextmanager
+    def measure(self, attr):
+        """Add the time spent in the block, less its queries, to `attr`."""
+        start, db_time = time.perf_counter(), self.db_time
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start - (self.db_time - db_time)
+            setattr(self, attr, getattr(self, attr) + max(elapsed, 0))
+
+    @property
+    def db_ms(self):
+        return self.db_time * 1000
+
+    @property
+    def serializer_ms(self):
+        return self.serializer_time * 1000
+
+    @property
+    def render_ms(self):
+        return self.render_time * 1000
+
+    @property
+    def app_ms(self):
+        return max(self.total_time - self.db_time - self.serializer_time - self.render_time, 0) * 1000
+
+    def duplicates(self, threshold):
+        """Return [(shape, count)] of statements run `threshold` times or more."""
+        return [(shape, count) for shape, count in self.shapes.most_common() if count >= threshold]
+
+    def server_timing(self):
+        return (
+            f'db;dur={self.db_ms:.1f};desc="{self.queries} queries", '
+            f'serializer;dur={self.serializer_ms:.1f}, '
+            f'render;dur={self.render_ms:.1f}, '
+            f'app;dur={self.app_ms:.1f}'
+        )
+
+    def __str__(self):
+        return (
+            f'{self.endpoint or self.path} {self.method}: {self.queries} queries, '
+            f'{self.db_ms:.1f} ms db, {self.serializer_ms:.1f} ms serializer, '
+            f'{self.render_ms:.1f} ms render, {self.app_ms:.1f} ms app, {self.bytes} bytes'
+        )
+
+
+def time_serializers():
+    """Count time spent in BaseSerializer.data towards the active profile."""
+    from rest_framework.serializers import BaseSerializer
+
+    data = BaseSerializer.data.fget
+
+    @wraps(data)
+    def timed_data(serializer):
+        profile = active_profile.get()
+        # Nested serializers build their data inside the outer one's.
+        if profile is None or profile.serializing:
+            return data(serializer)
+        profile.serializing = True
+        try:
+            with profile.measure('serializer_time'):
+                return data(serializer)
+        finally:
+            profile.serializing = False
+
+    BaseSerializer.data = property(timed_data)
+
+
+class QueryProfilingMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        sample_rate = getattr(settings, 'QUERY_PROFILING_SAMPLE_RATE', DEFAULT_SAMPLE_RATE)
+        if not sample_rate or random.random() >= sample_rate:
+            return self.get_response(request)
+
+        profile = QueryProfile(request.method, request.path)
+        token = active_profile.set(profile)
+        start = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(profile))
+                response = self.get_response(request)
+        finally:
+            active_profile.reset(token)
+        profile.total_time = time.perf_counter() - start
+        profile.endpoint = endpoint_name(request)
+        if not response.streaming:
+            profile.bytes = len(response.content)
+
+        self.report(profile)
+        response['Server-Timing'] = profile.server_timing()
+        request_profiled.send(sender=self.__class__, profile=profile)
+        return response
+
+    def process_template_response(self, request, response):
+        # Render here, rather than after the middleware chain, to time it;
+        # Django's own render() call is then a no-op.
+        profile = active_profile.get()
+        if profile is not None:
+            with profile.measure('render_time'):
+                response.render()
+        return response
+
+    def report(self, profile):
+        threshold = getattr(settings, 'QUERY_PROFILING_DUPLICATE_THRESHOLD', DEFAULT_DUPLICATE_THRESHOLD)
+        duplicates = profile.duplicates(threshold)
+        if not duplicates:
+            logger.info('%s', profile)
+            return
+        logger.warning(
+            '%s; repeated queries (likely N+1):\n%s',
+            profile,
+            '\n'.join(f'  {count} x {shape}' for shape, count in duplicates)
+        )
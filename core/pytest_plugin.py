@@ -0,0 +1,68 @@
+"""
+pytest plugin enforcing per-request query budgets.
+
+    @pytest.mark.query_budget(5)
+    def test_list_products(api_client):
+        api_client.get('/store/products/')
+
+fails the test if any request it makes runs more than 5 queries; pass
+endpoint='ProductViewSet.list' to hold only that endpoint to the budget.
+Every request is profiled while a marked test runs. Enabled through
+`-p core.pytest_plugin` in pytest.ini.
+"""
+import pytest
+
+
+def pytest_configure(config):
+    config.addinivalue_line(
+        'markers',
+        'query_budget(max_queries, endpoint=None): fail if a request made by the test runs more queries'
+    )
+
+
+def over_budget(profiles, max_queries, endpoint=None):
+    """Return the profiles of `endpoint` (or of any request) that ran over budget."""
+    return [
+        profile for profile in profiles
+        if (endpoint is None or profile.endpoint == endpoint) and profile.queries > max_queries
+    ]
+
+
+def describe(profile):
+    lines = [str(profile)]
+    lines += [f'  {count} x {shape}' for shape, count in profile.shapes.most_common(5)]
+    return '\n'.join(lines)
+
+
+@pytest.fixture(autouse=True)
+def _query_budget(request):
+    marker = request.node.get_closest_marker('query_budget')
+    if marker is None:
+        yield
+        return
+
+    from django.test import override_settings
+    from core.profiling import QueryProfilingMiddleware, request_profiled
+
+    profiles = []
+
+    def collect(sender, profile, **kwargs):
+        profiles.append(profile)
+
+    request_profiled.connect(collect, sender=QueryProfilingMiddleware)
+    try:
+        with override_settings(QUERY_PROFILING_SAMPLE_RATE=1.0):
+            yield
+    finally:
+        request_profiled.disconnect(collect, sender=QueryProfilingMiddleware)
+
+    max_queries = marker.args[0]
+    endpoint = marker.kwargs.get('endpoint')
+    if endpoint is not None and not any(profile.endpoint == endpoint for profile in profiles):
+        pytest.fail(f'No request to {endpoint} was made')
+    over = over_budget(profiles, max_queries, endpoint)
+    if over:
+        pytest.fail(
+            f'Query budget of {max_queries} exceeded:\n' + '\n'.join(describe(profile) for profile in over),
+            pytrace=False
+        )
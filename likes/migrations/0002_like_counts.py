@@ -0,0 +1,64 @@
+# Generated by Django 5.2.18 on 2026-10-18 20:44
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Min
+
+
+def remove_duplicate_likes(apps, schema_editor):
+    LikedItem = apps.get_model('likes', 'LikedItem')
+    duplicates = LikedItem.objects \
+        .values('user_id', 'content_type_id', 'object_id') \
+        .annotate(count=Count('pk'), keep=Min('pk')) \
+        .filter(count__gt=1)
+    for row in duplicates.iterator():
+        LikedItem.objects \
+            .filter(user_id=row['user_id'], content_type_id=row['content_type_id'], object_id=row['object_id']) \
+            .exclude(pk=row['keep']) \
+            .delete()
+
+
+def count_likes(apps, schema_editor):
+    LikedItem = apps.get_model('likes', 'LikedItem')
+    LikeCount = apps.get_model('likes', 'LikeCount')
+    counts = LikedItem.objects \
+        .order_by() \
+        .values('content_type_id', 'object_id') \
+        .annotate(count=Count('pk'))
+    LikeCount.objects.bulk_create((LikeCount(**row) for row in counts.iterator()), batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contenttypes', '0002_remove_content_type_name'),
+        ('likes', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicate_likes, migrations.RunPython.noop),
+        migrations.CreateModel(
+            name='LikeCount',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('object_id', models.PositiveIntegerField()),
+                ('count', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='likeditem',
+            constraint=models.UniqueConstraint(fields=('user', 'content_type', 'object_id'), name='likes_likeditem_unique_user_object'),
+        ),
+        migrations.AddField(
+            model_name='likecount',
+            name='content_type',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='contenttypes.contenttype'),
+        ),
+        migrations.AddConstraint(
+            model_name='likecount',
+            constraint=models.UniqueConstraint(fields=('content_type', 'object_id'), name='likes_likecount_unique_object'),
+        ),
+        migrations.RunPython(count_likes, migrations.RunPython.noop),
+    ]
@@ -1,11 +1,107 @@
 from django.conf import settings
-from django.db import models
+from django.db import models, router, transaction
+from django.db.models import F, prefetch_related_objects
 from django.contrib.contenttypes.models import ContentType
 from django.contrib.contenttypes.fields import GenericForeignKey
 
 
+class LikedItemManager(models.Manager):
+    def like(self, user, obj):
+        """Like `obj` as `user`; return False if they already did."""
+        content_type = ContentType.objects.get_for_model(obj)
+        _, created = self.get_or_create(user=user, content_type=content_type, object_id=obj.pk)
+        return created
+
+    def unlike(self, user, obj):
+        """Take back `user`'s like of `obj`; return False if there was none."""
+        content_type = ContentType.objects.get_for_model(obj)
+        deleted, _ = self.filter(user=user, content_type=content_type, object_id=obj.pk).delete()
+        return bool(deleted)
+
+    def load_content_objects(self, items):
+        """Set content_object on each item with one query per content type."""
+        items = list(items)
+        prefetch_related_objects(items, 'content_object')
+        return items
+
+    def liked_by(self, user):
+        """Return `user`'s likes, newest first, with what they liked loaded."""
+        return self.load_content_objects(
+            self.filter(user=user).order_by('-id')
+        )
+
+    def get_likes_for_many(self, obj_type, obj_ids, user=None):
+        """
+        Return {object id: {'count': ..., 'liked': ...}} for every id, with
+        one query for the counts and one for what `user` liked.
+        """
+        content_type = ContentType.objects.get_for_model(obj_type)
+        obj_ids = list(obj_ids)
+        counts = dict(
+            LikeCount.objects
+                .filter(content_type=content_type, object_id__in=obj_ids)
+                .values_list('object_id', 'count')
+        )
+        liked = set()
+        if user is not None and user.is_authenticated:
+            liked = set(
+                self.filter(user=user, content_type=content_type, object_id__in=obj_ids)
+                    .values_list('object_id', flat=True)
+            )
+        return {
+            obj_id: {'count': counts.get(obj_id, 0), 'liked': obj_id in liked}
+            for obj_id in obj_ids
+        }
+
+
+class LikeCountManager(models.Manager):
+    def add(self, content_type_id, object_id, change):
+        if change > 0:
+            self.bulk_create(
+                [self.model(content_type_id=content_type_id, object_id=object_id)],
+                ignore_conflicts=True
+            )
+        self.filter(content_type_id=content_type_id, object_id=object_id) \
+            .update(count=F('count') + change)
+
+
 class LikedItem(models.Model):
+    objects = LikedItemManager()
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
     content_type = models.ForeignKey(ContentType, on_delete=models.CASCADE)
     object_id = models.PositiveIntegerField()
     content_object = GenericForeignKey()
+
+    def save(self, *args, **kwargs):
+        adding = self._state.adding
+        with transaction.atomic(using=kwargs.get('using') or router.db_for_write(LikedItem, instance=self)):
+            super().save(*args, **kwargs)
+            if adding:
+                LikeCount.objects.add(self.content_type_id, self.object_id, 1)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'content_type', 'object_id'],
+                name='likes_likeditem_unique_user_object'
+            ),
+        ]
+
+
+class LikeCount(models.Model):
+    """
+    Number of likes of an object, kept by LikedItem.save() and the
+    post_delete handler.
+    """
+    objects = LikeCountManager()
+    content_type = models.ForeignKey(ContentType, on_delete=models.CASCADE)
+    object_id = models.PositiveIntegerField()
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['content_type', 'object_id'],
+                name='likes_likecount_unique_object'
+            ),
+        ]
@@ -0,0 +1,9 @@
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+from likes.models import LikeCount, LikedItem
+
+@receiver(post_delete, sender=LikedItem)
+def decrement_like_count(sender, **kwargs):
+    # Also covers likes removed along with their user.
+    item = kwargs['instance']
+    LikeCount.objects.add(item.content_type_id, item.object_id, -1)
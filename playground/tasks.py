@@ -1,9 +1,94 @@
-from time import sleep
+import logging
+from time import sleep, time
 from celery import shared_task
+from django.conf import settings
+from django.core.cache import cache
+from django.core.mail import EmailMessage, get_connection
+from store.models import Customer
+
+LOCK_KEY = 'playground:notify_customers:lock'
+PENDING_KEY = 'playground:notify_customers:pending'
+# Refreshed as chunks are queued and sent, so this bounds the time
+# without progress before a crashed run's lock is given up.
+LOCK_TIMEOUT = 60 * 60
+
+logger = logging.getLogger(__name__)
 
 @shared_task
 def notify_customers(message):
-    print('Sending 10k emails...')
-    print(message)
-    sleep(10)
-    print('Emails were successfully sent!')
\ No newline at end of file
+    # Beat fires this on a schedule; skip the tick while a previous run's
+    # chunks are still sending.
+    if not cache.add(LOCK_KEY, True, LOCK_TIMEOUT):
+        logger.info('Previous notification run still in progress, skipping.')
+        return
+
+    # The run itself counts as pending until every chunk is queued.
+    cache.set(PENDING_KEY, 1, LOCK_TIMEOUT)
+    chunks = 0
+    for first_id, last_id in customer_id_ranges(settings.NOTIFY_CUSTOMERS_CHUNK_SIZE):
+        cache.incr(PENDING_KEY)
+        send_customer_emails.delay(message, first_id, last_id)
+        chunks += 1
+        extend_run()
+    finish_run()
+    logger.info('Queued %d chunks of customer emails.', chunks)
+
+@shared_task
+def send_customer_emails(message, first_id, last_id):
+    try:
+        emails = Customer.objects\
+            .filter(id__range=(first_id, last_id))\
+            .exclude(user__email='')\
+            .values_list('user__email', flat=True)
+        messages = [
+            EmailMessage(settings.NOTIFY_CUSTOMERS_SUBJECT, message, to=[email])
+            for email in emails
+        ]
+        batch_size = settings.NOTIFY_CUSTOMERS_RATE_LIMIT or len(messages) or 1
+        with get_connection() as connection:
+            for start in range(0, len(messages), batch_size):
+                batch = messages[start:start + batch_size]
+                throttle(len(batch))
+                connection.send_messages(batch)
+                extend_run()
+    finally:
+        finish_run()
+
+def customer_id_ranges(chunk_size):
+    """Yield (first id, last id) of consecutive chunks of customers."""
+    last_id = 0
+    while True:
+        ids = list(Customer.objects
+                   .filter(id__gt=last_id)
+                   .order_by('id')
+                   .values_list('id', flat=True)[:chunk_size])
+        if not ids:
+            return
+        yield ids[0], ids[-1]
+        last_id = ids[-1]
+
+def throttle(count):
+    """Wait until `count` more emails fit in the per-second budget shared by all workers."""
+    limit = settings.NOTIFY_CUSTOMERS_RATE_LIMIT
+    if not limit:
+        return
+    while True:
+        window = int(time())
+        key = f'playground:notify_customers:sent:{window}'
+        cache.add(key, 0, 2)
+        if cache.incr(key, count) <= limit:
+            return
+        sleep(max(window + 1 - time(), 0))
+
+def extend_run():
+    """Push back the expiry of a run that is still making progress."""
+    cache.touch(LOCK_KEY, LOCK_TIMEOUT)
+    cache.touch(PENDING_KEY, LOCK_TIMEOUT)
+
+def finish_run():
+    try:
+        pending = cache.decr(PENDING_KEY)
+    except ValueError:
+        pending = 0
+    if pending <= 0:
+        cache.delete(LOCK_KEY)
@@ -0,0 +1,78 @@
+import pytest
+from model_bakery import baker
+from django.core.cache import cache
+
+from core.models import User
+from playground import tasks
+
+
+@pytest.fixture(autouse=True)
+def run_inline(settings, monkeypatch):
+    settings.CACHES = {
+        'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}
+    }
+    settings.NOTIFY_CUSTOMERS_CHUNK_SIZE = 2
+    settings.NOTIFY_CUSTOMERS_RATE_LIMIT = None
+    cache.clear()
+    monkeypatch.setattr(tasks.send_customer_emails, 'delay', tasks.send_customer_emails)
+
+
+@pytest.fixture
+def customers():
+    return [baker.make(User).customer for _ in range(5)]
+
+
+@pytest.mark.django_db
+class TestNotifyCustomers:
+    def test_emails_every_customer_once(self, customers, mailoutbox):
+        tasks.notify_customers('Hello World')
+
+        assert sorted(m.to[0] for m in mailoutbox) == sorted(c.user.email for c in customers)
+        assert mailoutbox[0].body == 'Hello World'
+
+    def test_chunks_by_customer_id(self, customers):
+        ranges = list(tasks.customer_id_ranges(2))
+
+        ids = [c.id for c in customers]
+        assert ranges == [(ids[0], ids[1]), (ids[2], ids[3]), (ids[4], ids[4])]
+
+    def test_releases_lock_when_done(self, customers, mailoutbox):
+        tasks.notify_customers('Hello World')
+        tasks.notify_customers('Hello again')
+
+        assert len(mailoutbox) == 10
+
+    def test_skips_while_previous_run_in_progress(self, customers, mailoutbox):
+        cache.add(tasks.LOCK_KEY, True)
+
+        tasks.notify_customers('Hello World')
+
+        assert mailoutbox == []
+
+    def test_sending_extends_the_lock(self, customers, monkeypatch):
+        expiries = []
+        monkeypatch.setattr(tasks, 'finish_run', lambda: None)
+        monkeypatch.setattr(tasks, 'extend_run', lambda: expiries.append(cache.get(tasks.LOCK_KEY)))
+
+        tasks.notify_customers('Hello World')
+
+        # Three chunks queued, then sent.
+        assert expiries == [True] * 6
+
+    def test_extend_run_refreshes_lock_and_pending_count(self, monkeypatch):
+        touched = []
+        monkeypatch.setattr(cache, 'touch', lambda key, timeout: touched.append((key, timeout)))
+
+        tasks.extend_run()
+
+        assert touched == [(tasks.LOCK_KEY, tasks.LOCK_TIMEOUT), (tasks.PENDING_KEY, tasks.LOCK_TIMEOUT)]
+
+    def test_rate_limit_splits_sends(self, settings, customers, monkeypatch):
+        settings.NOTIFY_CUSTOMERS_CHUNK_SIZE = 5
+        settings.NOTIFY_CUSTOMERS_RATE_LIMIT = 2
+        throttled = []
+        monkeypatch.setattr(tasks, 'throttle', throttled.append)
+
+        tasks.notify_customers('Hello World')
+
+        assert throttled == [2, 2, 1]
@@ -0,0 +1,100 @@
+import asyncio
+import json
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Thread
+import httpx
+import pytest
+from asgiref.sync import async_to_sync
+from django.core.cache import cache
+
+from playground import upstream
+
+
+class DelayedHandler(BaseHTTPRequestHandler):
+    delay = 0.2
+    hits = 0
+
+    def do_GET(self):
+        type(self).hits += 1
+        time.sleep(self.delay)
+        body = json.dumps({'hits': self.hits}).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server(settings):
+    settings.CACHES = {
+        'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}
+    }
+    cache.clear()
+    DelayedHandler.hits, DelayedHandler.delay = 0, 0.2
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), DelayedHandler)
+    Thread(target=httpd.serve_forever, daemon=True).start()
+    yield f'http://127.0.0.1:{httpd.server_port}/delay'
+    httpd.shutdown()
+
+
+def run(coroutine):
+    async def main():
+        try:
+            return await coroutine
+        finally:
+            await upstream.get_client().aclose()
+    return async_to_sync(main)()
+
+
+def test_concurrent_misses_share_one_request(server):
+    async def get_concurrently():
+        return await asyncio.gather(*[upstream.get_json('key', server) for _ in range(5)])
+
+    results = run(get_concurrently())
+
+    assert results == [{'hits': 1}] * 5
+    assert DelayedHandler.hits == 1
+
+
+def test_cancelled_waiter_does_not_cancel_shared_request(server):
+    async def cancel_one_of_two():
+        first = asyncio.ensure_future(upstream.get_json('key', server))
+        second = asyncio.ensure_future(upstream.get_json('key', server))
+        await asyncio.sleep(0.05)
+        first.cancel()
+        return await second
+
+    assert run(cancel_one_of_two()) == {'hits': 1}
+    assert DelayedHandler.hits == 1
+
+
+def test_fresh_copy_is_served_from_cache(server):
+    run(upstream.get_json('key', server))
+
+    assert run(upstream.get_json('key', server)) == {'hits': 1}
+    assert DelayedHandler.hits == 1
+
+
+def test_stale_copy_is_served_while_refreshing(server):
+    cache.set('key', (time.time() - upstream.FRESH_FOR - 1, {'hits': 0}))
+
+    async def get_then_wait_for_refresh():
+        data = await upstream.get_json('key', server)
+        await upstream.refresh('key', server)
+        return data
+
+    assert run(get_then_wait_for_refresh()) == {'hits': 0}
+    assert cache.get('key')[1] == {'hits': 1}
+
+
+def test_slow_upstream_times_out(server, monkeypatch):
+    monkeypatch.setattr(upstream, 'TIMEOUT', httpx.Timeout(0.05))
+    DelayedHandler.delay = 0.5
+
+    with pytest.raises(httpx.ReadTimeout):
+        run(upstream.get_json('key', server))
@@ -0,0 +1,66 @@
+import asyncio
+import logging
+import time
+from weakref import WeakKeyDictionary
+import httpx
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+FRESH_FOR = 60 * 5
+STALE_FOR = 60 * 60
+TIMEOUT = httpx.Timeout(5.0, connect=2.0)
+LIMITS = httpx.Limits(max_connections=100, max_keepalive_connections=20)
+
+# Clients and in-flight fetches belong to the event loop that created them.
+_clients = WeakKeyDictionary()
+_inflight = WeakKeyDictionary()
+
+
+def get_client():
+    loop = asyncio.get_running_loop()
+    if loop not in _clients:
+        _clients[loop] = httpx.AsyncClient(timeout=TIMEOUT, limits=LIMITS)
+    return _clients[loop]
+
+
+async def get_json(key, url):
+    """
+    Return the JSON body of `url`, cached under `key`.
+
+    A cached copy younger than FRESH_FOR is returned as is. An older one
+    (up to STALE_FOR) is returned immediately while a background request
+    refreshes it. Concurrent misses for the same key share one upstream
+    request, which carries on if one of them is cancelled.
+    """
+    entry = await cache.aget(key)
+    if entry is None:
+        return await asyncio.shield(refresh(key, url))
+
+    fetched_at, data = entry
+    if time.time() - fetched_at > FRESH_FOR:
+        refresh(key, url)
+    return data
+
+
+def refresh(key, url):
+    inflight = _inflight.setdefault(asyncio.get_running_loop(), {})
+    if key not in inflight:
+        task = asyncio.ensure_future(fetch(key, url))
+        inflight[key] = task
+        task.add_done_callback(lambda task: finish(inflight, key, task))
+    return inflight[key]
+
+
+async def fetch(key, url):
+    response = await get_client().get(url)
+    response.raise_for_status()
+    data = response.json()
+    await cache.aset(key, (time.time(), data), STALE_FOR)
+    return data
+
+
+def finish(inflight, key, task):
+    inflight.pop(key, None)
+    if not task.cancelled() and task.exception() is not None:
+        logger.warning('Refreshing %s failed: %r', key, task.exception())
@@ -2,5 +2,6 @@ from django.urls import path
 from . import views
 
 urlpatterns = [
-    path('hello/', views.HelloView.as_view())
+    path('hello/', views.HelloView.as_view()),
+    path('hello-async/', views.AsyncHelloView.as_view())
 ]
\ No newline at end of file
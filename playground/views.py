@@ -1,9 +1,13 @@
+from django.conf import settings
 from django.shortcuts import render
 import logging
+import httpx
 import requests
 from rest_framework.views import APIView
 from django.utils.decorators import method_decorator
+from django.views import View
 from django.views.decorators.cache import cache_page
+from . import upstream
 
 logger = logging.getLogger(__name__) #playground.views
 
@@ -19,4 +23,16 @@ class HelloView(APIView):
             logger.critical('httpbin is offline')
         return render(request, 'hello.html', {
             'name': 'Ashebr!'
-        })
\ No newline at end of file
+        })
+
+class AsyncHelloView(View):
+    async def get(self, request):
+        try:
+            logger.info('Calling httpbin')
+            data = await upstream.get_json('playground:httpbin', settings.PLAYGROUND_UPSTREAM_URL)
+            logger.info('Received the response')
+        except httpx.HTTPError:
+            logger.critical('httpbin is offline')
+        return render(request, 'hello.html', {
+            'name': 'Ashebr!'
+        })
@@ -18,12 +18,6 @@ class CollectionAdmin(admin.ModelAdmin):
                    'collection__id':str(collection.id)
                }))
         return format_html('<a href="{}">{}</a>', url, collection.products_count)
-         
- 
-    def get_queryset(self, request):
-        return super().get_queryset(request).annotate(
-            products_count=Count('products')
-        )
 
 class InventoryFilter(admin.SimpleListFilter):
     title = 'Inventory'
@@ -43,11 +37,12 @@ class InventoryFilter(admin.SimpleListFilter):
 
 class ProductImageInline(admin.TabularInline):
     model = models.ProductImage
+    exclude = ['derivatives']
     readonly_fields = ['thumbnail']
 
     def thumbnail(self, instance):
         if instance.image.name != '':
-            return format_html(f'<img class="thumbnail" src="{instance.image.url}"/>')
+            return format_html('<img class="thumbnail" src="{}"/>', instance.derivative_url('thumbnail'))
         return ''
 
 @admin.register(models.Product)
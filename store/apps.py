@@ -6,4 +6,5 @@ class StoreConfig(AppConfig):
     name = 'store'
 
     def ready(self):
-        import core.signals.handlers
\ No newline at end of file
+        import core.signals.handlers
+        import store.signals.handlers
\ No newline at end of file
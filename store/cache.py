@@ -0,0 +1,112 @@
+import hashlib
+import time
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.utils.http import urlencode
+from rest_framework.response import Response
+
+CATALOG_VERSION = 'store:version:catalog'
+STATS_KEYS = {
+    'hits': 'store:cache:hits',
+    'misses': 'store:cache:misses',
+    'invalidations': 'store:cache:invalidations',
+}
+
+
+def collection_version(collection_id):
+    return f'store:version:collection:{int(collection_id)}'
+
+
+def product_version(product_id):
+    return f'store:version:product:{int(product_id)}'
+
+
+def incr(key, start):
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, start, None)
+
+
+def count(stat):
+    incr(STATS_KEYS[stat], 1)
+
+
+def get_stats():
+    values = cache.get_many(STATS_KEYS.values())
+    return {stat: values.get(key, 0) for stat, key in STATS_KEYS.items()}
+
+
+def bump(keys):
+    for key in keys:
+        # A version that was evicted restarts from the clock, never from a
+        # value an old cache entry may still be keyed on.
+        incr(key, time.time_ns())
+
+
+def invalidate(product_ids=(), collection_ids=()):
+    """
+    Bump the catalog version and those of the given products and
+    collections, so every cached response that embeds them misses.
+    """
+    keys = [CATALOG_VERSION]
+    keys += [product_version(pk) for pk in set(product_ids)]
+    keys += [collection_version(pk) for pk in set(collection_ids) if pk is not None]
+    bump(keys)
+    count('invalidations')
+    # Bump again once the transaction commits, in case a concurrent request
+    # re-cached the old rows in between.
+    if connection.in_atomic_block:
+        transaction.on_commit(lambda: bump(keys))
+
+
+class CachedResponseMixin:
+    """
+    Read-through cache for list and retrieve responses.
+
+    Entries are keyed by the normalized query string and by the current
+    value of each key returned from `get_cache_versions()`; bumping any of
+    those versions orphans the entries built on it.
+    """
+    cache_timeout = 60 * 10
+
+    def get_cache_versions(self):
+        return [CATALOG_VERSION]
+
+    def get_cache_key(self):
+        version_keys = self.get_cache_versions()
+        versions = cache.get_many(version_keys)
+        missing = {key: time.time_ns() for key in version_keys if key not in versions}
+        if missing:
+            cache.set_many(missing, None)
+            versions.update(missing)
+
+        params = urlencode(sorted(
+            (key, sorted(values)) for key, values in self.request.query_params.lists()
+        ), doseq=True)
+        digest = hashlib.md5(
+            # Bodies carry absolute URLs (pagination links, images).
+            f'{self.request.scheme}://{self.request.get_host()}?{params}'.encode('utf-8'),
+            usedforsecurity=False
+        ).hexdigest()
+        version = '.'.join(str(versions[key]) for key in version_keys)
+        return f'store:response:{self.basename}:{self.action}:{self.kwargs.get("pk", "")}:{version}:{digest}'
+
+    def cached_response(self, respond, request, *args, **kwargs):
+        key = self.get_cache_key()
+        data = cache.get(key)
+        if data is not None:
+            count('hits')
+            return Response(data)
+
+        count('misses')
+        response = respond(request, *args, **kwargs)
+        if response.status_code == 200:
+            cache.set(key, response.data, self.cache_timeout)
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(super().retrieve, request, *args, **kwargs)
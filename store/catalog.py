@@ -0,0 +1,368 @@
+"""
+Bulk catalog import from CSV or JSON Lines.
+
+Each row describes one product:
+
+    title, slug, description, unit_price, inventory, collection,
+    tags, promotions, images
+
+`collection` and `tags` are matched by title/label and created when
+missing, `promotions` are Promotion ids and `images` are names of files
+already in storage. In CSV, list columns are separated with `|`; in JSON
+Lines they are arrays. A row whose slug matches an existing product
+updates it; its tags and promotions are replaced and its images added.
+
+Rows are read lazily and written in chunks, each in its own transaction
+with a fixed number of queries, so memory stays flat however large the
+file is.
+"""
+import csv
+import json
+import sys
+import time
+from collections import Counter
+from decimal import Decimal, InvalidOperation
+from django.contrib.contenttypes.models import ContentType
+from django.db import connection, transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.text import slugify
+from tags.models import Tag, TaggedItem
+from .cache import invalidate
+from .models import Collection, Product, ProductImage, Promotion
+from .search import get_search_backend
+from .tasks import generate_image_derivatives
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+FORMATS = {'.csv': 'csv', '.jsonl': 'jsonl', '.ndjson': 'jsonl'}
+CHUNK_SIZE = 1000
+LIST_SEPARATOR = '|'
+MAX_ERRORS = 100
+MAX_CACHED_KEYS = 10_000
+UPDATE_FIELDS = ['title', 'description', 'unit_price', 'inventory', 'collection', 'last_update']
+
+
+class CatalogImportError(Exception):
+    pass
+
+
+class RowError(ValueError):
+    pass
+
+
+def guess_format(name):
+    for extension, format in FORMATS.items():
+        if name.lower().endswith(extension):
+            return format
+    return None
+
+
+def read_rows(file, format):
+    """Yield (line number, row) pairs; row is None for unparsable lines."""
+    if format == 'csv':
+        reader = csv.DictReader(file)
+        for row in reader:
+            yield reader.line_num, row
+        return
+
+    for line_number, line in enumerate(file, 1):
+        if not line.strip():
+            continue
+        try:
+            yield line_number, json.loads(line)
+        except ValueError:
+            yield line_number, None
+
+
+def split(value):
+    if value is None or value == '':
+        return []
+    if isinstance(value, str):
+        value = value.split(LIST_SEPARATOR)
+    if not isinstance(value, list):
+        raise RowError('Expected a list')
+    return list(dict.fromkeys(str(item).strip() for item in value if str(item).strip()))
+
+
+def clean_row(row):
+    if not isinstance(row, dict):
+        raise RowError('Not a valid row')
+
+    title = str(row.get('title') or '').strip()
+    if not title or len(title) > 255:
+        raise RowError('A title of 1 to 255 characters is required')
+    slug = str(row.get('slug') or '').strip() or slugify(title)[:50]
+    if len(slug) > 50 or slug != slugify(slug):
+        raise RowError(f'Invalid slug {slug!r}')
+
+    try:
+        unit_price = Decimal(str(row.get('unit_price')))
+    except InvalidOperation:
+        raise RowError('Invalid unit_price')
+    if not unit_price.is_finite():
+        raise RowError('Invalid unit_price')
+    unit_price = unit_price.quantize(Decimal('0.01'))
+    if not 1 <= unit_price < 10_000:
+        raise RowError('unit_price must be between 1 and 9999.99')
+
+    try:
+        inventory = int(row.get('inventory') or 0)
+    except (TypeError, ValueError):
+        raise RowError('Invalid inventory')
+    if inventory < 0:
+        raise RowError('inventory cannot be negative')
+    _, max_inventory = connection.ops.integer_field_range(
+        Product._meta.get_field('inventory').get_internal_type()
+    )
+    if inventory > max_inventory:
+        raise RowError(f'inventory cannot be above {max_inventory}')
+
+    collection = str(row.get('collection') or '').strip()
+    if not collection:
+        raise RowError('A collection is required')
+
+    try:
+        promotions = [int(pk) for pk in split(row.get('promotions'))]
+    except ValueError:
+        raise RowError('Promotions must be ids')
+
+    images = split(row.get('images'))
+    max_length = ProductImage._meta.get_field('image').max_length
+    too_long = [name for name in images if len(name) > max_length]
+    if too_long:
+        raise RowError(f'Image names longer than {max_length} characters: {too_long}')
+
+    return {
+        'title': title,
+        'slug': slug,
+        'description': str(row.get('description') or ''),
+        'unit_price': unit_price,
+        'inventory': inventory,
+        'collection': collection[:255],
+        'tags': [label[:255] for label in split(row.get('tags'))],
+        'promotions': promotions,
+        'images': images,
+    }
+
+
+def peak_rss_kb():
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return rss // 1024 if sys.platform == 'darwin' else rss
+
+
+class NaturalKeys:
+    """
+    Map natural keys of `model` to ids, creating the missing rows.
+
+    Each chunk resolves its unknown keys in one query; the map is dropped
+    when it grows past MAX_CACHED_KEYS to keep memory bounded.
+    """
+    def __init__(self, model, field):
+        self.model = model
+        self.field = field
+        self.ids = {}
+
+    def fetch(self, keys):
+        # Oldest row wins when the key isn't unique.
+        return self.model.objects \
+            .filter(**{f'{self.field}__in': keys}) \
+            .order_by('-pk') \
+            .values_list(self.field, 'pk')
+
+    def resolve(self, keys):
+        if len(self.ids) + len(keys) > MAX_CACHED_KEYS:
+            self.ids.clear()
+        missing = set(keys) - self.ids.keys()
+        if not missing:
+            return
+        self.ids.update(self.fetch(missing))
+        missing -= self.ids.keys()
+        if missing:
+            self.model.objects.bulk_create([self.model(**{self.field: key}) for key in missing])
+            # Not every backend returns ids from bulk_create.
+            self.ids.update(self.fetch(missing))
+
+
+class CatalogImport:
+    def __init__(self, chunk_size=CHUNK_SIZE):
+        self.chunk_size = chunk_size
+        self.collections = NaturalKeys(Collection, 'title')
+        self.tags = NaturalKeys(Tag, 'label')
+        self.content_type = ContentType.objects.get_for_model(Product)
+        self.rows = self.created = self.updated = self.skipped = 0
+        self.errors = []
+
+    def run(self, file, format):
+        started = time.perf_counter()
+        chunk = []
+        try:
+            for line, row in read_rows(file, format):
+                self.rows += 1
+                try:
+                    chunk.append((line, clean_row(row)))
+                except RowError as error:
+                    self.skip(line, str(error))
+                if len(chunk) == self.chunk_size:
+                    self.write_chunk(chunk)
+                    chunk = []
+            if chunk:
+                self.write_chunk(chunk)
+        except (csv.Error, UnicodeDecodeError) as error:
+            raise CatalogImportError(f'Line {self.rows + 1}: {error}')
+        return self.report(time.perf_counter() - started)
+
+    def skip(self, line, message):
+        self.skipped += 1
+        if len(self.errors) < MAX_ERRORS:
+            self.errors.append({'line': line, 'error': message})
+
+    def report(self, seconds):
+        return {
+            'rows': self.rows,
+            'created': self.created,
+            'updated': self.updated,
+            'skipped': self.skipped,
+            'errors': self.errors,
+            'seconds': round(seconds, 3),
+            'rows_per_second': round(self.rows / seconds) if seconds else self.rows,
+            'peak_rss_kb': peak_rss_kb(),
+        }
+
+    @transaction.atomic
+    def write_chunk(self, chunk):
+        chunk = self.check_promotions(chunk)
+        # A slug repeated within the chunk: the last row wins.
+        rows = {row['slug']: row for _, row in chunk}
+        if not rows:
+            return
+
+        self.collections.resolve({row['collection'] for row in rows.values()})
+        self.tags.resolve({label for row in rows.values() for label in row['tags']})
+        existing = {
+            slug: (pk, collection_id)
+            for slug, pk, collection_id in Product.objects
+                .filter(slug__in=rows)
+                .order_by('-pk')
+                .values_list('slug', 'pk', 'collection_id')
+        }
+
+        now = timezone.now()
+        new, changed, collection_ids = [], [], set()
+        count_changes = Counter()
+        for slug, row in rows.items():
+            product = Product(
+                slug=slug,
+                title=row['title'],
+                description=row['description'],
+                unit_price=row['unit_price'],
+                inventory=row['inventory'],
+                collection_id=self.collections.ids[row['collection']],
+                last_update=now,
+            )
+            collection_ids.add(product.collection_id)
+            if slug in existing:
+                product.pk, old_collection_id = existing[slug]
+                collection_ids.add(old_collection_id)
+                count_changes[old_collection_id] -= 1
+                changed.append(product)
+            else:
+                new.append(product)
+            count_changes[product.collection_id] += 1
+
+        Product.objects.bulk_create(new)
+        if new and new[0].pk is None:
+            ids = dict(Product.objects.filter(slug__in=[p.slug for p in new]).values_list('slug', 'pk'))
+            for product in new:
+                product.pk = ids[product.slug]
+        # An upsert on the primary key: much cheaper than bulk_update's
+        # CASE WHEN per field.
+        Product.objects.bulk_create(
+            changed,
+            update_conflicts=True,
+            update_fields=UPDATE_FIELDS,
+            unique_fields=['id'] if connection.features.supports_update_conflicts_with_target else None,
+        )
+
+        for collection_id, change in count_changes.items():
+            if change:
+                Collection.objects.filter(pk=collection_id).update(products_count=F('products_count') + change)
+
+        products = new + changed
+        changed_ids = [product.pk for product in changed]
+        self.write_promotions(products, changed_ids, rows)
+        self.write_tags(products, changed_ids, rows)
+        self.write_images(products, changed_ids, rows)
+
+        # Bulk writes don't send the signals that keep the search index
+        # and response cache in sync.
+        backend = get_search_backend()
+        if backend is not None:
+            backend.index(products)
+        invalidate(product_ids=changed_ids, collection_ids=collection_ids)
+
+        self.created += len(new)
+        self.updated += len(changed)
+
+    def check_promotions(self, chunk):
+        ids = {pk for _, row in chunk for pk in row['promotions']}
+        known = set(Promotion.objects.filter(pk__in=ids).values_list('pk', flat=True)) if ids else set()
+        valid = []
+        for line, row in chunk:
+            unknown = set(row['promotions']) - known
+            if unknown:
+                self.skip(line, f'Unknown promotions: {sorted(unknown)}')
+            else:
+                valid.append((line, row))
+        return valid
+
+    def write_promotions(self, products, changed_ids, rows):
+        through = Product.promotions.through
+        through.objects.filter(product_id__in=changed_ids).delete()
+        through.objects.bulk_create([
+            through(product_id=product.pk, promotion_id=promotion_id)
+            for product in products
+            for promotion_id in rows[product.slug]['promotions']
+        ])
+
+    def write_tags(self, products, changed_ids, rows):
+        TaggedItem.objects.filter(content_type=self.content_type, object_id__in=changed_ids).delete()
+        TaggedItem.objects.bulk_create([
+            TaggedItem(tag_id=self.tags.ids[label], content_type=self.content_type, object_id=product.pk)
+            for product in products
+            for label in rows[product.slug]['tags']
+        ])
+
+    def write_images(self, products, changed_ids, rows):
+        wanted = {(product.pk, name) for product in products for name in rows[product.slug]['images']}
+        if not wanted:
+            return
+        attached = set(
+            ProductImage.objects.filter(product_id__in=changed_ids).values_list('product_id', 'image')
+        )
+        images = [ProductImage(product_id=pk, image=name) for pk, name in wanted - attached]
+        if not images:
+            return
+        ProductImage.objects.bulk_create(images)
+        created = {(image.product_id, image.image.name) for image in images}
+        image_ids = [
+            pk for pk, product_id, name in ProductImage.objects
+                .filter(product_id__in={pk for pk, _ in created}, image__in={name for _, name in created})
+                .values_list('pk', 'product_id', 'image')
+            if (product_id, name) in created
+        ]
+
+        def queue_derivatives():
+            for pk in image_ids:
+                generate_image_derivatives.delay(pk)
+        transaction.on_commit(queue_derivatives, robust=True)
+
+def import_catalog(file, format, chunk_size=CHUNK_SIZE):
+    """Import products from a text-mode file and return a summary of the run."""
+    return CatalogImport(chunk_size).run(file, format)
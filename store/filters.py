@@ -1,7 +1,11 @@
-from django_filters.rest_framework import FilterSet
+from django_filters.rest_framework import FilterSet, NumberFilter
 from .models import Product
 
 class ProductFilters(FilterSet):
+    # Annotated by ProductViewSet from the product's review summary
+    average_rating__gte = NumberFilter(field_name='average_rating', lookup_expr='gte')
+    reviews_count__gte = NumberFilter(field_name='reviews_count', lookup_expr='gte')
+
     class Meta:
         model = Product
         fields = {
@@ -0,0 +1,47 @@
+from io import BytesIO
+from pathlib import PurePosixPath
+from PIL import Image, ImageOps
+
+# name: longest side in pixels
+SIZES = {
+    'thumbnail': 150,
+    'listing': 400,
+    'detail': 1000,
+}
+FORMATS = {
+    'jpeg': {'format': 'JPEG', 'quality': 80, 'optimize': True, 'progressive': True},
+    'webp': {'format': 'WEBP', 'quality': 80, 'method': 4},
+}
+
+
+def render_derivatives(file):
+    """
+    Resize and recompress an image file into every size in SIZES, each as
+    JPEG and WebP. Returns {size: {format: bytes}}.
+    """
+    with Image.open(file) as original:
+        original = ImageOps.exif_transpose(original)
+        if original.mode not in ('RGB', 'L'):
+            original = original.convert('RGB')
+
+        derivatives = {}
+        for size, longest_side in SIZES.items():
+            resized = original.copy()
+            resized.thumbnail((longest_side, longest_side), Image.Resampling.LANCZOS)
+            derivatives[size] = {}
+            for extension, options in FORMATS.items():
+                buffer = BytesIO()
+                resized.save(buffer, **options)
+                derivatives[size][extension] = buffer.getvalue()
+        return derivatives
+
+
+def derivative_name(original_name, size, extension):
+    """store/images/mug.png -> store/images/mug.thumbnail.jpeg"""
+    path = PurePosixPath(original_name)
+    return str(path.with_name(f'{path.stem}.{size}.{extension}'))
+
+
+def derivative_names(derivatives):
+    """Storage names in a ProductImage.derivatives mapping."""
+    return [name for formats in derivatives.values() for name in formats.values()]
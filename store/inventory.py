@@ -0,0 +1,60 @@
+from django.db import transaction
+from django.db.models import Case, F, When
+from .cache import invalidate
+from .models import Product
+
+
+class InsufficientInventory(Exception):
+    def __init__(self, product_ids):
+        super().__init__(f'Not enough inventory for products: {product_ids}')
+        self.product_ids = product_ids
+
+
+def reserve(quantities):
+    """
+    Take `quantities` ({product_id: quantity}) out of stock.
+
+    All lines are decremented by one UPDATE that only matches products
+    with enough inventory, so stock can't go negative under concurrent
+    checkouts. Rows are updated in product id order (on databases that
+    support UPDATE ... ORDER BY) so two checkouts never lock the same
+    products in opposite orders. If any line is short nothing is taken
+    and InsufficientInventory is raised.
+
+    The UPDATE skips post_save, so cached responses showing the products
+    are invalidated here, once the transaction commits.
+    """
+    if not quantities:
+        return
+
+    quantity = Case(*[
+        When(pk=product_id, then=requested)
+        for product_id, requested in sorted(quantities.items())
+    ])
+
+    with transaction.atomic():
+        updated = Product.objects\
+            .filter(pk__in=quantities, inventory__gte=quantity)\
+            .order_by('pk')\
+            .update(inventory=F('inventory') - quantity)
+        if updated != len(quantities):
+            # Put back the lines that did fit before reporting the short ones.
+            transaction.set_rollback(True)
+
+    if updated != len(quantities):
+        available = dict(Product.objects.filter(pk__in=quantities).values_list('pk', 'inventory'))
+        raise InsufficientInventory([
+            product_id for product_id in sorted(quantities)
+            if available.get(product_id, 0) < quantities[product_id]
+        ])
+
+    product_ids = list(quantities)
+    transaction.on_commit(lambda: invalidate_products(product_ids))
+
+
+def invalidate_products(product_ids):
+    collection_ids = Product.objects\
+        .filter(pk__in=product_ids)\
+        .values_list('collection_id', flat=True)\
+        .distinct()
+    invalidate(product_ids=product_ids, collection_ids=list(collection_ids))
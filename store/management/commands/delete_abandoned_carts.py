@@ -0,0 +1,16 @@
+from datetime import timedelta
+from django.core.management.base import BaseCommand
+from store.carts import delete_abandoned_carts
+
+
+class Command(BaseCommand):
+    help = 'Delete carts idle for longer than ABANDONED_CART_TTL, in batches.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=float, help='Idle time after which a cart is deleted (default ABANDONED_CART_TTL)')
+        parser.add_argument('--batch-size', type=int, help='Carts deleted per transaction (default ABANDONED_CART_BATCH_SIZE)')
+
+    def handle(self, *args, **options):
+        ttl = timedelta(days=options['days']) if options['days'] is not None else None
+        report = delete_abandoned_carts(ttl, options['batch_size'])
+        self.stdout.write(str(report))
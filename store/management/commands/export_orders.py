@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand, CommandError
+from store.exports import FORMATS, OrderExportFilter, export_orders
+from store.models import Order
+
+
+class Command(BaseCommand):
+    help = 'Stream orders with their line items as CSV or JSON Lines.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--format', choices=list(FORMATS), default='csv')
+        parser.add_argument('--placed-after', help='Date or datetime, inclusive.')
+        parser.add_argument('--placed-before', help='Date or datetime, exclusive.')
+        parser.add_argument('--payment-status', action='append',
+                            choices=[value for value, _ in Order.PAYMENT_STATUS_CHOICES])
+        parser.add_argument('--output', help='Defaults to standard output.')
+
+    def handle(self, *args, **options):
+        filterset = OrderExportFilter({
+            'placed_after': options['placed_after'],
+            'placed_before': options['placed_before'],
+            'payment_status': options['payment_status'] or [],
+        }, queryset=Order.objects.all())
+        if not filterset.is_valid():
+            raise CommandError(filterset.errors.as_text())
+
+        chunks = export_orders(filterset.qs, options['format'])
+        if options['output'] is None:
+            for chunk in chunks:
+                self.stdout.write(chunk, ending='')
+            return
+        with open(options['output'], 'w', encoding='utf-8', newline='') as file:
+            file.writelines(chunks)
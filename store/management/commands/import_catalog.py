@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand, CommandError
+from store.catalog import CHUNK_SIZE, FORMATS, CatalogImportError, guess_format, import_catalog
+
+
+class Command(BaseCommand):
+    help = 'Import products, tags, promotions and images from a CSV or JSON Lines file.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--format', choices=sorted(set(FORMATS.values())),
+                            help='Defaults to the one implied by the file extension.')
+        parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        format = options['format'] or guess_format(options['path'])
+        if format is None:
+            raise CommandError('Cannot tell the file format from its name; pass --format.')
+
+        try:
+            with open(options['path'], encoding='utf-8-sig', newline='') as file:
+                report = import_catalog(file, format, options['chunk_size'])
+        except OSError as error:
+            raise CommandError(error)
+        except CatalogImportError as error:
+            raise CommandError(error)
+
+        for error in report['errors']:
+            self.stderr.write(f'Line {error["line"]}: {error["error"]}')
+        self.stdout.write(self.style.SUCCESS(
+            f'{report["rows"]} rows in {report["seconds"]}s ({report["rows_per_second"]} rows/s): '
+            f'{report["created"]} created, {report["updated"]} updated, {report["skipped"]} skipped'
+        ))
+        if report['peak_rss_kb'] is not None:
+            self.stdout.write(f'Peak RSS: {report["peak_rss_kb"] / 1024:.1f} MB')
@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+from store.cache import invalidate
+from store.models import ReviewSummary
+
+
+class Command(BaseCommand):
+    help = 'Recompute review counts, rating histograms and averages from the review table.'
+
+    def handle(self, *args, **options):
+        ReviewSummary.objects.rebuild()
+        invalidate()
+        self.stdout.write(f'{ReviewSummary.objects.count()} product summaries rebuilt')
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from store.cache import invalidate
+from store.models import Collection, Product
+
+
+class Command(BaseCommand):
+    help = 'Recompute Collection.products_count where it has drifted from the product table.'
+
+    def handle(self, *args, **options):
+        counts = Product.objects \
+            .filter(collection=OuterRef('pk')) \
+            .order_by() \
+            .values('collection') \
+            .annotate(count=Count('pk')) \
+            .values('count')
+        actual = Coalesce(Subquery(counts), 0)
+        stale = list(Collection.objects
+                     .annotate(actual=actual)
+                     .exclude(products_count=F('actual'))
+                     .values_list('pk', flat=True))
+        if stale:
+            Collection.objects.filter(pk__in=stale).update(products_count=actual)
+            invalidate(collection_ids=stale)
+        self.stdout.write(f'{len(stale)} collection(s) repaired')
@@ -0,0 +1,48 @@
+from django.db import migrations
+from django.db.utils import OperationalError
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'mysql':
+        schema_editor.execute(
+            'CREATE FULLTEXT INDEX store_product_fulltext ON store_product (title, description)'
+        )
+    elif vendor == 'postgresql':
+        schema_editor.execute(
+            "CREATE INDEX store_product_fulltext ON store_product USING GIN "
+            "(to_tsvector('english', title || ' ' || description))"
+        )
+    elif vendor == 'sqlite':
+        try:
+            schema_editor.execute(
+                'CREATE VIRTUAL TABLE store_product_fts USING fts5(title, description)'
+            )
+        except OperationalError:
+            # SQLite built without FTS5; search falls back to icontains.
+            return
+        schema_editor.execute(
+            'INSERT INTO store_product_fts (rowid, title, description) '
+            'SELECT id, title, description FROM store_product'
+        )
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'mysql':
+        schema_editor.execute('DROP INDEX store_product_fulltext ON store_product')
+    elif vendor == 'postgresql':
+        schema_editor.execute('DROP INDEX IF EXISTS store_product_fulltext')
+    elif vendor == 'sqlite':
+        schema_editor.execute('DROP TABLE IF EXISTS store_product_fts')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0015_product_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
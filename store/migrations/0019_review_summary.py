@@ -0,0 +1,46 @@
+# Generated by Django 5.2.18 on 2026-10-18 20:32
+
+import django.core.validators
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def count_reviews(apps, schema_editor):
+    # Existing reviews have no rating, so only their count is known.
+    Review = apps.get_model('store', 'Review')
+    ReviewSummary = apps.get_model('store', 'ReviewSummary')
+    counts = Review.objects.order_by().values('product_id').annotate(count=Count('pk'))
+    ReviewSummary.objects.bulk_create(
+        [ReviewSummary(**row) for row in counts.iterator()],
+        batch_size=1000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0018_collection_products_count'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReviewSummary',
+            fields=[
+                ('product', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='review_summary', serialize=False, to='store.product')),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('rating_1', models.PositiveIntegerField(default=0)),
+                ('rating_2', models.PositiveIntegerField(default=0)),
+                ('rating_3', models.PositiveIntegerField(default=0)),
+                ('rating_4', models.PositiveIntegerField(default=0)),
+                ('rating_5', models.PositiveIntegerField(default=0)),
+                ('average_rating', models.DecimalField(decimal_places=2, max_digits=3, null=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='review',
+            name='rating',
+            field=models.PositiveSmallIntegerField(blank=True, null=True, validators=[django.core.validators.MinValueValidator(1), django.core.validators.MaxValueValidator(5)]),
+        ),
+        migrations.RunPython(count_reviews, migrations.RunPython.noop),
+    ]
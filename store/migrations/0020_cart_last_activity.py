@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-18 20:58
+
+import django.utils.timezone
+from django.db import migrations, models
+from django.db.models import F
+
+
+def backfill_last_activity(apps, schema_editor):
+    # Existing carts would otherwise look active as of the migration.
+    Cart = apps.get_model('store', 'Cart')
+    Cart.objects.update(last_activity=F('created_at'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0019_review_summary'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cart',
+            name='last_activity',
+            field=models.DateTimeField(default=django.utils.timezone.now, editable=False),
+        ),
+        migrations.RunPython(backfill_last_activity, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='cart',
+            index=models.Index(fields=['last_activity', 'id'], name='store_cart_last_ac_3055b8_idx'),
+        ),
+    ]
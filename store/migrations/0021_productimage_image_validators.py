@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-18 21:10
+
+import store.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0020_cart_last_activity'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='productimage',
+            name='image',
+            field=models.ImageField(upload_to='store/images', validators=[store.validators.validate_file_size]),
+        ),
+    ]
@@ -1,10 +1,20 @@
+from collections import Counter
+from datetime import timedelta
+from itertools import islice
 from django.contrib import admin
 from django.conf import settings
-from django.core.validators import MinValueValidator
-from django.db import models
+from django.contrib.contenttypes.fields import GenericRelation
+from django.core.exceptions import ValidationError
+from django.core.validators import MaxValueValidator, MinValueValidator
+from django.db import connections, models, router, transaction
+from django.db.models import Count, F, Q
+from django.db.models.functions import Cast, NullIf
+from django.utils import timezone
 from uuid import uuid4
 
+from likes.models import LikedItem
 from store.validators import validate_file_size
+from tags.models import TaggedItem
 
 
 class Promotion(models.Model):
@@ -14,6 +24,9 @@ class Promotion(models.Model):
 class Collection(models.Model):
     title = models.CharField(max_length=255)
     featured_product = models.ForeignKey('Product', on_delete=models.SET_NULL, null=True, related_name='+')
+    # Maintained by Product.save() and the post_delete handler; repair
+    # with `manage.py reconcile_collection_counts` after raw updates.
+    products_count = models.PositiveIntegerField(default=0, editable=False)
     
     def __str__(self):
         return self.title
@@ -37,12 +50,36 @@ class Product(models.Model):
     last_update = models.DateTimeField(auto_now=True)
     collection = models.ForeignKey(Collection, on_delete=models.PROTECT, related_name='products')
     promotions = models.ManyToManyField(Promotion, blank=True)
+    tagged_items = GenericRelation(TaggedItem)
+    liked_items = GenericRelation(LikedItem)
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the stored collection so a move can be detected on save.
+        instance._loaded_collection_id = instance.__dict__.get('collection_id')
+        return instance
+
+    def save(self, *args, **kwargs):
+        old_collection_id = getattr(self, '_loaded_collection_id', None)
+        with transaction.atomic(using=kwargs.get('using') or router.db_for_write(Product, instance=self)):
+            super().save(*args, **kwargs)
+            if old_collection_id != self.collection_id:
+                Collection.objects.filter(pk=self.collection_id).update(products_count=F('products_count') + 1)
+                if old_collection_id is not None:
+                    Collection.objects.filter(pk=old_collection_id).update(products_count=F('products_count') - 1)
+        self._loaded_collection_id = self.collection_id
 
     def __str__(self):
         return self.title
     
     class Meta:
         ordering = ['title']
+        indexes = [
+            models.Index(fields=['title', 'id']),
+            models.Index(fields=['unit_price', 'id']),
+            models.Index(fields=['last_update', 'id']),
+        ]
 
 class ProductImage(models.Model):
     product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='images')
@@ -50,6 +87,20 @@ class ProductImage(models.Model):
         upload_to='store/images',
         validators=[validate_file_size]
         )
+    # {size: {format: storage name}}, filled in by generate_image_derivatives
+    derivatives = models.JSONField(default=dict, blank=True)
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_image_name = instance.__dict__.get('image')
+        return instance
+
+    def derivative_url(self, size, extension='jpeg'):
+        name = self.derivatives.get(size, {}).get(extension)
+        if name is None:
+            return self.image.url
+        return self.image.storage.url(name)
 
 class Customer(models.Model):
     MEMBERSHIP_BRONZE = 'B'
@@ -116,11 +167,130 @@ class Address(models.Model):
     zip = models.CharField(max_length=10, null=True)
     customer = models.OneToOneField(Customer, on_delete=models.CASCADE, primary_key=True)
 
+DEFAULT_CART_ACTIVITY_RESOLUTION = timedelta(minutes=5)
+
+class CartManager(models.Manager):
+    def touch(self, cart_id, last_activity=None):
+        """
+        Record activity on a cart. The UPDATE only matches a cart whose
+        last_activity is older than CART_ACTIVITY_RESOLUTION, so a cart
+        being filled in one sitting is written about once; pass the
+        cart's last_activity if it's loaded to skip the UPDATE then too.
+        """
+        now = timezone.now()
+        stale = now - getattr(settings, 'CART_ACTIVITY_RESOLUTION', DEFAULT_CART_ACTIVITY_RESOLUTION)
+        if last_activity is not None and last_activity >= stale:
+            return
+        self.filter(pk=cart_id, last_activity__lt=stale).update(last_activity=now)
+
 class Cart(models.Model):
+    objects = CartManager()
     id = models.UUIDField(primary_key=True, default=uuid4)
     created_at = models.DateTimeField(auto_now_add=True)
+    # Kept by CartManager.touch() on item changes; carts idle for
+    # ABANDONED_CART_TTL are deleted by store.carts.
+    last_activity = models.DateTimeField(default=timezone.now, editable=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['last_activity', 'id']),
+        ]
+
+# CartItem.quantity's bound on every backend (MySQL's unsigned smallint
+# would take up to 65535).
+MAX_CART_ITEM_QUANTITY = 32767
+
+class CartItemManager(models.Manager):
+    def add(self, cart_id, product_id, quantity):
+        """
+        Insert the item, or add to its quantity if the cart already holds
+        the product, in one atomic statement. Selecting the cart and
+        product ids from their tables makes the statement insert nothing
+        when either doesn't exist, which is reported as Cart.DoesNotExist
+        or Product.DoesNotExist.
+
+        The cart is touched first: an idle cart is then either refreshed
+        before store.carts locks it for deletion, and survives, or the
+        touch waits for that lock and the insert finds no cart. MySQL has
+        no RETURNING, so adding to an item it already holds costs a
+        SELECT of the new quantity.
+        """
+        connection = connections[self.db]
+        try:
+            cart_id = Cart._meta.pk.get_db_prep_value(cart_id, connection)
+        except ValidationError:
+            raise Cart.DoesNotExist
+
+        if connection.vendor == 'mysql':
+            conflict = 'ON DUPLICATE KEY UPDATE quantity = quantity + %s'
+        else:
+            conflict = (
+                'ON CONFLICT (cart_id, product_id) '
+                'DO UPDATE SET quantity = store_cartitem.quantity + %s RETURNING id, quantity'
+            )
+
+        Cart.objects.db_manager(self.db).touch(cart_id)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'INSERT INTO store_cartitem (cart_id, product_id, quantity) '
+                'SELECT store_cart.id, store_product.id, %s FROM store_cart, store_product '
+                f'WHERE store_cart.id = %s AND store_product.id = %s {conflict}',
+                [quantity, cart_id, product_id, quantity]
+            )
+            if connection.vendor != 'mysql':
+                row = cursor.fetchone()
+            elif cursor.rowcount == 1:
+                # Inserted; a row that was updated counts as 2.
+                row = (cursor.lastrowid, quantity)
+            elif cursor.rowcount:
+                cursor.execute(
+                    'SELECT id, quantity FROM store_cartitem WHERE cart_id = %s AND product_id = %s',
+                    [cart_id, product_id]
+                )
+                row = cursor.fetchone()
+            else:
+                row = None
+
+        if row is None:
+            if not Cart.objects.using(self.db).filter(pk=cart_id).exists():
+                raise Cart.DoesNotExist
+            raise Product.DoesNotExist
+        return self.model(id=row[0], cart_id=cart_id, product_id=product_id, quantity=row[1])
+
+    def add_many(self, cart_id, quantities):
+        """
+        Like add() for several products at once: one multi-row INSERT of
+        {product_id: quantity} that adds to the quantity of items the cart
+        already holds, capped at MAX_CART_ITEM_QUANTITY. The cart and
+        products must exist, or IntegrityError is raised.
+        """
+        connection = connections[self.db]
+        cart_id = Cart._meta.pk.get_db_prep_value(cart_id, connection)
+        if connection.vendor == 'mysql':
+            conflict = (
+                'ON DUPLICATE KEY UPDATE '
+                f'quantity = LEAST(quantity + VALUES(quantity), {MAX_CART_ITEM_QUANTITY})'
+            )
+        else:
+            # SQLite's two-argument MIN() is its LEAST().
+            least = 'MIN' if connection.vendor == 'sqlite' else 'LEAST'
+            conflict = (
+                'ON CONFLICT (cart_id, product_id) DO UPDATE SET '
+                f'quantity = {least}(store_cartitem.quantity + EXCLUDED.quantity, {MAX_CART_ITEM_QUANTITY})'
+            )
+        rows = ', '.join(['(%s, %s, %s)'] * len(quantities))
+        params = []
+        for product_id, quantity in quantities.items():
+            params += [cart_id, product_id, quantity]
+
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'INSERT INTO store_cartitem (cart_id, product_id, quantity) VALUES {rows} {conflict}',
+                params
+            )
 
 class CartItem(models.Model):
+    objects = CartItemManager()
     cart = models.ForeignKey(Cart, on_delete=models.CASCADE, related_name='items')
     product = models.ForeignKey(Product, on_delete=models.CASCADE)
     quantity = models.PositiveSmallIntegerField(
@@ -131,9 +301,100 @@ class CartItem(models.Model):
         unique_together = [['cart', 'product']]
 
 class Review(models.Model):
+    RATINGS = range(1, 6)
+
     product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='review')
     name = models.CharField(max_length=255)
     description = models.TextField()
     date = models.DateField(auto_now_add=True)
+    # Reviews written before ratings existed have none.
+    rating = models.PositiveSmallIntegerField(
+        null=True,
+        blank=True,
+        validators=[MinValueValidator(1), MaxValueValidator(5)]
+        )
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_rating = instance.__dict__.get('rating')
+        instance._loaded_product_id = instance.__dict__.get('product_id')
+        return instance
+
+    def save(self, *args, **kwargs):
+        adding = self._state.adding
+        with transaction.atomic(using=kwargs.get('using') or router.db_for_write(Review, instance=self)):
+            super().save(*args, **kwargs)
+            if adding:
+                ReviewSummary.objects.record(self.product_id, added=[self.rating])
+            elif self._loaded_product_id != self.product_id:
+                ReviewSummary.objects.record(self._loaded_product_id, removed=[self._loaded_rating])
+                ReviewSummary.objects.record(self.product_id, added=[self.rating])
+            elif self._loaded_rating != self.rating:
+                ReviewSummary.objects.record(self.product_id, added=[self.rating], removed=[self._loaded_rating])
+        self._loaded_rating = self.rating
+        self._loaded_product_id = self.product_id
+
+class ReviewSummaryManager(models.Manager):
+    def record(self, product_id, added=(), removed=()):
+        """
+        Adjust a product's summary for reviews added and removed, given as
+        lists of their ratings (None for unrated reviews).
+        """
+        changes = Counter(added)
+        changes.subtract(removed)
+        updates = {
+            f'rating_{rating}': F(f'rating_{rating}') + change
+            for rating, change in changes.items()
+            if rating is not None and change
+        }
+        rated = bool(updates)
+        if len(added) != len(removed):
+            updates['count'] = F('count') + len(added) - len(removed)
+        if not updates:
+            return
+
+        if added:
+            self.bulk_create([self.model(product_id=product_id)], ignore_conflicts=True)
+        summary = self.filter(product_id=product_id)
+        summary.update(**updates)
+        if rated:
+            # A second statement, so the average sees the new histogram on
+            # every backend (MySQL applies SET clauses left to right).
+            summary.update(average_rating=ReviewSummary.average_expression())
+
+    def rebuild(self, batch_size=1000):
+        """Recompute every summary from the review table."""
+        rows = Review.objects.order_by().values('product_id').annotate(
+            count=Count('pk'),
+            **{f'rating_{rating}': Count('pk', filter=Q(rating=rating)) for rating in Review.RATINGS}
+        ).iterator(chunk_size=batch_size)
+        with transaction.atomic(using=self.db):
+            self.all().delete()
+            while batch := list(islice(rows, batch_size)):
+                self.bulk_create([self.model(**row) for row in batch])
+            self.update(average_rating=ReviewSummary.average_expression())
+
+class ReviewSummary(models.Model):
+    """Review count, rating histogram and average of a product."""
+    objects = ReviewSummaryManager()
+    product = models.OneToOneField(Product, on_delete=models.CASCADE, primary_key=True, related_name='review_summary')
+    count = models.PositiveIntegerField(default=0)
+    rating_1 = models.PositiveIntegerField(default=0)
+    rating_2 = models.PositiveIntegerField(default=0)
+    rating_3 = models.PositiveIntegerField(default=0)
+    rating_4 = models.PositiveIntegerField(default=0)
+    rating_5 = models.PositiveIntegerField(default=0)
+    average_rating = models.DecimalField(max_digits=3, decimal_places=2, null=True)
+
+    @staticmethod
+    def average_expression():
+        rated = sum(F(f'rating_{rating}') for rating in Review.RATINGS)
+        total = sum(rating * F(f'rating_{rating}') for rating in Review.RATINGS)
+        return Cast(total, models.FloatField()) / NullIf(rated, 0)
+
+    @property
+    def histogram(self):
+        return {rating: getattr(self, f'rating_{rating}') for rating in Review.RATINGS}
 
 
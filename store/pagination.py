@@ -1,4 +1,105 @@
-from rest_framework.pagination import PageNumberPagination
+import base64
+import json
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.filters import OrderingFilter
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
 
 class DefaultPagination(PageNumberPagination):
-    page_size = 10
\ No newline at end of file
+    page_size = 10
+
+
+class KeysetPagination(BasePagination):
+    """
+    Seek-based pagination over an (ordering field, id) pair.
+
+    Each page is fetched with a WHERE clause on the last row of the previous
+    page instead of an OFFSET, and no COUNT query is issued, so deep pages
+    cost the same as the first one. Only a `next` link is returned.
+    """
+    page_size = 10
+    cursor_query_param = 'cursor'
+    ordering = 'title'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        field, descending = self.get_ordering(request, queryset, view)
+        lookup = 'lt' if descending else 'gt'
+        prefix = '-' if descending else ''
+
+        cursor = self.decode_cursor(request, field, queryset)
+        if cursor is not None:
+            value, pk = cursor
+            queryset = queryset.filter(
+                Q(**{f'{field}__{lookup}': value}) |
+                Q(**{field: value, f'pk__{lookup}': pk})
+            )
+
+        queryset = queryset.order_by(prefix + field, prefix + 'pk')
+        rows = list(queryset[:self.page_size + 1])
+        self.has_next = len(rows) > self.page_size
+        self.page = rows[:self.page_size]
+        self.next_position = None
+        if self.has_next:
+            last = self.page[-1]
+            self.next_position = [field, str(getattr(last, field)), last.pk]
+        return self.page
+
+    def get_ordering(self, request, queryset, view):
+        ordering = None
+        if view is not None and OrderingFilter in getattr(view, 'filter_backends', []):
+            ordering = OrderingFilter().get_ordering(request, queryset, view)
+        term = ordering[0] if ordering else self.ordering
+        return term.lstrip('-'), term.startswith('-')
+
+    def decode_cursor(self, request, field, queryset):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            cursor_field, value, pk = json.loads(base64.urlsafe_b64decode(encoded.encode('ascii')))
+            # A cursor is only meaningful for the ordering it was issued under.
+            if cursor_field != field:
+                raise ValueError(cursor_field)
+            # Convert here, so a tampered value is reported as a bad cursor
+            # rather than failing when the filter is built.
+            value = self.get_field(queryset, field).to_python(value)
+            pk = queryset.model._meta.pk.to_python(pk)
+        except (TypeError, ValueError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+        return value, pk
+
+    def get_field(self, queryset, name):
+        annotation = queryset.query.annotations.get(name)
+        if annotation is not None:
+            return annotation.output_field
+        return queryset.model._meta.get_field(name)
+
+    def encode_cursor(self, position):
+        encoded = base64.urlsafe_b64encode(json.dumps(position).encode('utf-8')).decode('ascii')
+        return replace_query_param(self.request.build_absolute_uri(), self.cursor_query_param, encoded)
+
+    def get_next_link(self):
+        if self.next_position is None:
+            return None
+        return self.encode_cursor(self.next_position)
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
@@ -0,0 +1,165 @@
+import re
+from abc import ABC, abstractmethod
+from django.db import connection
+from django.db.models import BooleanField, FloatField, Q, Value
+from django.db.models.expressions import RawSQL
+from rest_framework.filters import SearchFilter
+
+INDEX_NAME = 'store_product_fulltext'
+FTS_TABLE = 'store_product_fts'
+# InnoDB's default full-text stopwords (INFORMATION_SCHEMA.INNODB_FT_DEFAULT_STOPWORD).
+MYSQL_STOPWORDS = frozenset('''
+    a about an are as at be by com de en for from how i in is it la of on or
+    that the this to was what when where who will with und www
+'''.split())
+
+
+def tokenize(terms):
+    return re.findall(r'\w+', ' '.join(terms))
+
+
+class SearchBackend(ABC):
+    """
+    Full-text search over Product.title and Product.description.
+
+    Backends annotate matching products with a `search_rank` (higher is
+    more relevant). `index`, `remove` and `rebuild` keep the index in
+    sync for engines that don't maintain it themselves.
+    """
+    _available = None
+
+    def is_available(self):
+        if self._available is None:
+            self._available = self.check_available()
+        return self._available
+
+    def check_available(self):
+        with connection.cursor() as cursor:
+            constraints = connection.introspection.get_constraints(cursor, 'store_product')
+        return INDEX_NAME in constraints
+
+    @abstractmethod
+    def search(self, queryset, tokens):
+        """Return `queryset` filtered to products matching every token."""
+
+    def index(self, products):
+        pass
+
+    def remove(self, product_ids):
+        pass
+
+    def rebuild(self):
+        pass
+
+
+class MySQLSearchBackend(SearchBackend):
+    # Tokens shorter than this, and stopwords, aren't in the index, so a
+    # required +token* term for them would match nothing.
+    min_token_size = 3
+
+    def check_available(self):
+        if not super().check_available():
+            return False
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT @@innodb_ft_min_token_size')
+            self.min_token_size = cursor.fetchone()[0]
+        return True
+
+    def is_indexed(self, token):
+        return len(token) >= self.min_token_size and token.lower() not in MYSQL_STOPWORDS
+
+    def search(self, queryset, tokens):
+        indexed = [token for token in tokens if self.is_indexed(token)]
+        for token in tokens:
+            if token not in indexed:
+                queryset = queryset.filter(Q(title__icontains=token) | Q(description__icontains=token))
+        if not indexed:
+            return queryset.annotate(search_rank=Value(0.0, output_field=FloatField()))
+
+        query = ' '.join(f'+{token}*' for token in indexed)
+        return queryset.annotate(search_rank=RawSQL(
+            'MATCH (store_product.title, store_product.description) AGAINST (%s IN BOOLEAN MODE)',
+            [query],
+            output_field=FloatField()
+        )).filter(search_rank__gt=0)
+
+
+class PostgreSQLSearchBackend(SearchBackend):
+    document = "to_tsvector('english', store_product.title || ' ' || store_product.description)"
+
+    def search(self, queryset, tokens):
+        query = ' & '.join(f'{token}:*' for token in tokens)
+        return queryset.filter(RawSQL(
+            f"{self.document} @@ to_tsquery('english', %s)", [query], output_field=BooleanField()
+        )).annotate(search_rank=RawSQL(
+            f"ts_rank({self.document}, to_tsquery('english', %s))", [query], output_field=FloatField()
+        ))
+
+
+class SQLiteSearchBackend(SearchBackend):
+    def check_available(self):
+        return FTS_TABLE in connection.introspection.table_names()
+
+    def search(self, queryset, tokens):
+        query = ' '.join(f'"{token}"*' for token in tokens)
+        # Joining the FTS5 table lets it drive the query; bm25() is lower
+        # for better matches.
+        return queryset.extra(
+            tables=[FTS_TABLE],
+            where=[f'{FTS_TABLE}.rowid = store_product.id', f'{FTS_TABLE} MATCH %s'],
+            params=[query],
+            select={'search_rank': f'-bm25({FTS_TABLE})'},
+        )
+
+    def index(self, products):
+        products = list(products)
+        self.remove([product.pk for product in products])
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f'INSERT INTO {FTS_TABLE} (rowid, title, description) VALUES (%s, %s, %s)',
+                [(product.pk, product.title, product.description) for product in products]
+            )
+
+    def remove(self, product_ids):
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f'DELETE FROM {FTS_TABLE} WHERE rowid = %s',
+                [(product_id,) for product_id in product_ids]
+            )
+
+    def rebuild(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE}')
+            cursor.execute(
+                f'INSERT INTO {FTS_TABLE} (rowid, title, description) '
+                'SELECT id, title, description FROM store_product'
+            )
+
+
+backends = {
+    'mysql': MySQLSearchBackend(),
+    'postgresql': PostgreSQLSearchBackend(),
+    'sqlite': SQLiteSearchBackend(),
+}
+
+
+def get_search_backend():
+    """Return the backend for the current database, or None if it has no usable index."""
+    backend = backends.get(connection.vendor)
+    if backend is None or not backend.is_available():
+        return None
+    return backend
+
+
+class ProductSearchFilter(SearchFilter):
+    """
+    SearchFilter that queries the full-text index and orders results by
+    relevance, falling back to icontains lookups when no index exists.
+    """
+    def filter_queryset(self, request, queryset, view):
+        backend = get_search_backend()
+        tokens = tokenize(self.get_search_terms(request))
+        if backend is None or not tokens:
+            return super().filter_queryset(request, queryset, view)
+
+        return backend.search(queryset, tokens).order_by('-search_rank', 'pk')
@@ -1,8 +1,13 @@
+from collections import Counter
 from decimal import Decimal
-from django.db import transaction
+from django.db import IntegrityError, transaction
+from django.db.models import Exists, OuterRef, Prefetch, prefetch_related_objects
 from rest_framework import serializers
+from rest_framework.exceptions import NotFound
+from rest_framework.generics import get_object_or_404
+from store import inventory
 from store.signals import order_created
-from .models import Customer, Order, OrderItem, Product, Collection, ProductImage, Review, Cart, CartItem   
+from .models import Customer, Order, OrderItem, Product, Collection, ProductImage, Review, ReviewSummary, Cart, CartItem, MAX_CART_ITEM_QUANTITY
 
 class CollectionSerializer(serializers.ModelSerializer):
     class Meta:
@@ -13,27 +18,56 @@ class CollectionSerializer(serializers.ModelSerializer):
 
 
 class ProductImageSerializer(serializers.ModelSerializer):
+    derivatives = serializers.SerializerMethodField()
+
+    def get_derivatives(self, image):
+        request = self.context.get('request')
+        storage = image.image.storage
+        urls = {}
+        for size, formats in image.derivatives.items():
+            urls[size] = {}
+            for extension, name in formats.items():
+                url = storage.url(name)
+                urls[size][extension] = request.build_absolute_uri(url) if request else url
+        return urls
+
     def create(self, validated_data):
         product_id = self.context['product_id']
         return ProductImage.objects.create(product_id=product_id, **validated_data)
     class Meta:
         model = ProductImage
-        fields = ['id', 'image']
+        fields = ['id', 'image', 'derivatives']
+
+class ReviewSummarySerializer(serializers.ModelSerializer):
+    class Meta:
+        model = ReviewSummary
+        fields = ['count', 'average_rating', 'histogram']
+    histogram = serializers.DictField(child=serializers.IntegerField(), read_only=True)
 
 class ProductSerializer(serializers.ModelSerializer):
     images = ProductImageSerializer(many=True, read_only=True)
     class Meta:
         model = Product
-        fields = ['id', 'title', 'description', 'slug', 'inventory', 'unit_price', 'price_with_tax', 'collection', 'images']
+        fields = ['id', 'title', 'description', 'slug', 'inventory', 'unit_price', 'price_with_tax', 'collection', 'images', 'reviews', 'tags']
     price_with_tax = serializers.SerializerMethodField(method_name='calculate_tax')
+    reviews = serializers.SerializerMethodField()
+    tags = serializers.SerializerMethodField()
 
     def calculate_tax(self, product):
         return product.unit_price * Decimal(1.1)
 
+    def get_reviews(self, product):
+        summary = getattr(product, 'review_summary', None) or ReviewSummary(product=product)
+        return ReviewSummarySerializer(summary).data
+
+    def get_tags(self, product):
+        # Prefetched with their tags by ProductViewSet
+        return [item.tag.label for item in product.tagged_items.all()]
+
 class ReviewSerializer(serializers.ModelSerializer):
     class Meta:
         model = Review
-        fields = ['id', 'date', 'name', 'description']
+        fields = ['id', 'date', 'name', 'description', 'rating']
 
     def create(self, validated_data):
         product_id = self.context['product_id']
@@ -68,30 +102,80 @@ class CartSerializer(serializers.ModelSerializer):
 class AddCartItemSerializer(serializers.ModelSerializer):
     product_id = serializers.IntegerField()
 
-    def validate_product_id(self, value):
-        if not Product.objects.filter(pk=value).exists():
-            raise serializers.ValidationError('No product with the given id.')
-        return value
-
     def save(self, **kwargs):
         cart_id = self.context['cart_id']
         product_id = self.validated_data['product_id']
         quantity = self.validated_data['quantity']
 
+        # The upsert only writes when the product exists, so it doubles as
+        # the product_id validation.
         try:
-            cart_item = CartItem.objects.get(cart_id=cart_id, product_id=product_id)
-            cart_item.quantity += quantity
-            cart_item.save()
-            self.instance = cart_item
-        except CartItem.DoesNotExist:
-            self.instance = CartItem.objects.create(cart_id=cart_id, **self.validated_data)
-        
+            self.instance = CartItem.objects.add(cart_id, product_id, quantity)
+        except Cart.DoesNotExist:
+            raise NotFound('No cart with the given ID.')
+        except Product.DoesNotExist:
+            raise serializers.ValidationError({'product_id': ['No product with the given id.']})
+
         return self.instance
 
     class Meta:
         model = CartItem
         fields = ['id', 'product_id', 'quantity']
 
+class BulkAddCartItemListSerializer(serializers.ListSerializer):
+    def validate(self, items):
+        product_ids = {item['product_id'] for item in items}
+        found = set(Product.objects.filter(pk__in=product_ids).values_list('id', flat=True))
+        missing = sorted(product_ids - found)
+        if missing:
+            raise serializers.ValidationError(f'No products with the given ids: {missing}')
+        return items
+
+    def save(self, **kwargs):
+        cart_id = self.context['cart_id']
+        quantities = Counter()
+        for item in self.validated_data:
+            quantities[item['product_id']] += item['quantity']
+
+        cart = get_object_or_404(Cart, pk=cart_id)
+        existing = dict(
+            CartItem.objects
+            .filter(cart=cart, product_id__in=quantities)
+            .values_list('product_id', 'quantity')
+        )
+        too_many = sorted(
+            product_id for product_id, quantity in quantities.items()
+            if existing.get(product_id, 0) + quantity > MAX_CART_ITEM_QUANTITY
+        )
+        if too_many:
+            raise serializers.ValidationError(
+                f'Quantities would exceed {MAX_CART_ITEM_QUANTITY} for products: {too_many}'
+            )
+
+        # Merging in the INSERT, like single adds, keeps concurrent adds
+        # to the same items from overwriting each other; the INSERT also
+        # caps quantities another add pushed past the check above.
+        try:
+            with transaction.atomic():
+                Cart.objects.touch(cart.pk, cart.last_activity)
+                CartItem.objects.add_many(cart.pk, quantities)
+        except IntegrityError:
+            # A product or the cart was deleted since validation.
+            found = set(Product.objects.filter(pk__in=quantities).values_list('id', flat=True))
+            missing = sorted(set(quantities) - found)
+            if not missing:
+                raise NotFound('No cart with the given ID.')
+            raise serializers.ValidationError(f'No products with the given ids: {missing}')
+
+        return Cart.objects.prefetch_related('items__product').get(pk=cart.pk)
+
+class BulkAddCartItemSerializer(serializers.Serializer):
+    product_id = serializers.IntegerField()
+    quantity = serializers.IntegerField(min_value=1, max_value=MAX_CART_ITEM_QUANTITY)
+
+    class Meta:
+        list_serializer_class = BulkAddCartItemListSerializer
+
 class UpdateCartItemSerializer(serializers.ModelSerializer):
     class Meta:
         model = CartItem
@@ -120,24 +204,45 @@ class UpdateOrderSerializer(serializers.ModelSerializer):
         fields = ['payment_status']
 
 class CreateOrderSerializer(serializers.Serializer):
+    """
+    Checkout runs a fixed number of queries whatever the cart size:
+    validation, cart items with their products, the inventory UPDATE
+    (inside a savepoint), the customer (unless authentication already
+    resolved it), the order INSERT, the order items
+    bulk INSERT, raw DELETEs of the cart items and the cart, and one
+    SELECT of the order items with their products for the response.
+    """
     cart_id = serializers.UUIDField()
 
     def validate_cart_id(self, cart_id):
-        if not Cart.objects.filter(pk=cart_id).exists():
+        has_items = Cart.objects\
+            .filter(pk=cart_id)\
+            .annotate(has_items=Exists(CartItem.objects.filter(cart_id=OuterRef('pk'))))\
+            .values_list('has_items', flat=True)\
+            .first()
+        if has_items is None:
             raise serializers.ValidationError('No cart with the give ID')
-        if CartItem.objects.filter(cart_id=cart_id).count() == 0:
+        if not has_items:
             raise serializers.ValidationError('The cart is empty homie!')
         return cart_id
     
     def save(self, **kwargs):
         with transaction.atomic():
             cart_id = self.validated_data['cart_id']
-            customer = Customer.objects.get(user_id=self.context['user_id'])
-            order = Order.objects.create(customer=customer)
-
-            cart_items = CartItem.objects.\
+            cart_items = list(CartItem.objects.\
                 select_related('product').\
-                filter(cart_id=cart_id)
+                filter(cart_id=cart_id))
+
+            try:
+                inventory.reserve({item.product_id: item.quantity for item in cart_items})
+            except inventory.InsufficientInventory as error:
+                raise serializers.ValidationError({'cart_id': [str(error)]})
+
+            customer_id = self.context.get('customer_id')
+            if customer_id is None:
+                customer_id = Customer.objects.values_list('id', flat=True).get(user_id=self.context['user_id'])
+            order = Order.objects.create(customer_id=customer_id)
+
             order_items = [
                 OrderItem(
                     order=order,
@@ -149,9 +254,16 @@ class CreateOrderSerializer(serializers.Serializer):
 
             OrderItem.objects.bulk_create(order_items)
 
-            Cart.objects.filter(pk=cart_id).delete()
+            # Nothing listens for cart deletes, so skip the collector's
+            # per-relation SELECTs and delete the rows directly.
+            CartItem.objects.filter(cart_id=cart_id)._raw_delete(CartItem.objects.db)
+            Cart.objects.filter(pk=cart_id)._raw_delete(Cart.objects.db)
+
+            # Read the items back: bulk_create() doesn't set their ids on MySQL.
+            prefetch_related_objects(
+                [order], Prefetch('items', queryset=OrderItem.objects.select_related('product'))
+            )
 
             order_created.send_robust(self.__class__, order=order)
 
             return order
-        
\ No newline at end of file
@@ -1,3 +1,59 @@
+from django.db import models, transaction
 from django.dispatch import Signal
 
-order_created = Signal()
\ No newline at end of file
+
+def dotted_path(obj):
+    return f'{obj.__module__}.{obj.__qualname__}'
+
+
+class OnCommitSignal(Signal):
+    """
+    Signal whose receivers run as Celery tasks once the transaction that
+    sent it commits, so slow receivers don't hold up the sender.
+
+    Model instances passed to send() travel as (model label, pk) and are
+    fetched again in the worker. Receivers must be importable module-level
+    functions; each one is its own task and retries on its own, up to
+    `max_retries`. Failing to enqueue a task (say, the broker is down) is
+    logged rather than raised to the sender. Connect with
+    `synchronous=True` for receivers that must run inline, inside the
+    sender's transaction.
+    """
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.task_receivers = set()
+
+    def connect(self, receiver, sender=None, weak=True, dispatch_uid=None,
+                synchronous=False, max_retries=3):
+        if synchronous:
+            return super().connect(receiver, sender, weak, dispatch_uid)
+
+        receiver_path = dotted_path(receiver)
+        if '<locals>' in receiver_path:
+            raise ValueError(f'{receiver_path} cannot be imported by a worker.')
+
+        def enqueue(sender, **kwargs):
+            from store.tasks import run_signal_receiver
+
+            kwargs.pop('signal', None)
+            instances = {
+                name: (value._meta.label_lower, value.pk)
+                for name, value in kwargs.items() if isinstance(value, models.Model)
+            }
+            values = {name: value for name, value in kwargs.items() if name not in instances}
+            sender_path = dotted_path(sender) if sender is not None else None
+            transaction.on_commit(lambda: run_signal_receiver.delay(
+                receiver_path, sender_path, values, instances, max_retries
+            ), robust=True)
+
+        self.task_receivers.add(receiver_path)
+        super().connect(enqueue, sender, weak=False, dispatch_uid=dispatch_uid or receiver_path)
+
+    def disconnect(self, receiver=None, sender=None, dispatch_uid=None):
+        if dispatch_uid is None and receiver is not None and dotted_path(receiver) in self.task_receivers:
+            dispatch_uid = dotted_path(receiver)
+            self.task_receivers.discard(dispatch_uid)
+        return super().disconnect(receiver, sender, dispatch_uid)
+
+
+order_created = OnCommitSignal()
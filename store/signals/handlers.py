@@ -1,9 +1,147 @@
+from django.apps import apps
 from django.conf import settings
-from django.db.models.signals import post_save
+from django.contrib.contenttypes.models import ContentType
+from django.db import transaction
+from django.db.models import F
+from django.db.models.signals import m2m_changed, post_save, post_delete, pre_delete
 from django.dispatch import receiver
-from store.models import Customer
+from core.authentication import forget_token, forget_user
+from store.cache import invalidate
+from store.images import derivative_names
+from store.models import Collection, Customer, Product, ProductImage, Review, ReviewSummary
+from store.search import get_search_backend
+from store.tasks import generate_image_derivatives
+from tags.models import Tag, TaggedItem
 
 @receiver(post_save, sender=settings.AUTH_USER_MODEL)
 def create_customer_for_new_user(sender, **kwargs):
     if kwargs['created']:
-        Customer.objects.create(user=kwargs['instance'])
\ No newline at end of file
+        Customer.objects.create(user=kwargs['instance'])
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+@receiver(post_delete, sender=settings.AUTH_USER_MODEL)
+def forget_cached_user(sender, **kwargs):
+    # A new user has no tokens yet.
+    if not kwargs.get('created'):
+        forget_user(kwargs['instance'].pk)
+
+@receiver(post_save, sender=Customer)
+@receiver(post_delete, sender=Customer)
+def forget_cached_customer(sender, **kwargs):
+    forget_user(kwargs['instance'].user_id)
+
+if apps.is_installed('rest_framework_simplejwt.token_blacklist'):
+    from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken
+
+    @receiver(post_save, sender=BlacklistedToken)
+    def forget_blacklisted_token(sender, **kwargs):
+        forget_token(kwargs['instance'].token.jti)
+
+@receiver(post_save, sender=Product)
+def index_product(sender, **kwargs):
+    backend = get_search_backend()
+    if backend is not None:
+        backend.index([kwargs['instance']])
+
+@receiver(post_delete, sender=Product)
+def unindex_product(sender, **kwargs):
+    backend = get_search_backend()
+    if backend is not None:
+        backend.remove([kwargs['instance'].pk])
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+def invalidate_product(sender, **kwargs):
+    product = kwargs['instance']
+    invalidate(
+        product_ids=[product.pk],
+        collection_ids=[product.collection_id, getattr(product, '_loaded_collection_id', None)]
+    )
+
+@receiver(post_delete, sender=Product)
+def decrement_products_count(sender, **kwargs):
+    # Runs inside the delete's transaction; Product.save() handles the rest.
+    product = kwargs['instance']
+    collection_id = getattr(product, '_loaded_collection_id', product.collection_id)
+    Collection.objects.filter(pk=collection_id).update(products_count=F('products_count') - 1)
+
+def invalidate_product_by_id(product_id):
+    collection_id = Product.objects.filter(pk=product_id).values_list('collection_id', flat=True).first()
+    invalidate(product_ids=[product_id], collection_ids=[collection_id])
+
+@receiver(post_save, sender=ProductImage)
+@receiver(post_delete, sender=ProductImage)
+@receiver(post_save, sender=Review)
+@receiver(post_delete, sender=Review)
+def invalidate_product_detail(sender, **kwargs):
+    invalidate_product_by_id(kwargs['instance'].product_id)
+
+@receiver(post_save, sender=TaggedItem)
+@receiver(post_delete, sender=TaggedItem)
+def invalidate_product_tags(sender, **kwargs):
+    item = kwargs['instance']
+    if item.content_type_id == ContentType.objects.get_for_model(Product).pk:
+        invalidate_product_by_id(item.object_id)
+
+@receiver(post_save, sender=Tag)
+@receiver(pre_delete, sender=Tag)
+def invalidate_tagged_products(sender, **kwargs):
+    # Before a delete, while the tag's items (which cascade) are still there.
+    product_ids = TaggedItem.objects\
+        .filter(tag=kwargs['instance'], content_type=ContentType.objects.get_for_model(Product))\
+        .values_list('object_id', flat=True)
+    products = list(Product.objects.filter(pk__in=product_ids).values_list('id', 'collection_id'))
+    if products:
+        invalidate(
+            product_ids=[product_id for product_id, _ in products],
+            collection_ids=[collection_id for _, collection_id in products]
+        )
+
+@receiver(post_delete, sender=Review)
+def remove_review_from_summary(sender, **kwargs):
+    # The summary goes away with the product; no need to count down.
+    if isinstance(kwargs['origin'], Product) or getattr(kwargs['origin'], 'model', None) is Product:
+        return
+    review = kwargs['instance']
+    ReviewSummary.objects.record(
+        getattr(review, '_loaded_product_id', review.product_id),
+        removed=[getattr(review, '_loaded_rating', review.rating)]
+    )
+
+@receiver(post_save, sender=ProductImage)
+def queue_image_derivatives(sender, **kwargs):
+    image = kwargs['instance']
+    if kwargs['created'] or image.image.name != getattr(image, '_loaded_image_name', None):
+        transaction.on_commit(lambda: generate_image_derivatives.delay(image.pk), robust=True)
+
+@receiver(post_delete, sender=ProductImage)
+def delete_image_derivatives(sender, **kwargs):
+    image = kwargs['instance']
+    names = derivative_names(image.derivatives)
+    if names:
+        storage = image.image.storage
+        transaction.on_commit(lambda: [storage.delete(name) for name in names], robust=True)
+
+@receiver(post_save, sender=Collection)
+@receiver(post_delete, sender=Collection)
+def invalidate_collection(sender, **kwargs):
+    invalidate(collection_ids=[kwargs['instance'].pk])
+
+@receiver(m2m_changed, sender=Product.promotions.through)
+def invalidate_promotions(sender, **kwargs):
+    if kwargs['action'] not in ('post_add', 'post_remove', 'pre_clear'):
+        return
+
+    instance = kwargs['instance']
+    if not kwargs['reverse']:
+        products = [(instance.pk, instance.collection_id)]
+    elif kwargs['action'] == 'pre_clear':
+        products = instance.product_set.values_list('id', 'collection_id')
+    else:
+        products = Product.objects.filter(pk__in=kwargs['pk_set']).values_list('id', 'collection_id')
+
+    products = list(products)
+    invalidate(
+        product_ids=[product_id for product_id, _ in products],
+        collection_ids=[collection_id for _, collection_id in products]
+    )
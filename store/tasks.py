@@ -0,0 +1,64 @@
+from celery import shared_task
+from django.apps import apps
+from django.core.cache import cache
+from django.core.exceptions import ObjectDoesNotExist
+from django.core.files.base import ContentFile
+from django.utils.module_loading import import_string
+from PIL import UnidentifiedImageError
+from .carts import delete_abandoned_carts as delete_carts
+from .images import derivative_name, derivative_names, render_derivatives
+from .models import ProductImage
+
+CART_CLEANUP_LOCK_KEY = 'store:delete_abandoned_carts:lock'
+CART_CLEANUP_LOCK_TIMEOUT = 60 * 60
+
+@shared_task(bind=True)
+def run_signal_receiver(self, receiver_path, sender_path, values, instances, max_retries):
+    receiver = import_string(receiver_path)
+    sender = import_string(sender_path) if sender_path else None
+    kwargs = dict(values)
+    for name, (label, pk) in instances.items():
+        # A row deleted since the signal was sent won't come back; don't retry.
+        kwargs[name] = apps.get_model(label).objects.get(pk=pk)
+
+    try:
+        receiver(sender=sender, **kwargs)
+    except ObjectDoesNotExist:
+        raise
+    except Exception as exc:
+        raise self.retry(exc=exc, max_retries=max_retries, countdown=2 ** self.request.retries)
+
+@shared_task
+def generate_image_derivatives(image_id):
+    image = ProductImage.objects.filter(pk=image_id).first()
+    if image is None or not image.image:
+        return
+
+    try:
+        with image.image.open('rb') as file:
+            rendered = render_derivatives(file)
+    except UnidentifiedImageError:
+        return
+
+    storage = image.image.storage
+    replaced = derivative_names(image.derivatives)
+    image.derivatives = {
+        size: {
+            extension: storage.save(derivative_name(image.image.name, size, extension), ContentFile(content))
+            for extension, content in formats.items()
+        }
+        for size, formats in rendered.items()
+    }
+    image.save(update_fields=['derivatives'])
+    for name in set(replaced) - set(derivative_names(image.derivatives)):
+        storage.delete(name)
+
+@shared_task
+def delete_abandoned_carts():
+    # Skip the tick while a previous run is still deleting.
+    if not cache.add(CART_CLEANUP_LOCK_KEY, True, CART_CLEANUP_LOCK_TIMEOUT):
+        return None
+    try:
+        return delete_carts().as_dict()
+    finally:
+        cache.delete(CART_CLEANUP_LOCK_KEY)
@@ -12,4 +12,12 @@ def api_client():
 def authenticate(api_client):
     def do_authenticate(is_staff=False):
         return api_client.force_authenticate(user=User(is_staff=is_staff))
-    return do_authenticate
\ No newline at end of file
+    return do_authenticate
+
+@pytest.fixture(autouse=True)
+def local_cache(settings):
+    settings.CACHES = {
+        'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}
+    }
+    from django.core.cache import cache
+    cache.clear()
@@ -0,0 +1,110 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework import status
+from rest_framework_simplejwt.tokens import AccessToken
+import pytest
+from model_bakery import baker
+
+from core.authentication import LocalCache, forget_token, local_cache
+from core.models import User
+from store.models import Cart, CartItem, Order, Product
+
+
+@pytest.fixture(autouse=True)
+def clear_local_cache():
+    local_cache.clear()
+
+
+@pytest.fixture
+def token_user(api_client):
+    user = baker.make(User)
+    token = AccessToken.for_user(user)
+    api_client.credentials(HTTP_AUTHORIZATION=f'JWT {token}')
+    user.token = token
+    return user
+
+
+def user_queries(client, path):
+    with CaptureQueriesContext(connection) as context:
+        response = client.get(path)
+    return response, [query['sql'] for query in context if 'core_user' in query['sql']]
+
+
+@pytest.mark.django_db
+class TestCachedJWTAuthentication:
+    def test_user_is_loaded_once_per_token(self, api_client, token_user):
+        _, first = user_queries(api_client, '/store/orders/')
+        response, second = user_queries(api_client, '/store/orders/')
+
+        assert response.status_code == status.HTTP_200_OK
+        assert len(first) == 1
+        assert second == []
+
+    def test_shared_cache_serves_other_processes(self, api_client, token_user):
+        user_queries(api_client, '/store/orders/')
+        local_cache.clear()
+
+        _, queries = user_queries(api_client, '/store/orders/')
+
+        assert queries == []
+
+    def test_orders_are_filtered_by_cached_customer_id(self, api_client, token_user):
+        own = baker.make(Order, customer=token_user.customer)
+        baker.make(Order, customer=baker.make(User).customer)
+
+        api_client.get('/store/orders/')
+        with CaptureQueriesContext(connection) as context:
+            response = api_client.get('/store/orders/')
+
+        assert [order['id'] for order in response.data['results']] == [own.id]
+        assert not any('store_customer' in query['sql'] for query in context)
+
+    def test_checkout_uses_cached_customer_id(self, api_client, token_user):
+        cart = baker.make(Cart)
+        baker.make(CartItem, cart=cart, product=baker.make(Product, inventory=5), quantity=1)
+
+        response = api_client.post('/store/orders/', {'cart_id': cart.id})
+
+        assert response.status_code == status.HTTP_200_OK
+        assert Order.objects.get().customer_id == token_user.customer.id
+
+    def test_deactivating_user_is_seen_by_next_request(self, api_client, token_user):
+        api_client.get('/store/orders/')
+        token_user.is_active = False
+        token_user.save()
+
+        response = api_client.get('/store/orders/')
+
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+    def test_forgotten_token_loads_user_again(self, api_client, token_user):
+        api_client.get('/store/orders/')
+        forget_token(token_user.token['jti'])
+
+        _, queries = user_queries(api_client, '/store/orders/')
+
+        assert len(queries) == 1
+
+    def test_saving_cached_user_keeps_password(self, api_client, token_user):
+        token_user.set_password('secret')
+        token_user.save()
+        api_client.get('/store/orders/')
+
+        response = api_client.put('/auth/users/me/', {'email': 'new@example.com', 'first_name': 'New'})
+
+        token_user.refresh_from_db()
+        assert response.status_code == status.HTTP_200_OK
+        assert token_user.check_password('secret')
+
+
+def test_local_cache_evicts_least_recently_used_and_expired():
+    cache = LocalCache(maxsize=2)
+    cache.set('a', 1, 60)
+    cache.set('b', 2, 60)
+    cache.get('a')
+    cache.set('c', 3, 60)
+    cache.set('c', 3, -1)
+
+    assert cache.get('a') == 1
+    assert cache.get('b') is None
+    assert cache.get('c') is None
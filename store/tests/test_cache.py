@@ -0,0 +1,114 @@
+from rest_framework import status
+import pytest
+from model_bakery import baker
+
+from store.cache import get_stats
+from store.models import Collection, Product, ProductImage, Promotion
+
+
+@pytest.fixture
+def collection():
+    return baker.make(Collection)
+
+
+@pytest.fixture
+def product(collection):
+    return baker.make(Product, collection=collection, title='Kettle')
+
+
+def get(api_client, url):
+    response = api_client.get(url)
+    assert response.status_code == status.HTTP_200_OK
+    return response
+
+
+@pytest.mark.django_db
+class TestResponseCache:
+    def test_repeated_request_is_a_hit(self, api_client, product):
+        first = get(api_client, f'/store/products/{product.id}/')
+        second = get(api_client, f'/store/products/{product.id}/')
+
+        assert second.data == first.data
+        assert get_stats()['hits'] == 1
+        assert get_stats()['misses'] == 1
+
+    def test_query_param_order_does_not_matter(self, api_client, product):
+        get(api_client, '/store/products/?ordering=title&page=1')
+        get(api_client, '/store/products/?page=1&ordering=title')
+
+        assert get_stats()['hits'] == 1
+
+    def test_http_and_https_are_cached_apart(self, api_client, product):
+        get(api_client, '/store/products/')
+        response = api_client.get('/store/products/', secure=True)
+
+        assert get_stats()['hits'] == 0
+        assert response.data['results'][0]['id'] == product.id
+
+    def test_product_update_invalidates_detail_and_list(self, api_client, product):
+        get(api_client, f'/store/products/{product.id}/')
+        get(api_client, f'/store/products/?collection_id={product.collection_id}')
+
+        product.title = 'Teapot'
+        product.save()
+
+        detail = get(api_client, f'/store/products/{product.id}/')
+        listing = get(api_client, f'/store/products/?collection_id={product.collection_id}')
+        assert detail.data['title'] == 'Teapot'
+        assert listing.data['results'][0]['title'] == 'Teapot'
+
+    def test_other_collections_stay_cached(self, api_client, product):
+        other = baker.make(Collection)
+        get(api_client, f'/store/products/?collection_id={other.id}')
+
+        product.title = 'Teapot'
+        product.save()
+        get(api_client, f'/store/products/?collection_id={other.id}')
+
+        assert get_stats()['hits'] == 1
+
+    def test_moving_product_invalidates_old_collection(self, api_client, product):
+        old_collection_id = product.collection_id
+        get(api_client, f'/store/products/?collection_id={old_collection_id}')
+
+        product = Product.objects.get(pk=product.pk)
+        product.collection = baker.make(Collection)
+        product.save()
+
+        response = get(api_client, f'/store/products/?collection_id={old_collection_id}')
+        assert response.data['results'] == []
+
+    def test_new_image_invalidates_product(self, api_client, product):
+        get(api_client, f'/store/products/{product.id}/')
+
+        baker.make(ProductImage, product=product, image='store/images/a.jpg')
+
+        response = get(api_client, f'/store/products/{product.id}/')
+        assert len(response.data['images']) == 1
+
+    def test_promotion_change_invalidates_product(self, api_client, product):
+        get(api_client, f'/store/products/{product.id}/')
+
+        baker.make(Promotion).product_set.add(product)
+        get(api_client, f'/store/products/{product.id}/')
+
+        assert get_stats()['hits'] == 0
+
+    def test_collection_count_follows_products(self, api_client, collection):
+        def counts():
+            detail = get(api_client, f'/store/collections/{collection.id}/').data
+            listing = get(api_client, '/store/collections/').data
+            return detail['products_count'], [c['products_count'] for c in listing if c['id'] == collection.id]
+
+        assert counts() == (0, [0])
+
+        baker.make(Product, collection=collection)
+
+        assert counts() == (1, [1])
+
+    def test_stats_require_admin(self, api_client, authenticate):
+        authenticate()
+
+        response = api_client.get('/store/cache-stats/')
+
+        assert response.status_code == status.HTTP_403_FORBIDDEN
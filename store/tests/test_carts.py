@@ -0,0 +1,343 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from importlib import import_module
+from io import StringIO
+from threading import Barrier
+from django.apps import apps
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+import pytest
+from model_bakery import baker
+
+from store import carts
+from store.carts import delete_abandoned_carts
+from store.models import Cart, CartItem, Product
+from store.serializers import BulkAddCartItemListSerializer
+
+
+@pytest.fixture
+def cart():
+    return baker.make(Cart)
+
+
+@pytest.fixture
+def product():
+    return baker.make(Product)
+
+
+@pytest.fixture
+def add_item(api_client):
+    def do_add_item(cart_id, product_id, quantity=1):
+        return api_client.post(
+            f'/store/carts/{cart_id}/items/',
+            {'product_id': product_id, 'quantity': quantity}
+        )
+    return do_add_item
+
+
+@pytest.mark.django_db
+class TestAddCartItem:
+    def test_new_product_returns_201(self, add_item, cart, product):
+        response = add_item(cart.id, product.id, 2)
+
+        assert response.status_code == status.HTTP_201_CREATED
+        item = CartItem.objects.get(cart=cart, product=product)
+        assert response.data == {'id': item.id, 'product_id': product.id, 'quantity': 2}
+
+    def test_existing_product_increments_quantity(self, add_item, cart, product):
+        add_item(cart.id, product.id, 2)
+
+        response = add_item(cart.id, product.id, 3)
+
+        assert response.data['quantity'] == 5
+        assert CartItem.objects.get(cart=cart, product=product).quantity == 5
+
+    def test_unknown_product_returns_400(self, add_item, cart):
+        response = add_item(cart.id, 0)
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert response.data['product_id'] is not None
+
+    @pytest.mark.parametrize('cart_id', ['00000000-0000-0000-0000-000000000000', 'not-a-uuid'])
+    def test_unknown_cart_returns_404(self, add_item, product, cart_id):
+        response = add_item(cart_id, product.id)
+
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+    def test_add_does_not_read_before_writing(self, add_item, cart, product, django_assert_max_num_queries):
+        with django_assert_max_num_queries(2):
+            add_item(cart.id, product.id)
+
+
+@pytest.mark.concurrency
+@pytest.mark.django_db(transaction=True)
+def test_concurrent_adds_do_not_lose_updates(cart, product):
+    if connection.vendor == 'sqlite':
+        pytest.skip('SQLite locks whole tables under concurrent writers')
+
+    workers, adds = 8, 5
+    barrier = Barrier(workers)
+
+    def hammer():
+        client = APIClient()
+        barrier.wait()
+        try:
+            return [
+                client.post(
+                    f'/store/carts/{cart.id}/items/',
+                    {'product_id': product.id, 'quantity': 1}
+                ).status_code
+                for _ in range(adds)
+            ]
+        finally:
+            connection.close()
+
+    with ThreadPoolExecutor(workers) as executor:
+        results = [code for codes in executor.map(lambda _: hammer(), range(workers)) for code in codes]
+
+    assert set(results) == {status.HTTP_201_CREATED}
+    assert CartItem.objects.get(cart=cart, product=product).quantity == workers * adds
+
+
+@pytest.mark.concurrency
+@pytest.mark.django_db(transaction=True)
+def test_concurrent_single_and_bulk_adds_do_not_lose_updates(cart, product):
+    if connection.vendor == 'sqlite':
+        pytest.skip('SQLite locks whole tables under concurrent writers')
+
+    workers, adds = 8, 5
+    barrier = Barrier(workers)
+
+    def hammer(worker):
+        client = APIClient()
+        barrier.wait()
+        try:
+            if worker % 2:
+                return [
+                    client.post(
+                        f'/store/carts/{cart.id}/items/bulk/',
+                        [{'product_id': product.id, 'quantity': 1}], format='json'
+                    ).status_code
+                    for _ in range(adds)
+                ]
+            return [
+                client.post(
+                    f'/store/carts/{cart.id}/items/',
+                    {'product_id': product.id, 'quantity': 1}
+                ).status_code
+                for _ in range(adds)
+            ]
+        finally:
+            connection.close()
+
+    with ThreadPoolExecutor(workers) as executor:
+        results = [code for codes in executor.map(hammer, range(workers)) for code in codes]
+
+    assert set(results) <= {status.HTTP_200_OK, status.HTTP_201_CREATED}
+    assert CartItem.objects.get(cart=cart, product=product).quantity == workers * adds
+
+
+@pytest.fixture
+def bulk_add(api_client):
+    def do_bulk_add(cart_id, items):
+        return api_client.post(f'/store/carts/{cart_id}/items/bulk/', items, format='json')
+    return do_bulk_add
+
+
+@pytest.mark.django_db
+class TestBulkAddCartItems:
+    def test_adds_new_and_increments_existing_items(self, bulk_add, add_item, cart):
+        first, second = baker.make(Product, _quantity=2)
+        add_item(cart.id, first.id, 1)
+
+        response = bulk_add(cart.id, [
+            {'product_id': first.id, 'quantity': 2},
+            {'product_id': second.id, 'quantity': 1},
+            {'product_id': second.id, 'quantity': 3},
+        ])
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['id'] == str(cart.id)
+        quantities = {item['product']['id']: item['quantity'] for item in response.data['items']}
+        assert quantities == {first.id: 3, second.id: 4}
+
+    def test_unknown_product_returns_400_and_adds_nothing(self, bulk_add, cart, product):
+        response = bulk_add(cart.id, [
+            {'product_id': product.id, 'quantity': 1},
+            {'product_id': 0, 'quantity': 1},
+        ])
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert not CartItem.objects.filter(cart=cart).exists()
+
+    def test_quantity_above_field_limit_returns_400_and_adds_nothing(self, bulk_add, add_item, cart):
+        first, second = baker.make(Product, _quantity=2)
+        add_item(cart.id, first.id, 30000)
+
+        response = bulk_add(cart.id, [
+            {'product_id': first.id, 'quantity': 2768},
+            {'product_id': second.id, 'quantity': 1},
+        ])
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert str(first.id) in str(response.data)
+        assert CartItem.objects.get(cart=cart, product=first).quantity == 30000
+        assert not CartItem.objects.filter(cart=cart, product=second).exists()
+
+    def test_quantity_at_field_limit_is_added(self, bulk_add, add_item, cart, product):
+        add_item(cart.id, product.id, 30000)
+
+        response = bulk_add(cart.id, [{'product_id': product.id, 'quantity': 2767}])
+
+        assert response.status_code == status.HTTP_200_OK
+        assert CartItem.objects.get(cart=cart, product=product).quantity == 32767
+
+    def test_upsert_caps_quantity_at_field_limit(self, cart, product):
+        baker.make(CartItem, cart=cart, product=product, quantity=32000)
+
+        CartItem.objects.add_many(cart.id, {product.id: 1000})
+
+        assert CartItem.objects.get(cart=cart, product=product).quantity == 32767
+
+    def test_empty_list_returns_400(self, bulk_add, cart):
+        response = bulk_add(cart.id, [])
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_unknown_cart_returns_404(self, bulk_add, product):
+        response = bulk_add('not-a-uuid', [{'product_id': product.id, 'quantity': 1}])
+
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+    def test_query_count_does_not_grow_with_items(self, bulk_add, cart, django_assert_max_num_queries):
+        products = baker.make(Product, _quantity=20)
+        bulk_add(cart.id, [{'product_id': p.id, 'quantity': 1} for p in products[:10]])
+
+        with django_assert_max_num_queries(10):
+            response = bulk_add(cart.id, [{'product_id': p.id, 'quantity': 1} for p in products])
+
+        assert len(response.data['items']) == 20
+
+
+@pytest.mark.django_db(transaction=True)
+def test_bulk_add_of_product_deleted_after_validation_returns_400(bulk_add, cart, monkeypatch):
+    kept, deleted = baker.make(Product, _quantity=2)
+    validate = BulkAddCartItemListSerializer.validate
+
+    def validate_then_delete(self, items):
+        items = validate(self, items)
+        Product.objects.filter(pk=deleted.pk).delete()
+        return items
+    monkeypatch.setattr(BulkAddCartItemListSerializer, 'validate', validate_then_delete)
+
+    response = bulk_add(cart.id, [
+        {'product_id': kept.id, 'quantity': 1},
+        {'product_id': deleted.id, 'quantity': 1},
+    ])
+
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert str(deleted.id) in str(response.data)
+    assert not CartItem.objects.filter(cart=cart).exists()
+
+
+def days_ago(days):
+    return timezone.now() - timedelta(days=days)
+
+
+@pytest.mark.django_db
+class TestCartActivity:
+    def test_adding_item_touches_idle_cart(self, add_item, product):
+        cart = baker.make(Cart, last_activity=days_ago(1))
+
+        add_item(cart.id, product.id)
+
+        cart.refresh_from_db()
+        assert cart.last_activity > days_ago(0.01)
+
+    def test_idle_cart_is_touched_before_item_is_inserted(self, product):
+        cart = baker.make(Cart, last_activity=days_ago(1))
+
+        with CaptureQueriesContext(connection) as context:
+            CartItem.objects.add(cart.id, product.id, 1)
+
+        statements = [query['sql'].split()[0] for query in context]
+        assert statements == ['UPDATE', 'INSERT']
+
+    def test_recently_touched_cart_is_not_rewritten(self, product):
+        recent = timezone.now() - timedelta(minutes=1)
+        cart = baker.make(Cart, last_activity=recent)
+
+        CartItem.objects.add(cart.id, product.id, 1)
+
+        cart.refresh_from_db()
+        assert cart.last_activity == recent
+
+    def test_removing_item_touches_cart(self, api_client, product):
+        cart = baker.make(Cart, last_activity=days_ago(1))
+        item = baker.make(CartItem, cart=cart, product=product, quantity=1)
+
+        api_client.delete(f'/store/carts/{cart.id}/items/{item.id}/')
+
+        cart.refresh_from_db()
+        assert cart.last_activity > days_ago(0.01)
+
+    def test_migration_backfills_activity_from_creation(self):
+        cart = baker.make(Cart)
+        Cart.objects.filter(pk=cart.pk).update(created_at=days_ago(40))
+        migration = import_module('store.migrations.0020_cart_last_activity')
+
+        migration.backfill_last_activity(apps, None)
+
+        cart.refresh_from_db()
+        assert cart.last_activity == cart.created_at
+
+
+@pytest.mark.django_db
+class TestDeleteAbandonedCarts:
+    def test_deletes_idle_carts_and_their_items(self, product):
+        idle = baker.make(Cart, last_activity=days_ago(40), _quantity=3)
+        active = baker.make(Cart, last_activity=days_ago(1))
+        for cart in idle + [active]:
+            baker.make(CartItem, cart=cart, product=product, quantity=1)
+
+        report = delete_abandoned_carts(timedelta(days=30), batch_size=2)
+
+        assert list(Cart.objects.all()) == [active]
+        assert list(CartItem.objects.values_list('cart_id', flat=True)) == [active.id]
+        assert (report.carts, report.items, report.batches) == (3, 3, 2)
+
+    def test_walks_past_carts_with_equal_activity(self):
+        stamp = days_ago(40)
+        baker.make(Cart, last_activity=stamp, _quantity=5)
+
+        report = delete_abandoned_carts(timedelta(days=30), batch_size=2)
+
+        assert report.carts == 5
+        assert not Cart.objects.exists()
+
+    def test_cart_touched_after_being_picked_survives(self, product, monkeypatch):
+        cart = baker.make(Cart, last_activity=days_ago(40))
+        idle_cart_batches = carts.idle_cart_batches
+
+        def add_after_picking(cutoff, batch_size):
+            for cart_ids in idle_cart_batches(cutoff, batch_size):
+                CartItem.objects.add(cart.id, product.id, 1)
+                yield cart_ids
+        monkeypatch.setattr(carts, 'idle_cart_batches', add_after_picking)
+
+        report = delete_abandoned_carts(timedelta(days=30))
+
+        assert report.carts == 0
+        assert CartItem.objects.filter(cart=cart).count() == 1
+
+    def test_command_prints_report(self):
+        baker.make(Cart, last_activity=days_ago(10))
+        out = StringIO()
+
+        call_command('delete_abandoned_carts', days=5, stdout=out)
+
+        assert 'Deleted 1 carts and 0 items' in out.getvalue()
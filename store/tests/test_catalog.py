@@ -0,0 +1,148 @@
+import json
+from decimal import Decimal
+from io import StringIO
+from django.contrib.contenttypes.models import ContentType
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from rest_framework import status
+import pytest
+from model_bakery import baker
+
+from store.catalog import RowError, clean_row, import_catalog
+from store.models import Collection, Product, ProductImage, Promotion
+from tags.models import TaggedItem
+
+CSV = (
+    'title,slug,unit_price,inventory,collection,tags,promotions\n'
+    'Espresso Mug,espresso-mug,12.50,10,Import mugs,ceramic|small,{promotion}\n'
+    'Travel Mug,,20,5,Import mugs,steel,\n'
+    'Broken,broken,0,5,Import mugs,,\n'
+)
+
+
+def tags_of(product):
+    content_type = ContentType.objects.get_for_model(Product)
+    return set(TaggedItem.objects
+               .filter(content_type=content_type, object_id=product.pk)
+               .values_list('tag__label', flat=True))
+
+
+@pytest.mark.django_db
+class TestImportCatalog:
+    def test_creates_products_with_collections_tags_and_promotions(self):
+        promotion = baker.make(Promotion)
+
+        report = import_catalog(StringIO(CSV.format(promotion=promotion.id)), 'csv')
+
+        assert report['created'] == 2
+        assert report['skipped'] == 1
+        assert report['errors'][0]['line'] == 4
+        collection = Collection.objects.get(title='Import mugs')
+        mug = Product.objects.get(slug='espresso-mug')
+        assert mug.collection == collection
+        assert list(mug.promotions.all()) == [promotion]
+        assert tags_of(mug) == {'ceramic', 'small'}
+        assert Product.objects.get(slug='travel-mug').collection == collection
+
+    def test_existing_slug_updates_and_replaces_tags(self):
+        promotion = baker.make(Promotion)
+        import_catalog(StringIO(CSV.format(promotion=promotion.id)), 'csv')
+        jsonl = json.dumps({
+            'title': 'Espresso Cup', 'slug': 'espresso-mug', 'unit_price': 9,
+            'collection': 'Import cups', 'tags': ['glass'], 'images': ['store/images/cup.jpg'],
+        })
+
+        report = import_catalog(StringIO(jsonl + '\n'), 'jsonl')
+
+        assert report['updated'] == 1
+        mug = Product.objects.get(slug='espresso-mug')
+        assert mug.title == 'Espresso Cup'
+        assert mug.collection.title == 'Import cups'
+        assert mug.collection.products_count == 1
+        assert Collection.objects.get(title='Import mugs').products_count == 1
+        assert not mug.promotions.exists()
+        assert tags_of(mug) == {'glass'}
+        assert ProductImage.objects.get(product=mug).image.name == 'store/images/cup.jpg'
+
+    def test_unknown_promotion_skips_row(self):
+        report = import_catalog(StringIO(CSV.format(promotion=0)), 'csv')
+
+        assert report['created'] == 1
+        assert not Product.objects.filter(slug='espresso-mug').exists()
+
+    def test_writes_in_chunks(self, django_assert_max_num_queries):
+        rows = ''.join(f'Mug {i},,10,1,Import mugs,ceramic,\n' for i in range(50))
+        file = StringIO('title,slug,unit_price,inventory,collection,tags,promotions\n' + rows)
+
+        # The query count depends on the number of chunks, not of rows.
+        with django_assert_max_num_queries(60):
+            report = import_catalog(file, 'csv', chunk_size=10)
+
+        assert report['created'] == 50
+
+    def test_command(self, tmp_path):
+        path = tmp_path / 'catalog.csv'
+        path.write_text(CSV.format(promotion=''))
+        out = StringIO()
+
+        call_command('import_catalog', str(path), stdout=out, stderr=StringIO())
+
+        assert '2 created' in out.getvalue()
+
+
+VALID_ROW = {'title': 'Espresso Mug', 'unit_price': '12.50', 'inventory': 10, 'collection': 'Mugs'}
+
+
+class TestCleanRow:
+    @pytest.mark.parametrize('unit_price', ['NaN', 'sNaN', 'Infinity', '-Infinity'])
+    def test_non_finite_price_is_rejected(self, unit_price):
+        with pytest.raises(RowError, match='unit_price'):
+            clean_row({**VALID_ROW, 'unit_price': unit_price})
+
+    def test_inventory_above_field_range_is_rejected(self):
+        with pytest.raises(RowError, match='inventory'):
+            clean_row({**VALID_ROW, 'inventory': 2 ** 63})
+
+    def test_image_name_longer_than_field_is_rejected(self):
+        name = 'store/images/' + 'x' * 100 + '.jpg'
+
+        with pytest.raises(RowError, match='Image names'):
+            clean_row({**VALID_ROW, 'images': [name]})
+
+    def test_valid_row_is_cleaned(self):
+        row = clean_row({**VALID_ROW, 'images': ['store/images/mug.jpg']})
+
+        assert row['unit_price'] == Decimal('12.50')
+        assert row['inventory'] == 10
+        assert row['images'] == ['store/images/mug.jpg']
+
+
+@pytest.mark.django_db
+class TestCatalogImportView:
+    def post(self, api_client, content, name='catalog.csv'):
+        return api_client.post('/store/catalog-import/', {
+            'file': SimpleUploadedFile(name, content.encode('utf-8'))
+        }, format='multipart')
+
+    def test_if_user_is_not_admin_returns_403(self, api_client, authenticate):
+        authenticate()
+
+        response = self.post(api_client, CSV.format(promotion=''))
+
+        assert response.status_code == status.HTTP_403_FORBIDDEN
+
+    def test_if_user_is_admin_returns_report(self, api_client, authenticate):
+        authenticate(is_staff=True)
+
+        response = self.post(api_client, CSV.format(promotion=''))
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['created'] == 2
+        assert response.data['skipped'] == 1
+
+    def test_if_format_is_unknown_returns_400(self, api_client, authenticate):
+        authenticate(is_staff=True)
+
+        response = self.post(api_client, 'title\n', name='catalog.txt')
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
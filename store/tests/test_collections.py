@@ -1,4 +1,6 @@
+from io import StringIO
 from django.contrib.auth.models import User
+from django.core.management import call_command
 from rest_framework import status
 import pytest
 from model_bakery import baker
@@ -153,3 +155,45 @@ class TestListCollections:
 
         assert response.status_code == status.HTTP_200_OK
         assert len(response.data) == 3
+
+
+@pytest.mark.django_db
+class TestProductsCount:
+    def count(self, collection):
+        collection.refresh_from_db()
+        return collection.products_count
+
+    def test_follows_product_create_move_and_delete(self):
+        old, new = baker.make(Collection, _quantity=2)
+        product = baker.make(Product, collection=old)
+        baker.make(Product, collection=old)
+        assert self.count(old) == 2
+
+        product.collection = new
+        product.save()
+        product.save()
+        assert (self.count(old), self.count(new)) == (1, 1)
+
+        product.delete()
+        Product.objects.filter(collection=old).delete()
+        assert (self.count(old), self.count(new)) == (0, 0)
+
+    def test_list_reads_the_stored_count_in_one_query(self, api_client, django_assert_num_queries):
+        collection = baker.make(Collection)
+        baker.make(Product, collection=collection, _quantity=3)
+
+        with django_assert_num_queries(1):
+            response = api_client.get('/store/collections/')
+
+        assert [c['products_count'] for c in response.data if c['id'] == collection.id] == [3]
+
+    def test_reconcile_command_repairs_drift(self):
+        collection = baker.make(Collection)
+        baker.make(Product, collection=collection, _quantity=2)
+        Collection.objects.filter(pk=collection.pk).update(products_count=7)
+        out = StringIO()
+
+        call_command('reconcile_collection_counts', stdout=out)
+
+        assert self.count(collection) == 2
+        assert out.getvalue().startswith('1 collection')
@@ -0,0 +1,114 @@
+from io import BytesIO
+from django.core.files.uploadedfile import SimpleUploadedFile
+from kombu.exceptions import OperationalError
+from PIL import Image
+import pytest
+from model_bakery import baker
+
+from store import tasks
+from store.images import derivative_names, render_derivatives
+from store.models import Product, ProductImage
+
+
+def png(width, height):
+    buffer = BytesIO()
+    Image.new('RGBA', (width, height), (200, 30, 30, 255)).save(buffer, 'PNG')
+    return buffer.getvalue()
+
+
+@pytest.fixture(autouse=True)
+def media_root(settings, tmp_path):
+    settings.MEDIA_ROOT = tmp_path
+
+
+@pytest.fixture
+def product_image():
+    return baker.make(
+        ProductImage,
+        product=baker.make(Product),
+        image=SimpleUploadedFile('mug.png', png(2000, 1000), content_type='image/png')
+    )
+
+
+class TestRenderDerivatives:
+    def test_fits_each_size_in_jpeg_and_webp(self):
+        derivatives = render_derivatives(BytesIO(png(2000, 1000)))
+
+        sizes = {
+            size: {ext: Image.open(BytesIO(data)).size for ext, data in formats.items()}
+            for size, formats in derivatives.items()
+        }
+        assert sizes == {
+            'thumbnail': {'jpeg': (150, 75), 'webp': (150, 75)},
+            'listing': {'jpeg': (400, 200), 'webp': (400, 200)},
+            'detail': {'jpeg': (1000, 500), 'webp': (1000, 500)},
+        }
+
+    def test_does_not_upscale(self):
+        derivatives = render_derivatives(BytesIO(png(300, 100)))
+
+        assert Image.open(BytesIO(derivatives['detail']['jpeg'])).size == (300, 100)
+
+
+@pytest.mark.django_db
+class TestGenerateImageDerivatives:
+    def test_upload_queues_generation_after_commit(self, monkeypatch, django_capture_on_commit_callbacks):
+        queued = []
+        monkeypatch.setattr(tasks.generate_image_derivatives, 'delay', queued.append)
+
+        with django_capture_on_commit_callbacks(execute=True):
+            image = baker.make(ProductImage, image='store/images/mug.png')
+
+        assert queued == [image.id]
+
+    def test_broker_failure_does_not_fail_upload(self, monkeypatch, django_capture_on_commit_callbacks):
+        def delay(*args):
+            raise OperationalError('Connection refused')
+        monkeypatch.setattr(tasks.generate_image_derivatives, 'delay', delay)
+
+        with django_capture_on_commit_callbacks(execute=True):
+            image = baker.make(ProductImage, image='store/images/mug.png')
+
+        assert ProductImage.objects.filter(pk=image.pk).exists()
+
+    def test_stores_derivatives_next_to_original(self, product_image):
+        tasks.generate_image_derivatives(product_image.id)
+
+        product_image.refresh_from_db()
+        storage = product_image.image.storage
+        thumbnail = product_image.derivatives['thumbnail']['webp']
+        assert thumbnail.startswith('store/images/mug')
+        assert thumbnail.endswith('.thumbnail.webp')
+        assert storage.exists(thumbnail)
+
+    def test_api_exposes_derivative_urls(self, api_client, product_image):
+        tasks.generate_image_derivatives(product_image.id)
+
+        response = api_client.get(f'/store/products/{product_image.product_id}/')
+
+        [image] = response.data['images']
+        assert image['derivatives']['listing']['jpeg'].startswith('http://testserver/media/store/images/')
+
+    def test_regenerating_deletes_replaced_derivatives(self, product_image):
+        tasks.generate_image_derivatives(product_image.id)
+        product_image.refresh_from_db()
+        old = derivative_names(product_image.derivatives)
+
+        tasks.generate_image_derivatives(product_image.id)
+
+        storage = product_image.image.storage
+        product_image.refresh_from_db()
+        assert not any(storage.exists(name) for name in set(old) - set(derivative_names(product_image.derivatives)))
+        assert all(storage.exists(name) for name in derivative_names(product_image.derivatives))
+
+    def test_deleting_image_deletes_derivatives(self, product_image, django_capture_on_commit_callbacks):
+        tasks.generate_image_derivatives(product_image.id)
+        product_image.refresh_from_db()
+        names = derivative_names(product_image.derivatives)
+        storage = product_image.image.storage
+
+        with django_capture_on_commit_callbacks(execute=True):
+            product_image.delete()
+
+        assert len(names) == 6
+        assert not any(storage.exists(name) for name in names)
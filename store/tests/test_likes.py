@@ -0,0 +1,106 @@
+from django.contrib.contenttypes.models import ContentType
+from django.db import IntegrityError
+import pytest
+from model_bakery import baker
+
+from core.models import User
+from likes.models import LikeCount, LikedItem
+from store.models import Collection, Product
+
+
+@pytest.fixture
+def user(api_client):
+    user = baker.make(User)
+    api_client.force_authenticate(user=user)
+    return user
+
+
+def like_count(product):
+    content_type = ContentType.objects.get_for_model(Product)
+    return LikeCount.objects.get(content_type=content_type, object_id=product.id).count
+
+
+@pytest.mark.django_db
+class TestLikes:
+    def test_like_and_unlike_keep_the_counter(self, user):
+        product = baker.make(Product)
+        other = baker.make(User)
+
+        assert LikedItem.objects.like(user, product)
+        assert not LikedItem.objects.like(user, product)
+        LikedItem.objects.like(other, product)
+        assert like_count(product) == 2
+
+        assert LikedItem.objects.unlike(user, product)
+        assert not LikedItem.objects.unlike(user, product)
+        other.delete()
+        assert like_count(product) == 0
+
+    def test_duplicate_like_is_rejected_by_the_database(self, user):
+        product = baker.make(Product)
+        content_type = ContentType.objects.get_for_model(Product)
+        LikedItem.objects.create(user=user, content_type=content_type, object_id=product.id)
+
+        with pytest.raises(IntegrityError):
+            LikedItem.objects.create(user=user, content_type=content_type, object_id=product.id)
+
+    def test_liked_by_loads_objects_with_one_query_per_type(self, user, django_assert_num_queries):
+        products = baker.make(Product, _quantity=3)
+        collection = baker.make(Collection)
+        for obj in [*products, collection]:
+            LikedItem.objects.like(user, obj)
+        ContentType.objects.get_for_models(Product, Collection)
+
+        # likes, products, collections
+        with django_assert_num_queries(3):
+            liked = [item.content_object for item in LikedItem.objects.liked_by(user)]
+
+        assert liked == [collection, *reversed(products)]
+
+    def test_get_likes_for_many_in_two_queries(self, user, django_assert_num_queries):
+        liked, other = baker.make(Product, _quantity=2)
+        LikedItem.objects.like(user, liked)
+        ContentType.objects.get_for_model(Product)
+
+        with django_assert_num_queries(2):
+            likes = LikedItem.objects.get_likes_for_many(Product, [liked.id, other.id], user)
+
+        assert likes == {
+            liked.id: {'count': 1, 'liked': True},
+            other.id: {'count': 0, 'liked': False},
+        }
+
+
+@pytest.mark.django_db
+class TestProductLikes:
+    def test_like_endpoint(self, api_client, user):
+        product = baker.make(Product)
+
+        response = api_client.post(f'/store/products/{product.id}/like/')
+        assert response.data == {'count': 1, 'liked': True}
+
+        response = api_client.delete(f'/store/products/{product.id}/like/')
+        assert response.data == {'count': 0, 'liked': False}
+
+    def test_like_requires_authentication(self, api_client):
+        product = baker.make(Product)
+
+        response = api_client.post(f'/store/products/{product.id}/like/')
+
+        assert response.status_code == 401
+
+    def test_listing_shows_fresh_likes_for_the_current_user(self, api_client, user):
+        collection = baker.make(Collection)
+        liked, other = baker.make(Product, collection=collection, _quantity=2)
+        url = f'/store/products/?collection_id={collection.id}'
+        api_client.get(url)
+
+        LikedItem.objects.like(user, liked)
+        response = api_client.get(url)
+
+        likes = {p['id']: p['likes'] for p in response.data['results']}
+        assert likes == {liked.id: {'count': 1, 'liked': True}, other.id: {'count': 0, 'liked': False}}
+
+        api_client.force_authenticate(user=None)
+        response = api_client.get(url)
+        assert {p['id']: p['likes']['liked'] for p in response.data['results']} == {liked.id: False, other.id: False}
@@ -0,0 +1,176 @@
+import json
+import logging
+import multiprocessing
+import os
+import sys
+import threading
+import pytest
+
+from core.log import BoundedQueueHandler, JsonFormatter, RequestContextFilter, SharedRotatingFileHandler
+
+
+class RecordingHandler(logging.Handler):
+    def __init__(self, release=None):
+        super().__init__()
+        self.gate = release
+        self.records = []
+
+    def emit(self, record):
+        if self.gate is not None:
+            self.gate.wait()
+        self.records.append(record)
+
+
+@pytest.fixture
+def queue_handler():
+    handlers = []
+
+    def make(target, maxsize):
+        target.set_name('test-target')
+        handler = BoundedQueueHandler(['test-target'], maxsize=maxsize)
+        handlers.append(handler)
+        return handler
+    yield make
+    for handler in handlers:
+        handler.close()
+
+
+def make_record(message, *args, **extra):
+    record = logging.LogRecord('store.tests', logging.INFO, __file__, 1, message, args, None)
+    record.__dict__.update(extra)
+    return record
+
+
+class TestBoundedQueueHandler:
+    def test_records_are_written_by_the_listener(self, queue_handler):
+        target = RecordingHandler()
+        handler = queue_handler(target, maxsize=10)
+
+        handler.handle(make_record('Hello %s', 'world'))
+        handler.stop()
+
+        assert [record.getMessage() for record in target.records] == ['Hello world']
+
+    def test_full_queue_drops_and_counts_records(self, queue_handler):
+        release = threading.Event()
+        target = RecordingHandler(release)
+        handler = queue_handler(target, maxsize=2)
+
+        for i in range(10):
+            handler.handle(make_record(f'Record {i}'))
+        dropped = handler.dropped
+        release.set()
+        handler.stop()
+        handler.handle(make_record('After'))
+        handler.stop()
+
+        assert dropped >= 7
+        assert target.records[-2].getMessage() == f'Log queue full, dropped {dropped} records'
+        assert target.records[-1].getMessage() == 'After'
+
+    def test_traceback_is_kept_apart_from_the_message(self, queue_handler):
+        target = RecordingHandler()
+        handler = queue_handler(target, maxsize=10)
+        try:
+            1 / 0
+        except ZeroDivisionError:
+            record = logging.LogRecord('store.tests', logging.ERROR, __file__, 1, 'Failed', None, sys.exc_info())
+
+        handler.handle(record)
+        handler.stop()
+
+        assert target.records[0].getMessage() == 'Failed'
+        assert 'ZeroDivisionError' in target.records[0].exc_text
+
+
+def write_records(path, prefix, count):
+    handler = SharedRotatingFileHandler(path, maxBytes=200, backupCount=1000, delay=True)
+    for i in range(count):
+        handler.handle(make_record(f'{prefix} {i:03}'))
+    handler.close()
+
+
+def read_lines(path):
+    lines = []
+    for name in os.listdir(os.path.dirname(path)):
+        if name.startswith(os.path.basename(path)) and not name.endswith('.lock'):
+            with open(os.path.join(os.path.dirname(path), name)) as file:
+                lines += file.read().splitlines()
+    return lines
+
+
+class TestSharedRotatingFileHandler:
+    def test_file_rotated_by_another_handler_is_reopened(self, tmp_path):
+        path = str(tmp_path / 'general.log')
+        first = SharedRotatingFileHandler(path, maxBytes=100, backupCount=2)
+        second = SharedRotatingFileHandler(path, maxBytes=100, backupCount=2)
+
+        first.handle(make_record('x' * 60))
+        second.handle(make_record('y' * 60))
+        first.handle(make_record('z' * 10))
+        first.close()
+        second.close()
+
+        with open(path) as file:
+            assert file.read() == 'y' * 60 + '\n' + 'z' * 10 + '\n'
+        with open(path + '.1') as file:
+            assert file.read() == 'x' * 60 + '\n'
+
+    @pytest.mark.skipif(not hasattr(os, 'fork'), reason='needs fork()')
+    def test_processes_sharing_a_file_keep_every_record(self, tmp_path):
+        path = str(tmp_path / 'general.log')
+        context = multiprocessing.get_context('fork')
+        processes = [context.Process(target=write_records, args=(path, f'p{n}', 500)) for n in range(4)]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+
+        lines = read_lines(path)
+        assert sorted(lines) == sorted(f'p{n} {i:03}' for n in range(4) for i in range(500))
+        for name in os.listdir(tmp_path):
+            assert os.path.getsize(tmp_path / name) <= 200
+
+
+def test_json_formatter_writes_context_and_extra_fields():
+    record = make_record('Paid %s', 'order', request_id='abc', view='OrderViewSet.create', order_id=1)
+
+    entry = json.loads(JsonFormatter().format(record))
+
+    assert entry['message'] == 'Paid order'
+    assert entry['request_id'] == 'abc'
+    assert entry['view'] == 'OrderViewSet.create'
+    assert entry['order_id'] == 1
+    assert entry['db_queries'] is None
+
+
+@pytest.mark.django_db
+class TestRequestContextMiddleware:
+    def test_response_carries_request_id(self, api_client):
+        response = api_client.get('/store/collections/', HTTP_X_REQUEST_ID='abc123')
+
+        assert response['X-Request-ID'] == 'abc123'
+
+    def test_request_id_is_generated(self, api_client):
+        response = api_client.get('/store/collections/')
+
+        assert len(response['X-Request-ID']) == 32
+
+    def test_records_logged_during_request_carry_context(self, api_client, settings):
+        settings.QUERY_PROFILING_SAMPLE_RATE = 1.0
+        target = RecordingHandler()
+        target.addFilter(RequestContextFilter())
+        logger = logging.getLogger('core.profiling')
+        logger.addHandler(target)
+        level = logger.level
+        logger.setLevel(logging.INFO)
+        try:
+            api_client.get('/store/collections/', HTTP_X_REQUEST_ID='abc123')
+        finally:
+            logger.removeHandler(target)
+            logger.setLevel(level)
+
+        record = target.records[-1]
+        assert record.request_id == 'abc123'
+        assert record.view == 'CollectionViewSet.list'
+        assert record.db_queries >= 1
@@ -0,0 +1,245 @@
+import csv
+import json
+from datetime import datetime, timezone
+from io import StringIO
+from django.core.management import call_command
+from kombu.exceptions import OperationalError
+from rest_framework import status
+import pytest
+from model_bakery import baker
+
+from core.models import User
+from store import tasks
+from store.exports import order_rows
+from store.models import Cart, CartItem, Order, OrderItem, Product
+
+
+@pytest.fixture
+def customer_user(api_client):
+    user = baker.make(User)
+    api_client.force_authenticate(user=user)
+    return user
+
+
+@pytest.fixture
+def make_orders():
+    def do_make_orders(customer, count, items_per_order=3):
+        orders = baker.make(Order, customer=customer, _quantity=count)
+        for order in orders:
+            baker.make(OrderItem, order=order, quantity=1, unit_price=1, _quantity=items_per_order)
+        return orders
+    return do_make_orders
+
+
+@pytest.mark.django_db
+class TestListOrders:
+    def test_if_user_is_anonymous_returns_401(self, api_client):
+        response = api_client.get('/store/orders/')
+
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+    def test_returns_only_own_orders_newest_first(self, api_client, customer_user, make_orders):
+        own = make_orders(customer_user.customer, 2)
+        make_orders(baker.make(User).customer, 1)
+
+        response = api_client.get('/store/orders/')
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['count'] == 2
+        assert [order['id'] for order in response.data['results']] == [own[1].id, own[0].id]
+        assert len(response.data['results'][0]['items']) == 3
+
+    @pytest.mark.parametrize('count', [1, 10, 100])
+    def test_query_count_is_constant(self, api_client, customer_user, make_orders, count,
+                                     django_assert_num_queries):
+        make_orders(customer_user.customer, count)
+
+        # COUNT, orders, items joined with their products
+        with django_assert_num_queries(3):
+            response = api_client.get('/store/orders/')
+
+        assert len(response.data['results']) == min(count, 10)
+
+    def test_retrieve_query_count(self, api_client, customer_user, make_orders, django_assert_num_queries):
+        order = make_orders(customer_user.customer, 1)[0]
+
+        with django_assert_num_queries(2):
+            response = api_client.get(f'/store/orders/{order.id}/')
+
+        assert response.data['id'] == order.id
+
+
+@pytest.fixture
+def cart_with(db):
+    def do_cart_with(*lines):
+        cart = baker.make(Cart)
+        for product, quantity in lines:
+            baker.make(CartItem, cart=cart, product=product, quantity=quantity)
+        return cart
+    return do_cart_with
+
+
+@pytest.mark.django_db
+class TestCreateOrder:
+    def test_decrements_inventory(self, api_client, customer_user, cart_with):
+        kettle = baker.make(Product, inventory=5)
+        mug = baker.make(Product, inventory=2)
+        cart = cart_with((kettle, 3), (mug, 2))
+
+        response = api_client.post('/store/orders/', {'cart_id': cart.id})
+
+        assert response.status_code == status.HTTP_200_OK
+        kettle.refresh_from_db()
+        mug.refresh_from_db()
+        assert (kettle.inventory, mug.inventory) == (2, 0)
+
+    def test_cached_product_shows_inventory_after_checkout(self, api_client, customer_user, cart_with,
+                                                          django_capture_on_commit_callbacks, monkeypatch):
+        monkeypatch.setattr(tasks.run_signal_receiver, 'delay', lambda *args: None)
+        kettle = baker.make(Product, inventory=5)
+        api_client.get(f'/store/products/{kettle.id}/')
+        api_client.get('/store/products/', {'collection_id': kettle.collection_id})
+        cart = cart_with((kettle, 3))
+
+        with django_capture_on_commit_callbacks(execute=True):
+            api_client.post('/store/orders/', {'cart_id': cart.id})
+
+        response = api_client.get(f'/store/products/{kettle.id}/')
+        assert response.data['inventory'] == 2
+        response = api_client.get('/store/products/', {'collection_id': kettle.collection_id})
+        assert response.data['results'][0]['inventory'] == 2
+
+    def test_broker_failure_does_not_fail_checkout(self, api_client, customer_user, cart_with,
+                                                   django_capture_on_commit_callbacks, monkeypatch):
+        def delay(*args):
+            raise OperationalError('Connection refused')
+        monkeypatch.setattr(tasks.run_signal_receiver, 'delay', delay)
+        cart = cart_with((baker.make(Product, inventory=5), 1))
+
+        with django_capture_on_commit_callbacks(execute=True):
+            response = api_client.post('/store/orders/', {'cart_id': cart.id})
+
+        assert response.status_code == status.HTTP_200_OK
+        assert Order.objects.count() == 1
+
+    def test_short_line_rejects_whole_order(self, api_client, customer_user, cart_with):
+        kettle = baker.make(Product, inventory=5)
+        mug = baker.make(Product, inventory=1)
+        cart = cart_with((kettle, 3), (mug, 2))
+
+        response = api_client.post('/store/orders/', {'cart_id': cart.id})
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert response.data['cart_id'] == [f'Not enough inventory for products: [{mug.id}]']
+        kettle.refresh_from_db()
+        assert kettle.inventory == 5
+        assert not Order.objects.exists()
+        assert CartItem.objects.filter(cart=cart).count() == 2
+
+    def test_creates_one_order_and_deletes_cart(self, api_client, customer_user, cart_with):
+        cart = cart_with((baker.make(Product, inventory=5), 1))
+
+        response = api_client.post('/store/orders/', {'cart_id': cart.id})
+
+        assert Order.objects.count() == 1
+        assert response.data['id'] == Order.objects.get().id
+        assert not Cart.objects.filter(pk=cart.id).exists()
+        assert not CartItem.objects.exists()
+
+    def test_empty_cart_returns_400(self, api_client, customer_user, cart_with):
+        response = api_client.post('/store/orders/', {'cart_id': cart_with().id})
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_unknown_cart_returns_400(self, api_client, customer_user):
+        response = api_client.post('/store/orders/', {'cart_id': '00000000-0000-0000-0000-000000000000'})
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    @pytest.mark.parametrize('lines', [1, 20, 100])
+    def test_query_count_is_constant(self, api_client, customer_user, cart_with, lines,
+                                     django_assert_num_queries):
+        products = baker.make(Product, inventory=5, _quantity=lines)
+        cart = cart_with(*[(product, 1) for product in products])
+
+        # See CreateOrderSerializer for the breakdown; the test transaction
+        # also turns its atomic() block into a savepoint pair.
+        with django_assert_num_queries(13):
+            response = api_client.post('/store/orders/', {'cart_id': cart.id})
+
+        assert len(response.data['items']) == lines
+        assert sorted(item['id'] for item in response.data['items']) == \
+            sorted(OrderItem.objects.values_list('id', flat=True))
+
+
+@pytest.mark.django_db
+class TestExportOrders:
+    def export(self, api_client, **params):
+        response = api_client.get('/store/orders/export/', params)
+        return response, b''.join(response.streaming_content).decode('utf-8')
+
+    def test_if_user_is_not_admin_returns_403(self, api_client, customer_user):
+        response = api_client.get('/store/orders/export/')
+
+        assert response.status_code == status.HTTP_403_FORBIDDEN
+
+    def test_csv_has_one_row_per_line_item(self, api_client, authenticate, make_orders):
+        authenticate(is_staff=True)
+        orders = make_orders(baker.make(User).customer, 2, items_per_order=2)
+        OrderItem.objects.filter(order=orders[0]).update(quantity=3, unit_price=2.5)
+
+        response, content = self.export(api_client)
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response['Content-Type'] == 'text/csv'
+        rows = list(csv.DictReader(StringIO(content)))
+        assert len(rows) == 4
+        assert [row['line_total'] for row in rows if row['order_id'] == str(orders[0].id)] == ['7.50', '7.50']
+
+    def test_jsonl_has_one_object_per_order(self, api_client, authenticate, make_orders):
+        authenticate(is_staff=True)
+        make_orders(baker.make(User).customer, 2, items_per_order=3)
+
+        response, content = self.export(api_client, file_format='jsonl')
+
+        orders = [json.loads(line) for line in content.splitlines()]
+        assert len(orders) == 2
+        assert len(orders[0]['items']) == 3
+        assert orders[0]['total'] == '3.00'
+
+    def test_filters_by_payment_status_and_date(self, api_client, authenticate, make_orders):
+        authenticate(is_staff=True)
+        old, failed, paid = make_orders(baker.make(User).customer, 3, items_per_order=1)
+        Order.objects.filter(pk=old.pk).update(placed_at=datetime(2020, 1, 1, tzinfo=timezone.utc))
+        Order.objects.filter(pk=failed.pk).update(payment_status=Order.PAYMENT_STATUS_FAILED)
+        Order.objects.filter(pk__in=[old.pk, paid.pk]).update(payment_status=Order.PAYMENT_STATUS_COMPLETED)
+
+        response, content = self.export(
+            api_client, file_format='jsonl', payment_status='C', placed_after='2021-01-01'
+        )
+
+        assert [json.loads(line)['id'] for line in content.splitlines()] == [paid.id]
+
+    def test_invalid_filter_returns_400(self, api_client, authenticate):
+        authenticate(is_staff=True)
+
+        response = api_client.get('/store/orders/export/', {'payment_status': 'X'})
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_rows_are_read_in_batches_of_orders(self, make_orders, django_assert_num_queries):
+        orders = make_orders(baker.make(User).customer, 5, items_per_order=2)
+
+        # Ids then lines for each of three batches, and the empty last batch.
+        with django_assert_num_queries(7):
+            rows = list(order_rows(Order.objects.all(), chunk_size=2))
+
+        assert [row[0] for row in rows] == [order.id for order in orders for _ in range(2)]
+
+    def test_command(self, make_orders):
+        make_orders(baker.make(User).customer, 2, items_per_order=2)
+        out = StringIO()
+
+        call_command('export_orders', '--format', 'csv', stdout=out)
+
+        assert len(out.getvalue().splitlines()) == 5
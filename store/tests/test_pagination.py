@@ -0,0 +1,83 @@
+import base64
+import json
+from rest_framework import status
+import pytest
+from model_bakery import baker
+
+from store.models import Collection, Product
+
+
+@pytest.fixture
+def products():
+    collection = baker.make(Collection)
+    return [
+        baker.make(Product, collection=collection, title=f'Product {i:02}', unit_price=i % 3 + 1)
+        for i in range(25)
+    ]
+
+
+def walk(api_client, url):
+    ids = []
+    while url:
+        response = api_client.get(url)
+        assert response.status_code == status.HTTP_200_OK
+        ids += [product['id'] for product in response.data['results']]
+        url = response.data['next']
+    return ids
+
+
+@pytest.mark.django_db
+class TestKeysetPagination:
+    def test_without_cursor_uses_page_numbers(self, api_client, products):
+        response = api_client.get('/store/products/')
+
+        assert response.data['count'] == 25
+
+    def test_cursor_pages_do_not_count(self, api_client, products):
+        response = api_client.get('/store/products/?cursor=')
+
+        assert 'count' not in response.data
+        assert len(response.data['results']) == 10
+        assert response.data['next'] is not None
+
+    def test_walks_every_product_once_in_title_order(self, api_client, products):
+        ids = walk(api_client, '/store/products/?cursor=')
+
+        assert ids == [product.id for product in products]
+
+    def test_ties_on_ordering_field_are_broken_by_id(self, api_client, products):
+        ids = walk(api_client, '/store/products/?ordering=-unit_price&cursor=')
+
+        expected = sorted(products, key=lambda p: (-p.unit_price, -p.id))
+        assert ids == [product.id for product in expected]
+
+    def test_composes_with_filters(self, api_client, products):
+        ids = walk(api_client, '/store/products/?unit_price__lt=2&cursor=')
+
+        assert ids == [product.id for product in products if product.unit_price < 2]
+
+    def test_cursor_from_another_ordering_returns_404(self, api_client, products):
+        next_url = api_client.get('/store/products/?cursor=').data['next']
+
+        response = api_client.get(next_url + '&ordering=unit_price')
+
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+    def test_garbage_cursor_returns_404(self, api_client):
+        response = api_client.get('/store/products/?cursor=garbage')
+
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+    @pytest.mark.parametrize('cursor', [
+        ['title', 'Product 01', 'abc'],
+        ['unit_price', 'abc', 1],
+        ['unit_price', 'NaN', 1],
+        ['last_update', 'yesterday', 1],
+    ])
+    def test_cursor_with_wrong_typed_values_returns_404(self, api_client, cursor):
+        ordering = cursor[0]
+        encoded = base64.urlsafe_b64encode(json.dumps(cursor).encode('utf-8')).decode('ascii')
+
+        response = api_client.get(f'/store/products/?ordering={ordering}&cursor={encoded}')
+
+        assert response.status_code == status.HTTP_404_NOT_FOUND
@@ -0,0 +1,91 @@
+import logging
+import time
+import pytest
+from model_bakery import baker
+
+from core.profiling import QueryProfile, request_profiled, sql_shape
+from core.pytest_plugin import over_budget
+from store.models import Product
+
+
+def test_sql_shape_collapses_literals_and_in_lists():
+    assert sql_shape("SELECT * FROM t WHERE id IN (%s, %s, %s) AND name = 'a' LIMIT 21") == \
+        'SELECT * FROM t WHERE id IN (%s, ...) AND name = %s LIMIT %s'
+
+
+def test_profile_reports_repeated_statements():
+    profile = QueryProfile('GET', '/store/products/')
+    execute = lambda sql, params, many, context: None
+    for pk in range(5):
+        profile(execute, 'SELECT * FROM tags_tag WHERE id = %s', [pk], False, {})
+    profile(execute, 'SELECT * FROM store_product', [], False, {})
+
+    assert profile.queries == 6
+    assert profile.duplicates(5) == [('SELECT * FROM tags_tag WHERE id = %s', 5)]
+
+
+def test_over_budget_filters_by_endpoint():
+    listing, detail = QueryProfile('GET', '/a/'), QueryProfile('GET', '/b/')
+    listing.endpoint, listing.queries = 'ProductViewSet.list', 10
+    detail.endpoint, detail.queries = 'ProductViewSet.retrieve', 3
+
+    assert over_budget([listing, detail], 5) == [listing]
+    assert over_budget([listing, detail], 5, endpoint='ProductViewSet.retrieve') == []
+
+
+@pytest.mark.django_db
+class TestQueryProfilingMiddleware:
+    def test_sampled_request_gets_server_timing(self, api_client, settings, caplog):
+        settings.QUERY_PROFILING_SAMPLE_RATE = 1.0
+        settings.QUERY_PROFILING_DUPLICATE_THRESHOLD = 1
+        product = baker.make(Product)
+
+        with caplog.at_level(logging.INFO, logger='core.profiling'):
+            response = api_client.get(f'/store/products/{product.id}/')
+
+        assert [entry.split(';')[0] for entry in response['Server-Timing'].split(', ')] == \
+            ['db', 'serializer', 'render', 'app']
+        assert 'queries' in response['Server-Timing']
+        assert 'ProductViewSet.retrieve GET' in caplog.records[-1].getMessage()
+        assert caplog.records[-1].levelno == logging.WARNING
+
+    def test_serializer_and_render_are_timed_apart(self, api_client, settings):
+        settings.QUERY_PROFILING_SAMPLE_RATE = 1.0
+        baker.make(Product, _quantity=3)
+        profiles = []
+        receiver = lambda sender, profile, **kwargs: profiles.append(profile)
+        request_profiled.connect(receiver)
+        try:
+            api_client.get('/store/products/')
+        finally:
+            request_profiled.disconnect(receiver)
+
+        [profile] = profiles
+        assert profile.serializer_time > 0
+        assert profile.render_time > 0
+        assert profile.db_time + profile.serializer_time + profile.render_time <= profile.total_time
+
+    def test_measure_leaves_out_queries(self):
+        profile = QueryProfile('GET', '/store/products/')
+
+        def slow_execute(sql, params, many, context):
+            time.sleep(0.01)
+
+        with profile.measure('serializer_time'):
+            profile(slow_execute, 'SELECT 1', [], False, {})
+
+        assert profile.db_time >= 0.01
+        assert profile.serializer_time < 0.01
+
+    def test_unsampled_request_is_left_alone(self, api_client, settings):
+        settings.QUERY_PROFILING_SAMPLE_RATE = 0
+
+        response = api_client.get('/store/products/')
+
+        assert not response.has_header('Server-Timing')
+
+    @pytest.mark.query_budget(6, endpoint='ProductViewSet.list')
+    def test_product_list_stays_within_budget(self, api_client):
+        baker.make(Product, _quantity=5)
+
+        api_client.get('/store/products/')
@@ -0,0 +1,124 @@
+from decimal import Decimal
+from io import StringIO
+from django.core.management import call_command
+from rest_framework import status
+import pytest
+from model_bakery import baker
+
+from store.models import Product, Review, ReviewSummary
+
+
+@pytest.fixture
+def create_review(api_client):
+    def do_create_review(product, **review):
+        return api_client.post(f'/store/products/{product.id}/reviews/', {
+            'name': 'a', 'description': 'a', **review
+        })
+    return do_create_review
+
+
+def summary_of(product):
+    return ReviewSummary.objects.get(product=product)
+
+
+@pytest.mark.django_db
+class TestReviewSummary:
+    def test_create_updates_count_histogram_and_average(self, create_review):
+        product = baker.make(Product)
+
+        create_review(product, rating=5)
+        create_review(product, rating=4)
+        response = create_review(product)
+
+        assert response.status_code == status.HTTP_201_CREATED
+        summary = summary_of(product)
+        assert summary.count == 3
+        assert summary.histogram == {1: 0, 2: 0, 3: 0, 4: 1, 5: 1}
+        assert summary.average_rating == Decimal('4.50')
+
+    def test_rating_out_of_range_returns_400(self, create_review):
+        response = create_review(baker.make(Product), rating=6)
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_update_and_delete_adjust_summary(self, api_client):
+        product = baker.make(Product)
+        review, other = baker.make(Review, product=product, rating=2, _quantity=2)
+        url = f'/store/products/{product.id}/reviews/{review.id}/'
+
+        api_client.patch(url, {'rating': 4})
+        assert summary_of(product).average_rating == Decimal('3.00')
+
+        api_client.delete(url)
+        summary = summary_of(product)
+        assert summary.count == 1
+        assert summary.histogram[4] == 0
+        assert summary.average_rating == Decimal('2.00')
+
+        other.delete()
+        assert summary_of(product).average_rating is None
+
+    def test_deleting_product_removes_summary(self):
+        product = baker.make(Product)
+        baker.make(Review, product=product, rating=3, _quantity=2)
+
+        product.delete()
+
+        assert not ReviewSummary.objects.exists()
+
+    def test_rebuild_command_matches_incremental_summary(self):
+        product = baker.make(Product)
+        for rating in [1, 3, 3, None]:
+            baker.make(Review, product=product, rating=rating)
+        expected = summary_of(product)
+        ReviewSummary.objects.all().delete()
+
+        call_command('rebuild_review_summaries', stdout=StringIO())
+
+        summary = summary_of(product)
+        assert (summary.count, summary.histogram, summary.average_rating) == \
+            (expected.count, expected.histogram, expected.average_rating)
+
+
+@pytest.mark.django_db
+class TestProductReviews:
+    def test_product_includes_review_summary(self, api_client):
+        product = baker.make(Product)
+        baker.make(Review, product=product, rating=5)
+
+        response = api_client.get(f'/store/products/{product.id}/')
+
+        assert response.data['reviews'] == {
+            'count': 1,
+            'average_rating': '5.00',
+            'histogram': {'1': 0, '2': 0, '3': 0, '4': 0, '5': 1},
+        }
+
+    def test_product_without_reviews_has_empty_summary(self, api_client):
+        product = baker.make(Product)
+
+        response = api_client.get(f'/store/products/{product.id}/')
+
+        assert response.data['reviews']['count'] == 0
+        assert response.data['reviews']['average_rating'] is None
+
+    def test_filter_and_order_by_rating(self, api_client):
+        collection = baker.make('store.Collection')
+        good, better, unrated = baker.make(Product, collection=collection, _quantity=3)
+        baker.make(Review, product=good, rating=4)
+        baker.make(Review, product=better, rating=5)
+
+        response = api_client.get('/store/products/', {
+            'collection_id': collection.id, 'average_rating__gte': 4, 'ordering': '-average_rating'
+        })
+
+        assert [p['id'] for p in response.data['results']] == [better.id, good.id]
+
+    def test_review_list_is_paginated(self, api_client):
+        product = baker.make(Product)
+        baker.make(Review, product=product, _quantity=15)
+
+        response = api_client.get(f'/store/products/{product.id}/reviews/')
+
+        assert response.data['count'] == 15
+        assert len(response.data['results']) == 10
@@ -0,0 +1,73 @@
+from rest_framework import status
+import pytest
+from model_bakery import baker
+
+from store import search
+from store.models import Collection, Product
+
+
+def search_ids(api_client, term):
+    response = api_client.get('/store/products/', {'search': term})
+    assert response.status_code == status.HTTP_200_OK
+    return [product['id'] for product in response.data['results']]
+
+
+@pytest.mark.django_db
+class TestProductSearch:
+    def test_matches_title_and_description(self, api_client):
+        collection = baker.make(Collection)
+        by_title = baker.make(Product, collection=collection, title='Espresso machine', description='')
+        by_description = baker.make(Product, collection=collection, title='Grinder', description='For espresso beans')
+        baker.make(Product, collection=collection, title='Kettle', description='')
+
+        assert sorted(search_ids(api_client, 'espresso')) == sorted([by_title.id, by_description.id])
+
+    def test_matches_word_prefixes(self, api_client):
+        product = baker.make(Product, title='Espresso machine', description='')
+
+        assert search_ids(api_client, 'espr') == [product.id]
+
+    def test_orders_by_relevance(self, api_client):
+        weak = baker.make(Product, title='Aeropress', description='Not an espresso maker')
+        strong = baker.make(Product, title='Espresso machine', description='Espresso, espresso, espresso')
+
+        assert search_ids(api_client, 'espresso') == [strong.id, weak.id]
+
+    def test_index_follows_updates_and_deletes(self, api_client):
+        product = baker.make(Product, title='Espresso machine', description='')
+
+        product.title = 'Kettle'
+        product.save()
+        assert search_ids(api_client, 'espresso') == []
+        assert search_ids(api_client, 'kettle') == [product.id]
+
+        product.delete()
+        assert search_ids(api_client, 'kettle') == []
+
+    def test_falls_back_to_icontains_without_index(self, api_client, monkeypatch):
+        monkeypatch.setattr(search, 'get_search_backend', lambda: None)
+        product = baker.make(Product, title='Espresso machine', description='')
+
+        assert search_ids(api_client, 'presso') == [product.id]
+
+
+class TestMySQLSearchBackend:
+    def test_short_tokens_and_stopwords_are_matched_with_icontains(self):
+        queryset = search.MySQLSearchBackend().search(Product.objects.all(), ['tv', 'The', 'stand'])
+
+        sql, params = queryset.query.sql_with_params()
+        assert '+stand*' in params
+        assert '%tv%' in params and '%The%' in params
+        assert not any('+tv' in str(param) or '+The' in str(param) for param in params)
+
+    def test_only_short_tokens_skip_the_full_text_match(self):
+        queryset = search.MySQLSearchBackend().search(Product.objects.all(), ['tv'])
+
+        sql, params = queryset.query.sql_with_params()
+        assert 'MATCH' not in sql
+        assert '%tv%' in params
+
+
+def test_backends_must_implement_search():
+    with pytest.raises(TypeError):
+        search.SearchBackend()
@@ -0,0 +1,67 @@
+import pytest
+from model_bakery import baker
+
+from core.models import User
+from store import tasks
+from store.models import Order
+from store.signals import OnCommitSignal
+
+calls = []
+
+
+def record(sender, **kwargs):
+    calls.append((sender, kwargs['order'], kwargs['note']))
+
+
+@pytest.fixture
+def signal(monkeypatch):
+    calls.clear()
+    monkeypatch.setattr(tasks.run_signal_receiver, 'delay',
+                        lambda *args: tasks.run_signal_receiver.apply(args).get())
+    return OnCommitSignal()
+
+
+@pytest.fixture
+def order():
+    return baker.make(Order, customer=baker.make(User).customer)
+
+
+@pytest.mark.django_db
+class TestOnCommitSignal:
+    def test_task_receivers_run_after_commit_with_a_fresh_instance(
+            self, signal, order, django_capture_on_commit_callbacks):
+        signal.connect(record)
+
+        with django_capture_on_commit_callbacks(execute=True):
+            signal.send_robust(Order, order=order, note='placed')
+            assert calls == []
+
+        [(sender, received, note)] = calls
+        assert sender is Order
+        assert received == order and received is not order
+        assert note == 'placed'
+
+    def test_synchronous_receivers_run_inline(self, signal, order, django_capture_on_commit_callbacks):
+        signal.connect(record, synchronous=True)
+
+        with django_capture_on_commit_callbacks() as callbacks:
+            signal.send_robust(Order, order=order, note='placed')
+
+        assert calls == [(Order, order, 'placed')]
+        assert callbacks == []
+
+    def test_disconnect(self, signal, order, django_capture_on_commit_callbacks):
+        signal.connect(record)
+        signal.disconnect(record)
+
+        with django_capture_on_commit_callbacks() as callbacks:
+            signal.send_robust(Order, order=order, note='placed')
+
+        assert callbacks == []
+
+    def test_rejects_receivers_a_worker_cannot_import(self, signal):
+        def local(sender, **kwargs):
+            pass
+
+        with pytest.raises(ValueError):
+            signal.connect(local)
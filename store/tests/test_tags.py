@@ -0,0 +1,112 @@
+from django.contrib.contenttypes.models import ContentType
+from core.models import User
+import pytest
+from model_bakery import baker
+
+from store.models import Collection, Product
+from tags.models import Tag, TaggedItem
+
+
+@pytest.fixture
+def tag_product():
+    def do_tag_product(product, *labels):
+        content_type = ContentType.objects.get_for_model(Product)
+        for label in labels:
+            tag = Tag.objects.get_or_create(label=label)[0]
+            TaggedItem.objects.create(tag=tag, content_type=content_type, object_id=product.id)
+    return do_tag_product
+
+
+@pytest.mark.django_db
+class TestGetTagsForMany:
+    def test_returns_tags_of_every_id_in_one_query(self, tag_product, django_assert_num_queries):
+        first, second, untagged = baker.make(Product, _quantity=3)
+        tag_product(first, 'steel', 'ceramic')
+        tag_product(second, 'glass')
+        ContentType.objects.get_for_model(Product)
+
+        with django_assert_num_queries(1):
+            tags = TaggedItem.objects.get_tags_for_many(Product, [first.id, second.id, untagged.id])
+
+        assert {pk: [tag.label for tag in labels] for pk, labels in tags.items()} == {
+            first.id: ['ceramic', 'steel'],
+            second.id: ['glass'],
+            untagged.id: [],
+        }
+
+    def test_prefetch_tags_sets_tags_on_each_object(self, tag_product, django_assert_num_queries):
+        first, untagged = baker.make(Product, _quantity=2)
+        tag_product(first, 'steel')
+        ContentType.objects.get_for_model(Product)
+
+        with django_assert_num_queries(1):
+            products = TaggedItem.objects.prefetch_tags([first, untagged])
+
+        assert [[tag.label for tag in product.tags] for product in products] == [['steel'], []]
+
+
+@pytest.mark.django_db
+class TestProductTags:
+    @pytest.mark.parametrize('count', [1, 10])
+    def test_list_query_count_does_not_grow_with_page(self, api_client, tag_product, count,
+                                                      django_assert_num_queries):
+        collection = baker.make(Collection)
+        for product in baker.make(Product, collection=collection, _quantity=count):
+            tag_product(product, 'mug')
+        ContentType.objects.get_for_model(Product)
+
+        # collection_id validation, COUNT, products with review summaries,
+        # images, tags, like counts
+        with django_assert_num_queries(6):
+            response = api_client.get('/store/products/', {'collection_id': collection.id})
+
+        assert [p['tags'] for p in response.data['results']] == [['mug']] * count
+
+    def test_retagging_invalidates_cached_product(self, api_client, tag_product):
+        product = baker.make(Product)
+        api_client.get(f'/store/products/{product.id}/')
+
+        tag_product(product, 'sale')
+        response = api_client.get(f'/store/products/{product.id}/')
+
+        assert response.data['tags'] == ['sale']
+
+    def test_renaming_tag_invalidates_cached_products(self, api_client, tag_product):
+        product = baker.make(Product)
+        tag_product(product, 'sale')
+        api_client.get(f'/store/products/{product.id}/')
+        api_client.get('/store/products/', {'collection_id': product.collection_id})
+
+        Tag.objects.filter(label='sale').update(label='clearance')
+        Tag.objects.get(label='clearance').save()
+
+        response = api_client.get(f'/store/products/{product.id}/')
+        assert response.data['tags'] == ['clearance']
+        response = api_client.get('/store/products/', {'collection_id': product.collection_id})
+        assert response.data['results'][0]['tags'] == ['clearance']
+
+    def test_deleting_tag_invalidates_cached_product(self, api_client, tag_product):
+        product = baker.make(Product)
+        tag_product(product, 'sale')
+        api_client.get(f'/store/products/{product.id}/')
+
+        Tag.objects.get(label='sale').delete()
+
+        response = api_client.get(f'/store/products/{product.id}/')
+        assert response.data['tags'] == []
+
+
+@pytest.mark.django_db
+class TestProductAdminTags:
+    @pytest.mark.parametrize('count', [1, 10])
+    def test_change_page_query_count_does_not_grow_with_tags(self, client, tag_product, count,
+                                                             django_assert_max_num_queries):
+        client.force_login(User.objects.create_superuser('admin', 'admin@domain.com', 'secret'))
+        product = baker.make(Product)
+        tag_product(product, *[f'tag {i}' for i in range(count)])
+
+        with django_assert_max_num_queries(8):
+            response = client.get(f'/admin/store/product/{product.id}/change/')
+
+        assert response.status_code == 200
+        assert f'selected>tag {count - 1}</option>' in response.content.decode()
@@ -0,0 +1,70 @@
+from io import BytesIO
+from django.core.files.uploadedfile import SimpleUploadedFile
+from PIL import Image
+from rest_framework import status
+import pytest
+from model_bakery import baker
+
+from store.models import Product, ProductImage
+from store.uploads import MAX_UPLOAD_SIZE, sniff_image_type
+
+
+def jpeg(padding=0):
+    buffer = BytesIO()
+    Image.new('RGB', (10, 10)).save(buffer, 'JPEG')
+    return buffer.getvalue() + b'\0' * padding
+
+
+@pytest.fixture(autouse=True)
+def media_root(settings, tmp_path):
+    settings.MEDIA_ROOT = tmp_path
+
+
+@pytest.fixture
+def upload(api_client):
+    def do_upload(product, content, name='mug.jpg', content_type='image/jpeg'):
+        return api_client.post(
+            f'/store/products/{product.id}/images/',
+            {'image': SimpleUploadedFile(name, content, content_type=content_type)},
+            format='multipart'
+        )
+    return do_upload
+
+
+@pytest.mark.django_db
+class TestUploadProductImage:
+    def test_valid_image_returns_201(self, upload):
+        product = baker.make(Product)
+
+        response = upload(product, jpeg())
+
+        assert response.status_code == status.HTTP_201_CREATED
+        assert ProductImage.objects.filter(product=product).count() == 1
+
+    def test_oversized_body_returns_400(self, upload):
+        product = baker.make(Product)
+
+        response = upload(product, jpeg(padding=MAX_UPLOAD_SIZE))
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert 'cannot be larger' in response.data['detail']
+        assert not ProductImage.objects.exists()
+
+    def test_non_image_returns_400_whatever_its_content_type(self, upload):
+        product = baker.make(Product)
+
+        response = upload(product, b'#!/bin/sh\necho hi\n', name='mug.jpg')
+
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert not ProductImage.objects.exists()
+
+
+@pytest.mark.parametrize('header, content_type', [
+    (b'\xff\xd8\xff\xe0', 'image/jpeg'),
+    (b'\x89PNG\r\n\x1a\n', 'image/png'),
+    (b'GIF89a', 'image/gif'),
+    (b'RIFF\0\0\0\0WEBPVP8 ', 'image/webp'),
+    (b'%PDF-1.7', None),
+])
+def test_sniff_image_type(header, content_type):
+    assert sniff_image_type(header) == content_type
@@ -0,0 +1,50 @@
+from django.core.files.uploadhandler import TemporaryFileUploadHandler
+from django.http.multipartparser import MultiPartParserError
+from .validators import MAX_FILE_SIZE_KB
+
+MAX_UPLOAD_SIZE = MAX_FILE_SIZE_KB * 1024
+# Room for multipart boundaries, part headers and other form fields.
+MAX_BODY_OVERHEAD = 16 * 1024
+
+SIGNATURES = [
+    (b'\xff\xd8\xff', 'image/jpeg'),
+    (b'\x89PNG\r\n\x1a\n', 'image/png'),
+    (b'GIF87a', 'image/gif'),
+    (b'GIF89a', 'image/gif'),
+]
+
+
+def sniff_image_type(header):
+    for signature, content_type in SIGNATURES:
+        if header.startswith(signature):
+            return content_type
+    if header[:4] == b'RIFF' and header[8:12] == b'WEBP':
+        return 'image/webp'
+    return None
+
+
+class UploadRejected(MultiPartParserError):
+    pass
+
+
+class ImageUploadHandler(TemporaryFileUploadHandler):
+    """
+    Streams uploaded images to a temporary file chunk by chunk, checking
+    the size and the file signature as bytes arrive. An oversized or
+    non-image upload is rejected without reading the rest of the body.
+    FileSystemStorage then moves the temporary file into place.
+    """
+    def handle_raw_input(self, input_data, META, content_length, boundary, encoding=None):
+        if content_length > MAX_UPLOAD_SIZE + MAX_BODY_OVERHEAD:
+            raise UploadRejected(f'Files cannot be larger that {MAX_FILE_SIZE_KB}KB')
+
+    def receive_data_chunk(self, raw_data, start):
+        if start == 0:
+            content_type = sniff_image_type(raw_data)
+            if content_type is None:
+                raise UploadRejected('Upload a valid image. The file you uploaded was not an image.')
+            # Trust the bytes, not the client's Content-Type header.
+            self.file.content_type = content_type
+        if start + len(raw_data) > MAX_UPLOAD_SIZE:
+            raise UploadRejected(f'Files cannot be larger that {MAX_FILE_SIZE_KB}KB')
+        return super().receive_data_chunk(raw_data, start)
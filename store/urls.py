@@ -1,3 +1,4 @@
+from django.urls import path
 from rest_framework_nested import routers
 from . import views
 
@@ -15,4 +16,7 @@ products_router.register('images', views.ProductImageViewSet, basename='product-
 carts_router = routers.NestedDefaultRouter(router, 'carts', lookup='cart')
 carts_router.register('items', views.CartItemViewSet, basename='cart-items')
 
-urlpatterns = router.urls + products_router.urls + carts_router.urls
+urlpatterns = router.urls + products_router.urls + carts_router.urls + [
+    path('cache-stats/', views.CacheStatsView.as_view()),
+    path('catalog-import/', views.CatalogImportView.as_view()),
+]
@@ -1,6 +1,7 @@
 from django.core.exceptions import ValidationError
-def validate_file_size(file):
-    max_size_kb = 500
 
-    if file.size > max_size_kb * 1024:
-        raise ValidationError(f'Files cannot be larger that {max_size_kb}KB')
\ No newline at end of file
+MAX_FILE_SIZE_KB = 500
+
+def validate_file_size(file):
+    if file.size > MAX_FILE_SIZE_KB * 1024:
+        raise ValidationError(f'Files cannot be larger that {MAX_FILE_SIZE_KB}KB')
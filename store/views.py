@@ -1,29 +1,90 @@
+import io
+from decimal import Decimal
+from django.http import StreamingHttpResponse
 from django.shortcuts import get_object_or_404
-from django.db.models import Count
+from django.db.models import DecimalField, Prefetch, Value
+from django.db.models.functions import Coalesce
 from django_filters.rest_framework import DjangoFilterBackend
-from rest_framework.filters import SearchFilter, OrderingFilter
+from rest_framework.filters import OrderingFilter
+from rest_framework.parsers import MultiPartParser
 from rest_framework.mixins import CreateModelMixin, RetrieveModelMixin, DestroyModelMixin
 from rest_framework.response import Response 
+from rest_framework.views import APIView
 from rest_framework.viewsets import ModelViewSet, GenericViewSet
 from rest_framework import status
 from rest_framework.permissions import IsAuthenticated, AllowAny, IsAdminUser
 from rest_framework.decorators import action
 
+from likes.models import LikedItem
+from tags.models import TaggedItem
+from .exports import FORMATS as EXPORT_FORMATS, OrderExportFilter, export_orders
+from .catalog import FORMATS, CatalogImportError, guess_format, import_catalog
+from .cache import CATALOG_VERSION, CachedResponseMixin, collection_version, product_version, get_stats
 from .permissions import IsAdminOrReadOnly, ViewCustomerHistoryPermission
 from .models import Customer, Order, Product, Collection, OrderItem, ProductImage, Review, Cart, CartItem
-from .serializers import CreateOrderSerializer, CustomerSerializer, OrderSerializer, ProductImageSerializer, ProductSerializer, CollectionSerializer, ReviewSerializer, CartSerializer, CartItemSerializer, AddCartItemSerializer, UpdateCartItemSerializer, UpdateOrderSerializer
+from .serializers import CreateOrderSerializer, CustomerSerializer, OrderSerializer, ProductImageSerializer, ProductSerializer, CollectionSerializer, ReviewSerializer, CartSerializer, CartItemSerializer, AddCartItemSerializer, BulkAddCartItemSerializer, UpdateCartItemSerializer, UpdateOrderSerializer
 from .filters import ProductFilters
-from .pagination import DefaultPagination
+from .pagination import DefaultPagination, KeysetPagination
+from .search import ProductSearchFilter
+from .uploads import ImageUploadHandler
 
-class ProductViewSet(ModelViewSet):
-    queryset = Product.objects.prefetch_related('images').all()
+class ProductViewSet(CachedResponseMixin, ModelViewSet):
+    queryset = Product.objects \
+        .select_related('review_summary') \
+        .prefetch_related(
+            'images',
+            Prefetch('tagged_items', queryset=TaggedItem.objects.select_related('tag').order_by('tag__label', 'tag_id')),
+        ) \
+        .annotate(
+            # Products nobody has reviewed yet sort and filter as zero.
+            average_rating=Coalesce('review_summary__average_rating', Value(Decimal(0)),
+                                    output_field=DecimalField(max_digits=3, decimal_places=2)),
+            reviews_count=Coalesce('review_summary__count', 0),
+        )
     serializer_class = ProductSerializer
-    filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
+    filter_backends = [DjangoFilterBackend, ProductSearchFilter, OrderingFilter]
     filterset_class = ProductFilters
     pagination_class = DefaultPagination
     permission_classes = [IsAdminOrReadOnly]
     search_fields = ['title', 'description']
-    ordering_fields = ['unit_price', 'last_update']
+    ordering_fields = ['title', 'unit_price', 'last_update', 'average_rating', 'reviews_count']
+
+    @property
+    def paginator(self):
+        # ?cursor= switches this request to keyset pagination
+        if not hasattr(self, '_paginator') and \
+                KeysetPagination.cursor_query_param in self.request.query_params:
+            self._paginator = KeysetPagination()
+        return super().paginator
+
+    def get_cache_versions(self):
+        pk = self.kwargs.get('pk', '')
+        if pk.isdigit():
+            return [product_version(pk)]
+        collection_id = self.request.query_params.get('collection_id', '')
+        if collection_id.isdigit():
+            return [collection_version(collection_id)]
+        return [CATALOG_VERSION]
+
+    def cached_response(self, respond, request, *args, **kwargs):
+        response = super().cached_response(respond, request, *args, **kwargs)
+        # Like counts and state are added after the cache: they change too
+        # often to invalidate on, and the state is per user.
+        if response.status_code == 200:
+            products = response.data['results'] if self.action == 'list' else [response.data]
+            likes = LikedItem.objects.get_likes_for_many(Product, [p['id'] for p in products], request.user)
+            for product in products:
+                product['likes'] = likes[product['id']]
+        return response
+
+    @action(detail=True, methods=['POST', 'DELETE'], permission_classes=[IsAuthenticated])
+    def like(self, request, pk):
+        product = get_object_or_404(Product, pk=pk)
+        if request.method == 'POST':
+            LikedItem.objects.like(request.user, product)
+        else:
+            LikedItem.objects.unlike(request.user, product)
+        return Response(LikedItem.objects.get_likes_for_many(Product, [product.pk], request.user)[product.pk])
 
     def get_serializer_context(self):
         return {'request':self.request}
@@ -37,15 +98,21 @@ class ProductViewSet(ModelViewSet):
     
 
 
-class CollectionViewSet(ModelViewSet):
-    queryset = Collection.objects.annotate(products_count=Count('products')).all()
+class CollectionViewSet(CachedResponseMixin, ModelViewSet):
+    queryset = Collection.objects.all()
     serializer_class = CollectionSerializer
     permission_classes = [IsAdminOrReadOnly]
 
+    def get_cache_versions(self):
+        pk = self.kwargs.get('pk', '')
+        if pk.isdigit():
+            return [collection_version(pk)]
+        return [CATALOG_VERSION]
+
     def destroy(self, request, *args, **kwargs):
         collection = get_object_or_404(Collection, pk=kwargs.get('pk'))
 
-        if collection.products.count() > 0:
+        if collection.products.exists():
             return Response(
                 {'error': 'Collection cannot be deleted because it contains products.'},
                 status=status.HTTP_405_METHOD_NOT_ALLOWED
@@ -55,9 +122,10 @@ class CollectionViewSet(ModelViewSet):
 
 class ReviewViewSet(ModelViewSet):
     serializer_class = ReviewSerializer
+    pagination_class = DefaultPagination
 
     def get_queryset(self):
-        return Review.objects.filter(product_id=self.kwargs['product_pk'])
+        return Review.objects.filter(product_id=self.kwargs['product_pk']).order_by('-date', '-id')
 
     def get_serializer_context(self):
         return {'product_id': self.kwargs['product_pk']}
@@ -82,11 +150,31 @@ class CartItemViewSet(ModelViewSet):
     def get_serializer_context(self):
         return {'cart_id': self.kwargs['cart_pk']}
 
+    def perform_update(self, serializer):
+        super().perform_update(serializer)
+        Cart.objects.touch(self.kwargs['cart_pk'])
+
+    def perform_destroy(self, instance):
+        super().perform_destroy(instance)
+        Cart.objects.touch(instance.cart_id)
+
     def get_queryset(self):
         return CartItem.objects\
     .filter(cart_id=self.kwargs['cart_pk'])\
     .select_related('product')
 
+    @action(detail=False, methods=['POST'])
+    def bulk(self, request, cart_pk):
+        serializer = BulkAddCartItemSerializer(
+            data=request.data,
+            many=True,
+            allow_empty=False,
+            max_length=100,
+            context=self.get_serializer_context())
+        serializer.is_valid(raise_exception=True)
+        cart = serializer.save()
+        return Response(CartSerializer(cart).data)
+
 class CustomerViewSet(ModelViewSet):
     queryset = Customer.objects.all()
     serializer_class = CustomerSerializer
@@ -111,19 +199,22 @@ class CustomerViewSet(ModelViewSet):
         
 class OrderViewSet(ModelViewSet):
     http_method_names = ['get', 'post', 'patch', 'delete', 'head', 'options']
+    pagination_class = DefaultPagination
 
     def get_permissions(self):
-        if self.request.method in ['PATCH', 'DELETE']:
+        if self.request.method in ['PATCH', 'DELETE'] or self.action == 'export':
             return [IsAdminUser()]
         return [IsAuthenticated()]
 
     def create(self, request, *args, **kwargs):
         serializer = CreateOrderSerializer(
             data=request.data, 
-            context={'user_id': self.request.user.id})
+            context={
+                'user_id': self.request.user.id,
+                'customer_id': getattr(self.request, 'customer_id', None),
+            })
         serializer.is_valid(raise_exception=True)
         order = serializer.save()
-        serializer.save()
 
         serializer = OrderSerializer(order)
         return Response(serializer.data)
@@ -136,19 +227,70 @@ class OrderViewSet(ModelViewSet):
             return UpdateOrderSerializer
         return OrderSerializer
 
+    @action(detail=False)
+    def export(self, request):
+        format = request.query_params.get('file_format', 'csv')
+        if format not in EXPORT_FORMATS:
+            return Response({'file_format': ['Expected csv or jsonl.']}, status=status.HTTP_400_BAD_REQUEST)
+        filterset = OrderExportFilter(request.query_params, queryset=Order.objects.all())
+        if not filterset.is_valid():
+            return Response(filterset.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        response = StreamingHttpResponse(
+            export_orders(filterset.qs, format),
+            content_type=EXPORT_FORMATS[format]
+        )
+        response['Content-Disposition'] = f'attachment; filename="orders.{format}"'
+        return response
+
     def get_queryset(self):
+        queryset = Order.objects\
+            .prefetch_related(Prefetch('items', queryset=OrderItem.objects.select_related('product')))\
+            .order_by('-placed_at', '-id')
+
         user = self.request.user
         if user.is_staff:
-            return Order.objects.all()
-
-        customer_id = Customer.objects.only('id').get(user_id=user.id)
-        return Order.objects.filter(customer_id=customer_id)
+            return queryset
+        # Set by CachedJWTAuthentication, which saves joining the customer.
+        customer_id = getattr(self.request, 'customer_id', None)
+        if customer_id is not None:
+            return queryset.filter(customer_id=customer_id)
+        return queryset.filter(customer__user_id=user.id)
 
 class ProductImageViewSet(ModelViewSet):
     serializer_class = ProductImageSerializer
 
+    def initialize_request(self, request, *args, **kwargs):
+        # Must be set before anything reads the body.
+        request.upload_handlers = [ImageUploadHandler(request)]
+        return super().initialize_request(request, *args, **kwargs)
+
     def get_serializer_context(self):
         return {'product_id': self.kwargs['product_pk']}
     
     def get_queryset(self):
-        return ProductImage.objects.filter(product_id=self.kwargs['product_pk'])
\ No newline at end of file
+        return ProductImage.objects.filter(product_id=self.kwargs['product_pk'])
+
+class CacheStatsView(APIView):
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response(get_stats())
+
+class CatalogImportView(APIView):
+    parser_classes = [MultiPartParser]
+    permission_classes = [IsAdminUser]
+
+    def post(self, request):
+        file = request.FILES.get('file')
+        if file is None:
+            return Response({'file': ['No file was submitted.']}, status=status.HTTP_400_BAD_REQUEST)
+        format = request.data.get('format') or guess_format(file.name)
+        if format not in FORMATS.values():
+            return Response({'format': ['Expected csv or jsonl.']}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            report = import_catalog(io.TextIOWrapper(file, encoding='utf-8-sig', newline=''), format)
+        except CatalogImportError as error:
+            return Response({'file': [str(error)]}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(report)
@@ -36,20 +36,22 @@ INSTALLED_APPS = [
     'corsheaders',
     'rest_framework',
     'djoser',
-    #'silk',
     'playground',
-    "debug_toolbar",
     'store',
     'tags',
     'likes',
     'core',
 ]
 
+# Shared by every environment, so kept to what prod needs; dev.py adds
+# the debug tooling. Sessions, auth and messages are only touched by the
+# admin (the API authenticates with JWT) and do no work until it does.
 MIDDLEWARE = [
+    'core.log.RequestContextMiddleware',
     'corsheaders.middleware.CorsMiddleware',
-    'debug_toolbar.middleware.DebugToolbarMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
+    'core.profiling.QueryProfilingMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -58,13 +60,6 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware'
 ]
 
-# if DEBUG:
-#     MIDDLEWARE += ['silk.middleware.SilkyMiddleware']
-
-INTERNAL_IPS = [
-    "127.0.0.1",
-]
-
 CORS_ALLOWED_ORIGINS = [
     'http://localhost:8001',
     'http://127.0.0.1:8001',
@@ -137,7 +132,7 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication'
+        'core.authentication.CachedJWTAuthentication'
     ],
 }
 
@@ -149,6 +144,9 @@ SIMPLE_JWT = {
 
 AUTH_USER_MODEL = 'core.User'
 
+JWT_USER_CACHE_TIMEOUT = 5 * 60 # seconds core.authentication caches a token's user in the cache
+JWT_USER_LOCAL_CACHE_TIMEOUT = 30 # and in each process, which is how long other processes may miss a change
+
 DJOSER = {
     'SERIALIZERS': {
         'user_create': 'core.serializers.UserCreateSerializer',
@@ -167,15 +165,32 @@ ADMINS = [
     ('Amanuel', 'admin@amaanbuy.com')
 ]
 
+QUERY_PROFILING_SAMPLE_RATE = 0.01 # share of requests profiled by core.profiling, 0 to turn off
+QUERY_PROFILING_DUPLICATE_THRESHOLD = 5 # identical statements per request reported as N+1
+
+PLAYGROUND_UPSTREAM_URL = 'https://httpbin.org/delay/2'
+
+NOTIFY_CUSTOMERS_CHUNK_SIZE = 500
+NOTIFY_CUSTOMERS_RATE_LIMIT = 100 # emails per second across all workers, None for no limit
+NOTIFY_CUSTOMERS_SUBJECT = 'News from Storefront'
+
 CELERY_BROKER_URL = 'redis://localhost:6379/1'
 CELERY_BEAT_SCHEDULE = {
     'notify_customers': {
         'task': 'playground.tasks.notify_customers',
-        'schedule': 5,
+        'schedule': crontab(minute=0, hour=10, day_of_week='mon'),
         'args': ['Hello World']
+    },
+    'delete_abandoned_carts': {
+        'task': 'store.tasks.delete_abandoned_carts',
+        'schedule': crontab(minute=30, hour=3),
     }
 }
 
+CART_ACTIVITY_RESOLUTION = timedelta(minutes=5) # how stale Cart.last_activity may get before an item change rewrites it
+ABANDONED_CART_TTL = timedelta(days=30) # carts idle this long are deleted by store.tasks.delete_abandoned_carts
+ABANDONED_CART_BATCH_SIZE = 1000 # carts deleted per transaction
+
 CACHES = {
     "default": {
         "BACKEND": "django_redis.cache.RedisCache",
@@ -187,29 +202,52 @@ CACHES = {
     }
 }
 
+# Records go through a bounded queue to a background writer (core.log), so
+# logging never waits on the console or disk.
 LOGGING = {
     'version': 1,
     'disable_existing_loggers': False,
+    'filters': {
+        'request_context': {
+            '()': 'core.log.RequestContextFilter'
+        }
+    },
     'handlers': {
         'console': {
-            'class': 'logging.StreamHandler'
+            'class': 'logging.StreamHandler',
+            'formatter': 'verbose'
         }, 
         'file': {
-            'class': 'logging.FileHandler',
-            'filename': 'general.log'
+            # Every worker process appends to the same file; this handler
+            # rotates it once between them and reopens it after another did.
+            'class': 'core.log.SharedRotatingFileHandler',
+            'filename': 'general.log',
+            'maxBytes': 10 * 1024 * 1024,
+            'backupCount': 5,
+            'delay': True,
+            'formatter': 'json'
+        },
+        'queue': {
+            '()': 'core.log.BoundedQueueHandler',
+            'handlers': ['console', 'file'],
+            'maxsize': 10_000, # records; more than that are dropped and counted
+            'filters': ['request_context']
         }
     },
     'loggers': {
         #to capture all log messages
         '': {
-            'handlers': ['console', 'file'],
+            'handlers': ['queue'],
             'level': os.environ.get('DJANGO_LOG_LEVEL', 'INFO')
         }
     },
     'formatters': {
         'verbose': {
-            'format': '{asctime} ({levelname}) - {name} - {message}',
+            'format': '{asctime} ({levelname}) - {name} - [{request_id}] {message}',
             'style': '{' #str.format()
+        },
+        'json': {
+            '()': 'core.log.JsonFormatter'
         }
     }
 }
\ No newline at end of file
@@ -13,4 +13,20 @@ DATABASES = {
         'USER': 'root',
         'PASSWORD': 'root123',
     }
-}
\ No newline at end of file
+}
+
+INSTALLED_APPS += [
+    'debug_toolbar',
+    # 'silk',
+]
+
+# The toolbar goes as early as it can, after CorsMiddleware.
+MIDDLEWARE.insert(
+    MIDDLEWARE.index('corsheaders.middleware.CorsMiddleware') + 1,
+    'debug_toolbar.middleware.DebugToolbarMiddleware'
+)
+# MIDDLEWARE += ['silk.middleware.SilkyMiddleware']
+
+INTERNAL_IPS = [
+    "127.0.0.1",
+]
@@ -1,4 +1,5 @@
 from django.db import models
+from django.db.models import prefetch_related_objects
 from django.contrib.contenttypes.models import ContentType
 from django.contrib.contenttypes.fields import GenericForeignKey
 
@@ -12,6 +13,33 @@ class TaggedItemManager(models.Manager):
                     object_id=obj_id
                 )
 
+    def get_tags_for_many(self, obj_type, obj_ids):
+        """Return {object id: [Tag, ...]} for every id, in one query."""
+        content_type = ContentType.objects.get_for_model(obj_type)
+        tags = {obj_id: [] for obj_id in obj_ids}
+        items = self.select_related('tag')\
+                .filter(content_type=content_type, object_id__in=tags)\
+                .order_by('tag__label', 'tag_id')
+        for item in items:
+            tags[item.object_id].append(item.tag)
+        return tags
+
+    def prefetch_tags(self, objects):
+        """Set `tags` on each of `objects` (all of one model) with one query."""
+        objects = list(objects)
+        if not objects:
+            return objects
+        tags = self.get_tags_for_many(type(objects[0]), [obj.pk for obj in objects])
+        for obj in objects:
+            obj.tags = tags[obj.pk]
+        return objects
+
+    def load_content_objects(self, items):
+        """Set content_object on each item with one query per content type."""
+        items = list(items)
+        prefetch_related_objects(items, 'content_object')
+        return items
+
 class Tag(models.Model):
     label = models.CharField(max_length=255)
 
@@ -24,3 +52,8 @@ class TaggedItem(models.Model):
     content_type = models.ForeignKey(ContentType, on_delete=models.CASCADE)
     object_id = models.PositiveIntegerField()
     content_object = GenericForeignKey()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['content_type', 'object_id']),
+        ]